@@ -0,0 +1,277 @@
+"""Shared, cached data loading for the training notebooks.
+
+The notebooks read `pre_processed_dataset.csv` with default int64/float64
+dtypes, and read the whole raw `hd_dataset.csv` only to fit a LabelEncoder
+on Disease_Stage. This module converts each CSV once into a Parquet file
+next to it (`Dataset/.cache/`), with compact dtypes:
+
+- integer-valued columns (the bounded scores, ages, repeat lengths and
+  label codes) as the smallest int type that holds them (int8/int16);
+- string columns as pandas categoricals;
+- other float columns unchanged, so models see exactly the values they
+  saw from the CSV.
+
+Arithmetic on an int8 column stays int8; cast with `.astype(int)` before
+deriving features that can leave the column's range.
+
+The stage names are saved in a JSON mapping next to the cache, so
+`class_names()` and `target_encoder()` do not need the raw CSV at all. A
+cache file is rebuilt when its CSV changes (size or modification time).
+
+    from hd_data import load_xy, train_val_test_split, class_names
+    X, y = load_xy()
+    X_train, X_val, X_test, y_train, y_val, y_test = train_val_test_split(X, y)
+
+    python Notebooks/hd_data.py build  [--data-dir Dataset]
+    python Notebooks/hd_data.py report [--data-dir Dataset | --synthetic 48800]   # CSV vs cache time and memory
+
+Set HD_DATASET_DIR to point the notebooks at another Dataset folder.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DATASET_DIR = Path(__file__).resolve().parent.parent / "Dataset"
+PROCESSED_CSV = "pre_processed_dataset.csv"
+RAW_CSV = "hd_dataset.csv"
+TARGET_COLUMN = "Disease_Stage"
+CACHE_FORMAT = 1
+RANDOM_STATE = 42
+BATCH_ROWS = 500_000
+
+
+def dataset_dir(data_dir=None):
+    return Path(data_dir or os.environ.get("HD_DATASET_DIR") or DATASET_DIR)
+
+
+def cache_dir(data_dir=None):
+    return dataset_dir(data_dir) / ".cache"
+
+
+def _fingerprint(path):
+    stat = Path(path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "format": CACHE_FORMAT}
+
+
+# ---------------------- DTYPES ----------------------
+def compact_dtypes(df):
+    """Copy of `df` with integer-valued columns downcast to the smallest int type and strings as categoricals."""
+    import pandas as pd
+
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            values = series.to_numpy()
+            if series.notna().all() and (pd.api.types.is_integer_dtype(series) or (values == values.round()).all()):
+                series = pd.to_numeric(series.astype("int64"), downcast="integer")
+        elif not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        columns[col] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _cached_frame(csv_name, data_dir=None, refresh=False):
+    """The CSV as a compact DataFrame, (re)building its Parquet cache when missing or stale."""
+    import pandas as pd
+
+    source = dataset_dir(data_dir) / csv_name
+    cache = cache_dir(data_dir)
+    target = cache / (Path(csv_name).stem + ".parquet")
+    meta_path = target.with_suffix(".json")
+    if not refresh and target.is_file() and meta_path.is_file():
+        meta = json.loads(meta_path.read_text())
+        if not source.is_file() or meta.get("source") == _fingerprint(source):
+            return pd.read_parquet(target)
+
+    df = compact_dtypes(pd.read_csv(source))
+    cache.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+    meta_path.write_text(json.dumps({"source": _fingerprint(source), "dtypes": df.dtypes.astype(str).to_dict()}))
+    return df
+
+
+# ---------------------- LOADERS ----------------------
+def load_processed(data_dir=None, refresh=False):
+    """`pre_processed_dataset.csv` with compact dtypes (from the Parquet cache after the first call)."""
+    return _cached_frame(PROCESSED_CSV, data_dir, refresh)
+
+
+def load_raw(data_dir=None, refresh=False):
+    """`hd_dataset.csv` with compact dtypes (strings as categoricals)."""
+    return _cached_frame(RAW_CSV, data_dir, refresh)
+
+
+def load_xy(data_dir=None, refresh=False):
+    """(X, y): the processed features and the encoded Disease_Stage, as the notebooks define them."""
+    df = load_processed(data_dir, refresh)
+    return df.drop(columns=TARGET_COLUMN), df[TARGET_COLUMN]
+
+
+def class_names(data_dir=None, refresh=False):
+    """Stage names in LabelEncoder order (what `target_le.classes_` is in the notebooks)."""
+    import numpy as np
+
+    mapping_path = cache_dir(data_dir) / "stage_mapping.json"
+    source = dataset_dir(data_dir) / RAW_CSV
+    if not refresh and mapping_path.is_file():
+        mapping = json.loads(mapping_path.read_text())
+        if not source.is_file() or mapping.get("source") == _fingerprint(source):
+            return np.array(mapping["classes"], dtype=object)
+
+    stages = load_raw(data_dir, refresh)[TARGET_COLUMN].astype(str)
+    classes = sorted(stages.unique())
+    mapping_path.parent.mkdir(parents=True, exist_ok=True)
+    mapping_path.write_text(json.dumps({"source": _fingerprint(source), "classes": classes}))
+    return np.array(classes, dtype=object)
+
+
+def target_encoder(data_dir=None):
+    """A LabelEncoder fitted on the stage names, identical to the notebooks' `target_le`."""
+    from sklearn.preprocessing import LabelEncoder
+
+    encoder = LabelEncoder()
+    encoder.classes_ = class_names(data_dir)
+    return encoder
+
+
+def write_artifacts(model, columns, out_dir, data_dir=None):
+    """Writes the four files the app loads next to each other: the model, the feature encoders (fitted on the
+    raw dataset's string columns), the target encoder and the model columns. Returns `out_dir`."""
+    import joblib
+    from sklearn.preprocessing import LabelEncoder
+
+    raw = load_raw(data_dir)
+    encoded = [col for col in columns if col in raw.columns and raw[col].dtype == "category"]
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, out_dir / "huntington_model_pipeline.pkl")
+    joblib.dump({col: LabelEncoder().fit(raw[col].astype(str)) for col in encoded}, out_dir / "feature_encoders.pkl")
+    joblib.dump(target_encoder(data_dir), out_dir / "target_encoder.pkl")
+    with open(out_dir / "model_columns.json", "w") as f:
+        json.dump(list(columns), f)
+    return out_dir
+
+
+def train_val_test_split(X, y, validation=True, random_state=RANDOM_STATE):
+    """The notebooks' stratified split: 80/10/10 (train, val, test), or 80/20 with validation=False."""
+    from sklearn.model_selection import train_test_split
+
+    X_train, X_temp, y_train, y_temp = train_test_split(
+        X, y, test_size=0.2, random_state=random_state, stratify=y
+    )
+    if not validation:
+        return X_train, X_temp, y_train, y_temp
+    X_val, X_test, y_val, y_test = train_test_split(
+        X_temp, y_temp, test_size=0.5, random_state=random_state, stratify=y_temp
+    )
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+
+def iter_batches(path, batch_rows=BATCH_ROWS, dtype="float32"):
+    """Yields (feature_names, X, y) batches of a CSV or Parquet file in the preprocessed layout, without reading
+    the whole file (for cohorts larger than RAM). CSV batches hold roughly `batch_rows` rows."""
+    import numpy as np
+
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+    else:
+        import pyarrow.csv as pacsv
+
+        batches = pacsv.open_csv(path, read_options=pacsv.ReadOptions(block_size=batch_rows * 64))
+    for batch in batches:
+        features = [name for name in batch.schema.names if name != TARGET_COLUMN]
+        X = np.column_stack([batch.column(name).to_numpy(zero_copy_only=False) for name in features])
+        yield features, X.astype(dtype, copy=False), batch.column(TARGET_COLUMN).to_numpy(zero_copy_only=False)
+
+
+def synthetic_dataset(out_dir, rows=48_800, seed=42):
+    """Writes stand-in `hd_dataset.csv` and `pre_processed_dataset.csv` (STREAMLIT/synthetic_cohort.py); returns out_dir."""
+    streamlit_dir = str(Path(__file__).resolve().parent.parent / "STREAMLIT")
+    if streamlit_dir not in sys.path:
+        sys.path.insert(0, streamlit_dir)
+    from synthetic_cohort import write_cohort
+
+    out_dir = Path(out_dir)
+    write_cohort(out_dir / RAW_CSV, rows, seed=seed)
+    write_cohort(out_dir / PROCESSED_CSV, rows, seed=seed, preprocessed=True)
+    return out_dir
+
+
+# ---------------------- REPORT ----------------------
+def _timed(fn, repeats):
+    samples, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(samples)
+
+
+def report(data_dir=None, repeats=5):
+    """Load time (median ms) and in-memory size (MB) of each CSV read with pandas defaults vs the cache."""
+    import pandas as pd
+
+    rows = []
+    for name, loader in ((PROCESSED_CSV, load_processed), (RAW_CSV, load_raw)):
+        csv_df, csv_ms = _timed(lambda: pd.read_csv(dataset_dir(data_dir) / name), repeats)
+        _, build_ms = _timed(lambda: loader(data_dir, refresh=True), 1)
+        cached_df, cached_ms = _timed(lambda: loader(data_dir), repeats)
+        rows.append({
+            "file": name,
+            "rows": len(csv_df),
+            "csv_ms": csv_ms,
+            "build_ms": build_ms,
+            "cached_ms": cached_ms,
+            "csv_mb": csv_df.memory_usage(deep=True).sum() / 1e6,
+            "cached_mb": cached_df.memory_usage(deep=True).sum() / 1e6,
+        })
+    # What the notebooks did to get the stage names vs the persisted mapping.
+    _, raw_labels_ms = _timed(lambda: sorted(pd.read_csv(dataset_dir(data_dir) / RAW_CSV)[TARGET_COLUMN].unique()),
+                              repeats)
+    class_names(data_dir)
+    _, mapping_ms = _timed(lambda: class_names(data_dir), repeats)
+    rows.append({"file": "stage names", "rows": len(class_names(data_dir)), "csv_ms": raw_labels_ms,
+                 "build_ms": None, "cached_ms": mapping_ms, "csv_mb": None, "cached_mb": None})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or benchmark the Parquet cache of the training CSVs.")
+    parser.add_argument("command", choices=("build", "report"))
+    parser.add_argument("--data-dir", default=None, help="Folder with the two CSVs (default ../Dataset or $HD_DATASET_DIR).")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="ROWS",
+                        help="Report on a synthetic dataset of this many rows instead (report only).")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        for name, df in ((PROCESSED_CSV, load_processed(args.data_dir, refresh=True)),
+                         (RAW_CSV, load_raw(args.data_dir, refresh=True))):
+            print(f"{name}: {len(df):,} rows cached; dtypes {dict(df.dtypes.astype(str))}")
+        print(f"Stage classes: {list(class_names(args.data_dir, refresh=True))}")
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="hd-data-") as tmp:
+        data_dir = synthetic_dataset(tmp, args.synthetic) if args.synthetic else args.data_dir
+        rows = report(data_dir, args.repeats)
+    print(f"{'file':<28} {'rows':>8} {'csv ms':>8} {'cache ms':>9} {'speed-up':>9} {'csv MB':>8} {'cache MB':>9}")
+    for r in rows:
+        memory = (f"{r['csv_mb']:>8.1f} {r['cached_mb']:>9.1f}" if r["csv_mb"] is not None else "")
+        print(f"{r['file']:<28} {r['rows']:>8,} {r['csv_ms']:>8.1f} {r['cached_ms']:>9.2f} "
+              f"{r['csv_ms'] / r['cached_ms']:>8.0f}x {memory}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,373 @@
+"""One evaluation pass over all six notebook models.
+
+Every `<MODEL>_Training.ipynb` reloads both CSVs, re-splits the data and
+runs its own confusion matrix, classification report and one-vs-rest
+ROC/AUC loop. Here the data is loaded (Parquet cache, `hd_data`) and split
+80/10/10 once, and each model is trained on the training split and scored
+on the test split in its own worker process. The stacked model reuses the
+cached base-model fits from `hd_stacking`. Already trained models can be
+evaluated instead with `--load NAME=model.pkl`.
+
+The metrics come from the integer labels and the probability matrix
+directly. The confusion matrix is one `bincount`, precision, recall and F1
+are derived from it, and the OvR AUC of every class comes from one
+rank computation (the Mann-Whitney form of the area under the ROC curve).
+95% confidence intervals for accuracy, macro-F1 and per-class recall come
+from a paired bootstrap of the test rows: every model is scored on the
+same resamples, computed in blocks across worker processes.
+
+    python Notebooks/hd_evaluate.py [--models dt,lr,rf,xgb,mlp,stacked] [--bootstrap 1000] [--output report.json]
+    python Notebooks/hd_evaluate.py --load stacked=models/huntington_model_pipeline.pkl
+    python Notebooks/hd_evaluate.py bench --synthetic 48800    # against the notebooks' per-model evaluation
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from hd_data import class_names, load_xy, synthetic_dataset, train_val_test_split
+
+MODELS = ("dt", "lr", "rf", "xgb", "mlp", "stacked")
+BOOTSTRAP = 1000
+BOOTSTRAP_BLOCK = 50
+CONFIDENCE = 0.95
+RANDOM_STATE = 42
+
+
+# ---------------------- MODELS ----------------------
+def final_models(n_jobs=1):
+    """{name: unfitted estimator} with each notebook's final parameters ('stacked' is built by `fit_model`)."""
+    import xgboost as xgb
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+
+    from hd_xgb import NOTEBOOK_FINAL
+
+    return {
+        "dt": DecisionTreeClassifier(criterion='entropy', max_depth=3, min_samples_leaf=1, min_samples_split=2,
+                                     random_state=42),
+        "lr": Pipeline(steps=[
+            ('scaler', StandardScaler()),
+            ('classifier', LogisticRegression(random_state=42, max_iter=1000)),
+        ]),
+        "rf": RandomForestClassifier(bootstrap=True, max_depth=10, min_samples_leaf=2, min_samples_split=2,
+                                     n_estimators=100, random_state=42, n_jobs=n_jobs),
+        "xgb": xgb.XGBClassifier(objective='multi:softmax', eval_metric='mlogloss', random_state=42, n_jobs=n_jobs,
+                                 **NOTEBOOK_FINAL),
+        "mlp": Pipeline(steps=[
+            ('scaler', StandardScaler()),
+            ('classifier', MLPClassifier(activation='tanh', alpha=0.01, hidden_layer_sizes=(50, 25), random_state=42,
+                                         max_iter=500, early_stopping=True, n_iter_no_change=10,
+                                         validation_fraction=0.1)),
+        ]),
+    }
+
+
+def fit_model(name, X_train, y_train, n_jobs=1, cache=None):
+    """The fitted notebook model `name`."""
+    if name == "stacked":
+        from hd_stacking import fit_stack
+
+        return fit_stack(X_train, y_train, cache=cache, n_jobs=n_jobs)
+    return final_models(n_jobs)[name].fit(X_train, y_train)
+
+
+def _score(name, X_train, y_train, X_test, path=None, n_jobs=1, cache=None):
+    """Runs in a worker: fits (or loads) one model and returns its test predictions and probabilities."""
+    started = time.perf_counter()
+    if path:
+        import joblib
+
+        model = joblib.load(path)
+    else:
+        model = fit_model(name, X_train, y_train, n_jobs, cache)
+    fitted = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    pred = np.asarray(model.classes_)[proba.argmax(axis=1)]
+    return {"name": name, "pred": pred, "proba": proba, "classes": np.asarray(model.classes_),
+            "fit_seconds": fitted - started, "predict_seconds": time.perf_counter() - fitted}
+
+
+def score_models(names, X_train, y_train, X_test, paths=None, n_jobs=-1, cache=None):
+    """{name: scores} for every model, fitted or loaded in parallel worker processes."""
+    from joblib import Parallel, delayed, effective_n_jobs
+
+    paths = paths or {}
+    names = list(names) + [name for name in paths if name not in names]
+    workers = min(effective_n_jobs(n_jobs), len(names))
+    threads = max(1, effective_n_jobs(n_jobs) // workers)  # spare cores go to the models' own threads
+    # The heaviest models are last in MODELS; dispatching them first keeps the workers evenly loaded.
+    results = Parallel(n_jobs=workers)(
+        delayed(_score)(name, X_train, y_train, X_test, paths.get(name), threads, cache) for name in reversed(names)
+    )
+    return {r["name"]: r for r in sorted(results, key=lambda r: names.index(r["name"]))}
+
+
+# ---------------------- METRICS ----------------------
+def confusion(y_true, y_pred, n_classes):
+    """Confusion matrix of integer labels (rows: actual, columns: predicted)."""
+    return np.bincount(y_true * n_classes + y_pred, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+
+
+def _ratio(num, den):
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+
+def class_metrics(cm):
+    """(precision, recall, f1) per class from one or a stack of confusion matrices (..., k, k)."""
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)
+    actual, predicted = cm.sum(axis=-1), cm.sum(axis=-2)
+    return _ratio(tp, predicted), _ratio(tp, actual), _ratio(2 * tp, actual + predicted)
+
+
+def ovr_auc(y_true, proba):
+    """One-vs-rest ROC AUC of every class: the Mann-Whitney statistic of its probability column."""
+    from scipy.stats import rankdata
+
+    positive = y_true[:, None] == np.arange(proba.shape[1])
+    n_pos = positive.sum(axis=0)
+    n_neg = len(y_true) - n_pos
+    rank_sum = np.where(positive, rankdata(proba, axis=0), 0).sum(axis=0)
+    return _ratio(rank_sum - n_pos * (n_pos + 1) / 2, n_pos * n_neg)
+
+
+def metrics(y_true, y_pred, proba, n_classes):
+    cm = confusion(y_true, y_pred, n_classes)
+    precision, recall, f1 = class_metrics(cm)
+    auc = ovr_auc(y_true, proba)
+    return {"accuracy": np.trace(cm) / cm.sum(), "macro_f1": f1.mean(), "macro_auc": auc.mean(),
+            "confusion": cm, "precision": precision, "recall": recall, "f1": f1, "auc": auc,
+            "support": cm.sum(axis=1)}
+
+
+# ---------------------- BOOTSTRAP ----------------------
+def _bootstrap_block(y_true, preds, n_classes, replicates, seed):
+    """Accuracy, macro-F1 and per-class recall of every model on `replicates` resamples of the test rows."""
+    rng = np.random.default_rng(seed)
+    n = len(y_true)
+    idx = rng.integers(0, n, size=(replicates, n))
+    offsets = (np.arange(replicates) * n_classes * n_classes)[:, None]
+    truth = y_true[idx] * n_classes + offsets
+    out = {"accuracy": [], "macro_f1": [], "recall": []}
+    for pred in preds:
+        cm = np.bincount((truth + pred[idx]).ravel(), minlength=replicates * n_classes * n_classes)
+        cm = cm.reshape(replicates, n_classes, n_classes)
+        _, recall, f1 = class_metrics(cm)
+        out["accuracy"].append(np.trace(cm, axis1=1, axis2=2) / n)
+        out["macro_f1"].append(f1.mean(axis=1))
+        out["recall"].append(recall)
+    return {k: np.stack(v) for k, v in out.items()}
+
+
+def bootstrap(y_true, preds, n_classes, replicates=BOOTSTRAP, n_jobs=-1, random_state=RANDOM_STATE,
+              confidence=CONFIDENCE):
+    """{metric: (low, high)} percentile intervals per model; `preds` is (models, rows).
+
+    Replicates are drawn in fixed blocks with seeds spawned from `random_state`, so the intervals do not
+    depend on the number of workers.
+    """
+    from joblib import Parallel, delayed
+
+    blocks = [min(BOOTSTRAP_BLOCK, replicates - start) for start in range(0, replicates, BOOTSTRAP_BLOCK)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(blocks))
+    parts = Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_block)(y_true, preds, n_classes, size, seed) for size, seed in zip(blocks, seeds)
+    )
+    tail = (1 - confidence) / 2 * 100
+    return {k: np.percentile(np.concatenate([p[k] for p in parts], axis=1), [tail, 100 - tail], axis=1)
+            for k in parts[0]}
+
+
+# ---------------------- REPORT ----------------------
+def evaluate(names=MODELS, data_dir=None, paths=None, replicates=BOOTSTRAP, n_jobs=-1, cache=None):
+    """Loads and splits the data once, scores every model and returns the comparison report as a dict."""
+    X, y = load_xy(data_dir)
+    X_train, _, X_test, y_train, _, y_test = train_val_test_split(X, y)
+    labels = np.unique(y)
+    stages = [str(s) for s in class_names(data_dir)]
+    if len(stages) != len(labels):  # the codes are LabelEncoder indices of the stage names
+        stages = [str(label) for label in labels]
+    y_true = np.searchsorted(labels, np.asarray(y_test))
+
+    started = time.perf_counter()
+    scores = score_models(names, X_train, y_train, X_test, paths, n_jobs, cache)
+    scoring_seconds = time.perf_counter() - started
+
+    models, preds = {}, []
+    for name, s in scores.items():
+        proba = np.zeros((len(y_true), len(labels)))
+        proba[:, np.searchsorted(labels, s["classes"])] = s["proba"]  # aligns models that saw fewer classes
+        pred = np.searchsorted(labels, s["pred"])
+        models[name] = {"fit_seconds": s["fit_seconds"], "predict_seconds": s["predict_seconds"],
+                        **metrics(y_true, pred, proba, len(labels))}
+        preds.append(pred)
+
+    started = time.perf_counter()
+    intervals = bootstrap(y_true, np.stack(preds), len(labels), replicates, n_jobs)
+    for i, name in enumerate(models):
+        for metric, (low, high) in intervals.items():
+            models[name][f"{metric}_ci"] = np.stack([low[i], high[i]], axis=-1)
+    return {"classes": stages, "test_rows": len(y_true), "train_rows": len(y_train), "bootstrap": replicates,
+            "confidence": CONFIDENCE, "scoring_seconds": scoring_seconds,
+            "bootstrap_seconds": time.perf_counter() - started, "models": models}
+
+
+def format_report(report):
+    stages = report["classes"]
+    pct = f"{report['confidence']:.0%}"
+    nw = max([8] + [len(name) for name in report["models"]])
+    lines = [f"{report['train_rows']} training / {report['test_rows']} test rows; {pct} intervals from "
+             f"{report['bootstrap']} paired bootstrap resamples of the test rows", "",
+             f"{'model':<{nw}} {'fit s':>7} {'accuracy':>8} {pct + ' CI':>17} {'macro-F1':>8} {pct + ' CI':>17} "
+             f"{'macro AUC':>9}"]
+    ranked = sorted(report["models"].items(), key=lambda item: -item[1]["accuracy"])
+    for name, m in ranked:
+        lines.append(f"{name:<{nw}} {m['fit_seconds']:>7.1f} {m['accuracy']:>8.4f} {_ci(m['accuracy_ci'])} "
+                     f"{m['macro_f1']:>8.4f} {_ci(m['macro_f1_ci'])} {m['macro_auc']:>9.4f}")
+
+    lines += ["", f"Per-class recall ({pct} CI)", f"{'model':<{nw}} " + " ".join(f"{s:>24}" for s in stages)]
+    for name, m in ranked:
+        lines.append(f"{name:<{nw}} " + " ".join(f"{r:>7.4f} {_ci(ci)}" for r, ci in zip(m["recall"], m["recall_ci"])))
+
+    width = max(len(s) for s in stages) + 2
+    label = len("actual / predicted") + 2
+    for name, m in ranked:
+        lines += ["", f"--- {name} ---", f"{'actual / predicted':<{label}}" + "".join(f"{s:>{width}}" for s in stages)]
+        lines += [f"{s:<{label}}" + "".join(f"{v:>{width}}" for v in row) for s, row in zip(stages, m["confusion"])]
+        lines += ["", f"{'':<{label}}{'precision':>10}{'recall':>10}{'f1':>10}{'auc':>10}{'support':>10}"]
+        lines += [f"{s:<{label}}{p:>10.4f}{r:>10.4f}{f:>10.4f}{a:>10.4f}{n:>10}"
+                  for s, p, r, f, a, n in zip(stages, m["precision"], m["recall"], m["f1"], m["auc"], m["support"])]
+    return "\n".join(lines)
+
+
+def _ci(interval):
+    return f"[{interval[0]:.4f}, {interval[1]:.4f}]"
+
+
+def _json_ready(value):
+    if isinstance(value, dict):
+        return {k: _json_ready(v) for k, v in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+# ---------------------- BENCHMARK ----------------------
+def notebook_evaluation(name, data_dir):
+    """What one notebook does: read both CSVs, encode the class names, split, fit, then run the sklearn metrics."""
+    import pandas as pd
+    from sklearn.metrics import accuracy_score, auc, classification_report, confusion_matrix, roc_curve
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder, label_binarize
+
+    from hd_data import PROCESSED_CSV, RAW_CSV, TARGET_COLUMN, dataset_dir
+
+    df_processed = pd.read_csv(dataset_dir(data_dir) / PROCESSED_CSV)
+    raw_df = pd.read_csv(dataset_dir(data_dir) / RAW_CSV)
+    X, y = df_processed.drop(TARGET_COLUMN, axis=1), df_processed[TARGET_COLUMN]
+    names = LabelEncoder().fit(raw_df[TARGET_COLUMN]).classes_
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    _, X_test, _, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42, stratify=y_temp)
+    if name == "stacked":
+        from sklearn.ensemble import StackingClassifier
+        from sklearn.linear_model import LogisticRegression
+
+        from hd_stacking import base_models
+
+        model = StackingClassifier(list(base_models().items()), final_estimator=LogisticRegression(), cv=5,
+                                   n_jobs=-1).fit(X_train, y_train)
+    else:
+        model = fit_model(name, X_train, y_train, n_jobs=-1)
+    y_pred, y_proba = model.predict(X_test), model.predict_proba(X_test)
+    binarized = label_binarize(y_test, classes=np.unique(y_test))
+    roc_auc = [auc(*roc_curve(binarized[:, i], y_proba[:, i])[:2]) for i in range(binarized.shape[1])]
+    classification_report(y_test, y_pred, target_names=[str(n) for n in names])
+    return {"accuracy": accuracy_score(y_test, y_pred), "confusion": confusion_matrix(y_test, y_pred),
+            "auc": np.array(roc_auc)}
+
+
+def bench(names=MODELS, data_dir=None, replicates=BOOTSTRAP, n_jobs=-1, cache=None):
+    """Wall-clock of the six notebook evaluations run one after another vs `evaluate` (cold, then with the
+    stacking cache warm), plus a check that both give the same accuracy, confusion matrices and AUCs."""
+    started = time.perf_counter()
+    reference = {name: notebook_evaluation(name, data_dir) for name in names}
+    notebook_seconds = time.perf_counter() - started
+
+    engine_seconds = []
+    for _ in range(2):  # the second run finds the stacked model's base fits in the cache
+        started = time.perf_counter()
+        report = evaluate(names, data_dir, replicates=replicates, n_jobs=n_jobs, cache=cache)
+        engine_seconds.append(time.perf_counter() - started)
+
+    same = all(np.isclose(reference[n]["accuracy"], report["models"][n]["accuracy"])
+               and np.array_equal(reference[n]["confusion"], report["models"][n]["confusion"])
+               and np.allclose(reference[n]["auc"], report["models"][n]["auc"]) for n in names)
+    print(f"notebook evaluations, one after another: {notebook_seconds:.1f}s (no confidence intervals)")
+    print(f"hd_evaluate: {engine_seconds[0]:.1f}s, {engine_seconds[1]:.1f}s with the stacking cache warm "
+          f"(scoring {report['scoring_seconds']:.1f}s, {replicates} bootstrap resamples "
+          f"{report['bootstrap_seconds']:.1f}s)")
+    print(f"accuracy, confusion matrices and AUCs match the notebooks' sklearn metrics: {same}")
+    return {"notebook_seconds": notebook_seconds, "engine_seconds": engine_seconds, "metrics_match": same}
+
+
+def _models(text):
+    models = [m for m in text.split(",") if m]
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown model(s) {sorted(unknown)}; choose from {', '.join(MODELS)}")
+    return models
+
+
+def _load(text):
+    name, sep, path = text.partition("=")
+    if not sep or not name or not path:
+        raise argparse.ArgumentTypeError("expected NAME=path/to/model.pkl")
+    return name, path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate all notebook models on one split, in parallel.")
+    parser.add_argument("command", nargs="?", choices=("report", "bench"), default="report")
+    parser.add_argument("--models", type=_models, default=list(MODELS), help="Comma-separated subset of "
+                        + ",".join(MODELS) + ".")
+    parser.add_argument("--load", type=_load, action="append", default=[], metavar="NAME=PKL",
+                        help="Evaluate an already trained model instead of fitting NAME (repeatable).")
+    parser.add_argument("--bootstrap", type=int, default=BOOTSTRAP, help="Bootstrap resamples for the intervals.")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--synthetic", type=int, default=None, metavar="ROWS",
+                        help="Use a generated dataset of this many rows instead of ../Dataset.")
+    parser.add_argument("--cache", default=None, help="Stacking out-of-fold cache (default Dataset/.cache/stacking).")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--output", default=None, help="Write the report as JSON here.")
+    args = parser.parse_args(argv)
+
+    from hd_stacking import default_cache_dir
+
+    with tempfile.TemporaryDirectory(prefix="hd-evaluate-") as tmp:
+        data_dir = synthetic_dataset(tmp, args.synthetic) if args.synthetic else args.data_dir
+        cache = args.cache or default_cache_dir(data_dir)
+        if args.command == "bench":
+            result = bench(args.models, data_dir, args.bootstrap, args.n_jobs, cache)
+        else:
+            paths = dict(args.load)
+            names = [name for name in args.models if name not in paths]
+            result = evaluate(names, data_dir, paths, args.bootstrap, args.n_jobs, cache)
+            print(format_report(result))
+            print(f"\nScored {len(result['models'])} models in {result['scoring_seconds']:.1f}s; "
+                  f"bootstrap {result['bootstrap_seconds']:.1f}s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(_json_ready(result), f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
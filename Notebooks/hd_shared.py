@@ -0,0 +1,237 @@
+"""Shared-memory training data for the parallel searches.
+
+GridSearchCV(n_jobs=-1) hands the training frame to its joblib workers on
+every `Parallel` call: joblib dumps each large column block to a fresh
+temporary file for that call (next to the parent's own copy), and each
+worker then copies its fold out of it and converts that copy to the dtype
+the estimator fits on (for the trees and XGBoost: mixed int8/float64 ->
+float64 -> float32). `share` writes the split once, as one matrix in the
+fit dtype, to /dev/shm (or the temp folder when /dev/shm is too small),
+and returns a DataFrame whose single block is a read-only memory map of
+it, with the column names unchanged. joblib passes memmap-backed arrays
+by file name, so every worker and every later `Parallel` call maps the
+same pages, and a worker's fold copy is already in the dtype its
+estimator needs.
+
+    from hd_shared import share
+    with share(X_train, y_train, "float32") as train:      # float64 (the default) for the MLP and LR
+        GridSearchCV(DecisionTreeClassifier(), grid, n_jobs=-1).fit(train.X, train.y)
+
+    python Notebooks/hd_shared.py bench [--rows 1000000] [--jobs 1,2,4] [--model dt] [--candidates 8]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from hd_data import load_xy, synthetic_dataset, train_val_test_split
+
+MANIFEST = "shared.json"
+SHM_DIR = "/dev/shm"
+SAMPLE_SECONDS = 0.05
+
+
+def shared_dir(nbytes=0):
+    """$HD_SHARED_DIR, else /dev/shm when it can hold `nbytes` with room to spare, else the temp folder."""
+    if os.environ.get("HD_SHARED_DIR"):
+        return Path(os.environ["HD_SHARED_DIR"])
+    if os.access(SHM_DIR, os.W_OK) and shutil.disk_usage(SHM_DIR).free > 2 * nbytes:
+        return Path(SHM_DIR)
+    return Path(tempfile.gettempdir())
+
+
+class SharedDataset:
+    """Feature frame `X` and labels `y` backed by read-only memory maps of the column files under `path`.
+
+    Use as a context manager; the dataset that `share` created deletes its files on exit.
+    """
+
+    def __init__(self, path, owner=False):
+        import pandas as pd
+
+        self.path = Path(path)
+        self.owner = owner
+        manifest = json.loads((self.path / MANIFEST).read_text())
+        # X.npy holds the (columns, rows) block pandas keeps internally, so the frame's single block is the map
+        # itself. (joblib rebuilds a transposed view of a memmap with the wrong strides, so it must not be one.)
+        block = np.load(self.path / "X.npy", mmap_mode="r")
+        self.X = pd.DataFrame(block.T, columns=manifest["columns"], copy=False)
+        self.y = np.load(self.path / "y.npy", mmap_mode="r") if manifest["labels"] else None
+
+    @property
+    def nbytes(self):
+        return sum(f.stat().st_size for f in self.path.glob("*.npy"))
+
+    def close(self):
+        self.X = self.y = None
+        if self.owner:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def share(X, y=None, dtype=None, directory=None):
+    """Writes X (as one `dtype` matrix, default the columns' common type) and y once to shared memory;
+    returns the owning SharedDataset."""
+    non_numeric = [col for col in X.columns if not np.issubdtype(X[col].dtype, np.number)]
+    if non_numeric:
+        raise TypeError(f"share needs numeric columns; encode {non_numeric} first.")
+    dtype = np.dtype(dtype or np.result_type(*X.dtypes))
+    nbytes = X.shape[0] * X.shape[1] * dtype.itemsize + (np.asarray(y).nbytes if y is not None else 0)
+    path = Path(tempfile.mkdtemp(prefix="hd-shared-", dir=directory or shared_dir(nbytes)))
+    try:
+        np.save(path / "X.npy", np.ascontiguousarray(X.to_numpy(dtype=dtype).T), allow_pickle=False)
+        if y is not None:
+            np.save(path / "y.npy", np.ascontiguousarray(np.asarray(y)), allow_pickle=False)
+        (path / MANIFEST).write_text(json.dumps({"columns": list(X.columns), "dtype": dtype.str,
+                                                 "labels": y is not None, "rows": len(X)}))
+    except BaseException:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    return SharedDataset(path, owner=True)
+
+
+def attach(path):
+    """The SharedDataset at `path` (written by `share` in another process), without taking ownership."""
+    return SharedDataset(path)
+
+
+# ---------------------- BENCHMARK ----------------------
+class TreeMemory:
+    """Samples the summed PSS (proportional set size) of this process and its children in a thread.
+
+    PSS splits each shared page between the processes that map it, so the sum counts shared data once.
+    """
+
+    def __init__(self, interval=SAMPLE_SECONDS):
+        import psutil
+
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self):
+        import psutil
+
+        total = 0
+        for proc in [self.process] + self.process.children(recursive=True):
+            try:
+                total += proc.memory_full_info().pss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.sample())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _run_case(mode, n_jobs, model, data_dir, candidates=None):
+    """GridSearchCV over the notebook grid for `model` (its first `candidates` points), on the usual in-memory
+    frame ('copy') or on the split shared in the model's fit dtype ('shared')."""
+    from sklearn.model_selection import GridSearchCV, ParameterGrid, StratifiedKFold
+
+    from hd_tuning import fit_dtype, search_space
+
+    estimator, grid, cv = search_space(model, n_jobs=1)
+    points = list(ParameterGrid(grid))[:candidates]
+    search = GridSearchCV(estimator, [{k: [v] for k, v in p.items()} for p in points],
+                          cv=StratifiedKFold(cv, shuffle=True, random_state=42), scoring='accuracy', n_jobs=n_jobs)
+    X, y = load_xy(data_dir)
+    X_train, _, y_train, _ = train_val_test_split(X, y, validation=False)
+    del X, y
+    train = share(X_train, y_train, fit_dtype(model)) if mode == "shared" else None
+    if train is not None:
+        X_train, y_train = train.X, train.y
+    try:
+        memory = TreeMemory()
+        baseline = memory.sample()
+        started = time.perf_counter()
+        with memory:
+            search.fit(X_train, y_train)
+    finally:
+        if train is not None:
+            train.close()
+    return {"mode": mode, "n_jobs": n_jobs, "seconds": time.perf_counter() - started,
+            "baseline_mb": baseline / 2 ** 20, "peak_mb": memory.peak / 2 ** 20,
+            "cv_accuracy": search.best_score_, "best_params": search.best_params_}
+
+
+def run_case(mode, n_jobs, model, data_dir=None, candidates=None):
+    """`_run_case` in a fresh interpreter, so one case's memory does not carry into the next."""
+    command = [sys.executable, __file__, "_case", mode, "--jobs", str(n_jobs), "--model", model]
+    if candidates:
+        command += ["--candidates", str(candidates)]
+    if data_dir:
+        command += ["--data-dir", str(data_dir)]
+    out = subprocess.run(command, check=True, capture_output=True, text=True, cwd=Path(__file__).resolve().parent)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _default_jobs():
+    cores = os.cpu_count() or 1
+    return sorted({2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores} | {cores})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared-memory training data: memory and time vs worker count.")
+    parser.add_argument("command", choices=("bench", "_case"))
+    parser.add_argument("mode", nargs="?", help=argparse.SUPPRESS)
+    parser.add_argument("--model", choices=("dt", "rf", "xgb", "mlp"), default="dt",
+                        help="Notebook grid to search (hd_tuning.search_space).")
+    parser.add_argument("--candidates", type=int, default=None,
+                        help="Search only the first N grid points (default: the whole grid).")
+    parser.add_argument("--jobs", default=",".join(map(str, _default_jobs())),
+                        help="Comma-separated worker counts (default 1, 2, 4, ... up to all cores).")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--rows", type=int, default=None,
+                        help="Use a generated dataset of this many rows instead of ../Dataset.")
+    parser.add_argument("--output", default=None, help="Write the rows as JSON here.")
+    args = parser.parse_args(argv)
+    jobs = [int(j) for j in args.jobs.split(",")]
+
+    if args.command == "_case":
+        print(json.dumps(_run_case(args.mode, jobs[0], args.model, args.data_dir, args.candidates), default=str))
+        return 0
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="hd-shared-bench-") as tmp:
+        data_dir = synthetic_dataset(tmp, args.rows) if args.rows else args.data_dir
+        print(f"{'n_jobs':>6} {'mode':<7} {'seconds':>8} {'peak MB':>8} {'over base':>9} {'cv acc':>7}")
+        for n_jobs in jobs:
+            for mode in ("copy", "shared"):
+                rows.append(run_case(mode, n_jobs, args.model, data_dir, args.candidates))
+                r = rows[-1]
+                print(f"{n_jobs:>6} {mode:<7} {r['seconds']:>8.1f} {r['peak_mb']:>8.0f} "
+                      f"{r['peak_mb'] - r['baseline_mb']:>9.0f} {r['cv_accuracy']:>7.4f}", flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
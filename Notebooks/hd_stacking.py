@@ -0,0 +1,282 @@
+"""Stacked ensemble training with cached out-of-fold predictions.
+
+`StackingClassifier(cv=5)` in `Stacked(LR+MLP+XGB).ipynb` refits every
+base model five times (for the out-of-fold probabilities the meta-model
+learns from) plus once on all rows, on every `fit`. Here each base model's
+out-of-fold probabilities and its full-data fit are computed once and
+stored under `Dataset/.cache/stacking/` (or $HD_STACKING_CACHE). The cache
+key is a hash of the model configuration (thread counts and verbosity
+excluded), the folds and the training data. Trying another meta-model or
+a subset of the base models then costs only the meta-model fit.
+
+Missing entries are computed as independent (model, fold) tasks in
+parallel worker processes, with each model's own threads pinned to one.
+The folds are the ones `StackingClassifier(cv=5)` uses (unshuffled
+StratifiedKFold), so `fit_stack` returns the same predictions as the
+notebook. It returns an ordinary fitted StackingClassifier, which can be
+saved as `huntington_model_pipeline.pkl`.
+
+    from hd_stacking import fit_stack
+    stack = fit_stack(X_train, y_train)                     # notebook configuration
+    stack = fit_stack(X_train, y_train, names=["xgb", "lr"], final_estimator=RandomForestClassifier())
+
+    python Notebooks/hd_stacking.py fit --out models [--models mlp,xgb,lr] [--meta lr]
+    python Notebooks/hd_stacking.py experiments [--synthetic 48800]   # every base subset x meta-model
+    python Notebooks/hd_stacking.py verify [--synthetic 20000]        # against StackingClassifier.fit
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from hd_data import cache_dir, load_xy, synthetic_dataset, train_val_test_split, write_artifacts
+
+BASE_MODELS = ("mlp", "xgb", "lr")
+META_MODELS = ("lr", "lr_c0.1", "rf")
+CV_FOLDS = 5
+STACK_METHOD = "predict_proba"
+
+
+def base_models(n_jobs=-1):
+    """{name: unfitted estimator} with the notebook's best parameters."""
+    import xgboost as xgb
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return {
+        "mlp": Pipeline(steps=[
+            ('scaler', StandardScaler()),
+            ('mlp', MLPClassifier(activation='tanh', alpha=0.01, hidden_layer_sizes=(50, 25), random_state=42,
+                                  max_iter=500, early_stopping=True)),
+        ]),
+        "xgb": xgb.XGBClassifier(objective='multi:softmax', eval_metric='mlogloss', colsample_bytree=0.8,
+                                 learning_rate=0.1, max_depth=3, n_estimators=160, subsample=0.8, random_state=42,
+                                 n_jobs=n_jobs),
+        "lr": Pipeline(steps=[
+            ('scaler', StandardScaler()),
+            ('lr', LogisticRegression(random_state=42, max_iter=1000)),
+        ]),
+    }
+
+
+def meta_model(name="lr"):
+    """The notebook's meta-model ('lr') or an alternative to compare it with."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    if name == "lr":
+        return LogisticRegression()
+    if name == "lr_c0.1":
+        return LogisticRegression(C=0.1)
+    if name == "rf":
+        return RandomForestClassifier(n_estimators=200, max_depth=5, random_state=42)
+    raise ValueError(f"meta-model must be one of {META_MODELS}.")
+
+
+# ---------------------- CACHE ----------------------
+def default_cache_dir(data_dir=None):
+    return Path(os.environ.get("HD_STACKING_CACHE") or cache_dir(data_dir) / "stacking")
+
+
+def data_hash(X, y):
+    """Hash of the training rows, column names and labels."""
+    import joblib
+
+    return joblib.hash((list(getattr(X, "columns", [])), np.asarray(X), np.asarray(y)))
+
+
+def config_hash(estimator):
+    """Hash of the estimator's parameters, ignoring thread counts and verbosity (they do not change the fit)."""
+    import joblib
+    import sklearn
+    import xgboost
+
+    params = {k: v for k, v in estimator.get_params(deep=True).items()
+              if not hasattr(v, "get_params") and k != "steps"
+              and not k.endswith(("n_jobs", "nthread", "verbose", "verbosity"))}
+    return joblib.hash((type(estimator).__name__, params, sklearn.__version__, xgboost.__version__))
+
+
+def cache_key(name, estimator, X, y, cv=CV_FOLDS, method=STACK_METHOD):
+    digest = hashlib.sha256(f"{config_hash(estimator)}:{data_hash(X, y)}:{cv}:{method}".encode()).hexdigest()
+    return f"{name}-{digest[:24]}"
+
+
+def _set_threads(estimator, n):
+    """Sets every explicitly configured *n_jobs parameter of `estimator` to `n`; returns the previous values."""
+    previous = {k: v for k, v in estimator.get_params(deep=True).items()
+                if k.endswith("n_jobs") and v not in (None, n)}
+    if previous:
+        estimator.set_params(**{k: n for k in previous})
+    return previous
+
+
+def _fit_fold(estimator, X, y, train, test, method):
+    from sklearn.base import clone
+
+    model = clone(estimator)
+    _set_threads(model, 1)
+    model.fit(X.iloc[train] if hasattr(X, "iloc") else X[train], y[train])
+    return getattr(model, method)(X.iloc[test] if hasattr(X, "iloc") else X[test])
+
+
+def _fit_full(estimator, X, y):
+    from sklearn.base import clone
+
+    model = clone(estimator)
+    previous = _set_threads(model, 1)
+    model.fit(X, y)
+    if previous:
+        model.set_params(**previous)  # the saved model keeps the configured thread count
+    return model
+
+
+def out_of_fold(estimators, X, y, cv=CV_FOLDS, cache=None, n_jobs=-1, method=STACK_METHOD):
+    """{name: (oof_predictions, fitted_on_all_rows)} for each (name, estimator); computes only uncached ones.
+
+    `y` must already be label-encoded (0..n_classes-1), as StackingClassifier encodes it.
+    """
+    import joblib
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    cache = Path(cache) if cache else default_cache_dir()
+    y = np.asarray(y)
+    keys = {name: cache_key(name, est, X, y, cv, method) for name, est in estimators.items()}
+    missing = {name: est for name, est in estimators.items()
+               if not (cache / keys[name] / "oof.npy").is_file() or not (cache / keys[name] / "full.pkl").is_file()}
+
+    if missing:
+        folds = list(StratifiedKFold(cv).split(X, y))
+        tasks = [(name, i) for name in missing for i in range(len(folds))] + [(name, None) for name in missing]
+        outputs = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_full)(missing[name], X, y) if i is None
+            else delayed(_fit_fold)(missing[name], X, y, *folds[i], method)
+            for name, i in tasks
+        )
+        results = dict(zip(tasks, outputs))
+        for name in missing:
+            first = results[(name, 0)]
+            oof = np.zeros((len(y), first.shape[1]), dtype=first.dtype)
+            for i, (_, test) in enumerate(folds):
+                oof[test] = results[(name, i)]
+            entry = cache / keys[name]
+            entry.mkdir(parents=True, exist_ok=True)
+            np.save(entry / "oof.npy", oof)
+            joblib.dump(results[(name, None)], entry / "full.pkl")
+            (entry / "meta.json").write_text(json.dumps({
+                "name": name, "estimator": repr(missing[name]), "rows": len(y), "cv": cv, "method": method,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }, indent=2))
+
+    return {name: (np.load(cache / keys[name] / "oof.npy"), joblib.load(cache / keys[name] / "full.pkl"))
+            for name in estimators}
+
+
+# ---------------------- STACK ----------------------
+def fit_stack(X, y, names=BASE_MODELS, final_estimator=None, cv=CV_FOLDS, cache=None, n_jobs=-1, models=None):
+    """Fitted StackingClassifier over `names` (from `models`, default `base_models()`), equivalent to
+    `StackingClassifier(estimators, final_estimator, cv=cv).fit(X, y)` but built from cached base-model fits."""
+    from sklearn.base import clone
+    from sklearn.dummy import DummyClassifier
+    from sklearn.ensemble import StackingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import LabelEncoder
+
+    models = models or base_models()
+    estimators = [(name, models[name]) for name in names]
+    final_estimator = final_estimator if final_estimator is not None else LogisticRegression()
+    y_encoded = LabelEncoder().fit_transform(np.asarray(y))
+    cached = out_of_fold(dict(estimators), X, y_encoded, cv, cache, n_jobs)
+
+    # cv="prefit" fills in every fitted attribute from the full-data models (with a placeholder meta-model);
+    # the real final estimator is then fitted on the out-of-fold probabilities, as cv=5 would have done.
+    stack = StackingClassifier([(name, cached[name][1]) for name, _ in estimators], final_estimator=DummyClassifier(),
+                               cv="prefit", stack_method=STACK_METHOD)
+    stack.fit(X, y)
+    stack.final_estimator_ = clone(final_estimator).fit(np.hstack([cached[name][0] for name, _ in estimators]),
+                                                        y_encoded)
+    return stack.set_params(estimators=[(name, clone(est)) for name, est in estimators],
+                            final_estimator=final_estimator, cv=cv)
+
+
+def experiments(X_train, y_train, X_test, y_test, cache=None, n_jobs=-1):
+    """Test accuracy of every non-empty subset of BASE_MODELS under every meta-model, from one set of base fits."""
+    rows = []
+    for size in range(1, len(BASE_MODELS) + 1):
+        for names in itertools.combinations(BASE_MODELS, size):
+            for meta in META_MODELS:
+                started = time.perf_counter()
+                stack = fit_stack(X_train, y_train, names, meta_model(meta), cache=cache, n_jobs=n_jobs)
+                rows.append({"base": "+".join(names), "meta": meta, "seconds": time.perf_counter() - started,
+                             "test_accuracy": stack.score(X_test, y_test)})
+                print(f"{rows[-1]['base']:<12} {meta:<8} {rows[-1]['seconds']:>8.1f} {rows[-1]['test_accuracy']:>8.4f}",
+                      flush=True)
+    return rows
+
+
+def verify(X_train, y_train, X_test, cache=None, n_jobs=-1):
+    """Times StackingClassifier.fit, a cold and a warm `fit_stack`; returns timings and the largest probability gap."""
+    from sklearn.ensemble import StackingClassifier
+
+    models = base_models()
+    started = time.perf_counter()
+    reference = StackingClassifier(list(models.items()), final_estimator=meta_model("lr"), cv=CV_FOLDS,
+                                   n_jobs=n_jobs).fit(X_train, y_train)
+    reference_s = time.perf_counter() - started
+    timings = {}
+    for run in ("cold", "warm"):
+        started = time.perf_counter()
+        stack = fit_stack(X_train, y_train, cache=cache, n_jobs=n_jobs)
+        timings[run] = time.perf_counter() - started
+    gap = np.abs(stack.predict_proba(X_test) - reference.predict_proba(X_test)).max()
+    agreement = (stack.predict(X_test) == reference.predict(X_test)).mean()
+    return {"stacking_classifier_s": reference_s, "cold_s": timings["cold"], "warm_s": timings["warm"],
+            "max_proba_diff": float(gap), "prediction_agreement": float(agreement)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stacked ensemble training with cached out-of-fold predictions.")
+    parser.add_argument("command", choices=("fit", "experiments", "verify"))
+    parser.add_argument("--out", default=None, help="fit: folder for the four app artifacts.")
+    parser.add_argument("--models", default=",".join(BASE_MODELS), help="fit: comma-separated base models.")
+    parser.add_argument("--meta", choices=META_MODELS, default="lr", help="fit: meta-model.")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--synthetic", type=int, default=None, metavar="ROWS",
+                        help="Use a generated dataset of this many rows instead of ../Dataset.")
+    parser.add_argument("--cache", default=None, help="Out-of-fold cache folder (default Dataset/.cache/stacking).")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="hd-stacking-") as tmp:
+        data_dir = synthetic_dataset(tmp, args.synthetic) if args.synthetic else args.data_dir
+        cache = args.cache or default_cache_dir(data_dir)
+        X, y = load_xy(data_dir)
+        X_train, X_test, y_train, y_test = train_val_test_split(X, y, validation=False)
+
+        if args.command == "fit":
+            started = time.perf_counter()
+            stack = fit_stack(X_train, y_train, args.models.split(","), meta_model(args.meta), cache=cache,
+                              n_jobs=args.n_jobs)
+            print(f"Fitted in {time.perf_counter() - started:.1f}s; test accuracy {stack.score(X_test, y_test):.4f}")
+            if args.out:
+                print(f"Artifacts written to {write_artifacts(stack, X.columns, args.out, data_dir)}")
+        elif args.command == "experiments":
+            print(f"{'base':<12} {'meta':<8} {'seconds':>8} {'test acc':>8}")
+            experiments(X_train, y_train, X_test, y_test, cache, args.n_jobs)
+        else:
+            for name, value in verify(X_train, y_train, X_test, cache, args.n_jobs).items():
+                print(f"{name:<22} {value:.4g}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,266 @@
+"""Out-of-core training of the StandardScaler -> LogisticRegression / MLPClassifier pipelines.
+
+`LR_Training.ipynb` and `MLP_Training.ipynb` load the whole dataset and
+call `fit` once. Here the data stays on disk, as a CSV or Parquet file in
+the `pre_processed_dataset.csv` layout, and is read in chunks, so peak
+memory is bounded by `chunk_rows` rather than by the cohort size:
+
+1. one pass fits the StandardScaler statistics (`partial_fit`);
+2. LR: LogisticRegression has no `partial_fit`. Each L-BFGS step streams
+   over the file to sum the multinomial log-loss and its gradient, so the
+   model converges to the same optimum as the in-memory
+   `LogisticRegression(C=1.0)`. The result is a real LogisticRegression.
+3. MLP: `MLPClassifier.partial_fit` runs over the chunks once per epoch.
+   Early stopping works like `early_stopping=True`: validation accuracy
+   after each epoch, best weights kept, stop after `n_iter_no_change`
+   epochs without improvement.
+
+Rows are assigned by position, without reading the file into memory: every
+10th row (index % 10 == 0) is the test holdout, and for the MLP index % 10
+== 1 is the validation set. The other rows are trained on. The output is
+the app's Pipeline(scaler, classifier) and can be written with the other
+three artifacts.
+
+    python Notebooks/hd_streaming.py train --data cohort.parquet --model lr --out models [--chunk-rows 100000]
+    python Notebooks/hd_streaming.py parity [--rows 500000] [--model lr,mlp]   # vs the in-memory fit
+"""
+import argparse
+import copy
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from hd_data import iter_batches, synthetic_dataset, write_artifacts
+
+CHUNK_ROWS = 100_000
+HOLDOUT_EVERY = 10
+TEST_SLOT, VALIDATION_SLOT = 0, 1
+MODELS = ("lr", "mlp")
+
+
+def iter_split(path, part, chunk_rows=CHUNK_ROWS, every=HOLDOUT_EVERY, validation=False):
+    """Yields (features, X float64, y) chunks of the rows in `part` ('train', 'test' or 'validation')."""
+    offset = 0
+    for features, X, y in iter_batches(path, chunk_rows, dtype="float64"):
+        slot = (offset + np.arange(len(y))) % every
+        offset += len(y)
+        if part == "test":
+            keep = slot == TEST_SLOT
+        elif part == "validation":
+            keep = slot == VALIDATION_SLOT
+        else:
+            keep = (slot != TEST_SLOT) & ((slot != VALIDATION_SLOT) if validation else True)
+        if keep.any():
+            yield features, X[keep], y[keep]
+
+
+def _frame(features, X):
+    import pandas as pd
+
+    return pd.DataFrame(X, columns=features)  # the pipelines are fitted on named columns, as in the app
+
+
+def _standardize(scaler, X):
+    return (X - scaler.mean_) / scaler.scale_
+
+
+def fit_scaler(path, chunk_rows=CHUNK_ROWS, validation=False):
+    """(scaler, classes, n_rows, features): StandardScaler fitted in one pass over the training rows."""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler, classes, rows, features = StandardScaler(), set(), 0, None
+    for features, X, y in iter_split(path, "train", chunk_rows, validation=validation):
+        scaler.partial_fit(_frame(features, X))  # records feature_names_in_ for the app's DataFrames
+        classes.update(np.unique(y).tolist())
+        rows += len(y)
+    return scaler, np.array(sorted(classes)), rows, features
+
+
+# ---------------------- LOGISTIC REGRESSION ----------------------
+def _loss_gradient(packed, path, scaler, classes, n_rows, C, chunk_rows):
+    """Mean multinomial log-loss + L2 penalty (sklearn's scaling) and its gradient, streamed over the file."""
+    n_classes, n_features = len(classes), scaler.n_features_in_
+    W = packed[: n_classes * n_features].reshape(n_classes, n_features)
+    b = packed[n_classes * n_features:]
+    loss, grad_W, grad_b = 0.0, np.zeros_like(W), np.zeros_like(b)
+    for _, X, y in iter_split(path, "train", chunk_rows):
+        X = _standardize(scaler, X)
+        Z = X @ W.T + b
+        Z_max = Z.max(axis=1, keepdims=True)
+        log_norm = Z_max[:, 0] + np.log(np.exp(Z - Z_max).sum(axis=1))
+        target = np.searchsorted(classes, y)
+        loss += (log_norm - Z[np.arange(len(y)), target]).sum()
+        P = np.exp(Z - log_norm[:, None])
+        P[np.arange(len(y)), target] -= 1.0
+        grad_W += P.T @ X
+        grad_b += P.sum(axis=0)
+    l2 = 1.0 / (C * n_rows)
+    loss = loss / n_rows + 0.5 * l2 * (W * W).sum()
+    grad_W = grad_W / n_rows + l2 * W
+    return loss, np.concatenate([grad_W.ravel(), grad_b / n_rows])
+
+
+def fit_logistic(path, chunk_rows=CHUNK_ROWS, C=1.0, max_iter=1000, tol=1e-4):
+    """Pipeline(scaler, LogisticRegression) fitted out of core; equivalent to the notebook's in-memory fit."""
+    from scipy import optimize
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    scaler, classes, n_rows, _ = fit_scaler(path, chunk_rows)
+    n_classes, n_features = len(classes), scaler.n_features_in_
+    result = optimize.minimize(
+        _loss_gradient, np.zeros(n_classes * (n_features + 1)), method="L-BFGS-B", jac=True,
+        args=(path, scaler, classes, n_rows, C, chunk_rows),
+        options={"maxiter": max_iter, "maxls": 50, "gtol": tol, "ftol": 64 * np.finfo(float).eps},
+    )
+    model = LogisticRegression(C=C, random_state=42, max_iter=max_iter)
+    model.coef_ = result.x[: n_classes * n_features].reshape(n_classes, n_features)
+    model.intercept_ = result.x[n_classes * n_features:]
+    model.classes_ = classes
+    model.n_features_in_ = n_features
+    model.n_iter_ = np.array([result.nit])
+    return Pipeline(steps=[('scaler', scaler), ('classifier', model)])
+
+
+# ---------------------- MLP ----------------------
+def _stream_accuracy(model, path, part, chunk_rows):
+    correct = total = 0
+    for features, X, y in iter_split(path, part, chunk_rows):
+        correct += int((model.predict(_frame(features, X)) == y).sum())
+        total += len(y)
+    return correct / total
+
+
+def fit_mlp(path, chunk_rows=CHUNK_ROWS, max_epochs=200, n_iter_no_change=10, tol=1e-4, verbose=False, **params):
+    """Pipeline(scaler, MLPClassifier) trained with partial_fit over the chunks, with epoch-level early stopping."""
+    if max_epochs < 1:
+        raise ValueError(f"max_epochs must be at least 1, got {max_epochs}.")
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+
+    scaler, classes, _, _ = fit_scaler(path, chunk_rows, validation=True)
+    settings = {'activation': 'tanh', 'alpha': 0.01, 'hidden_layer_sizes': (50, 25), 'random_state': 42, **params}
+    mlp = MLPClassifier(**settings)
+    model = Pipeline(steps=[('scaler', scaler), ('classifier', mlp)])
+    best_score, best_mlp, stale = -np.inf, None, 0
+    for epoch in range(max_epochs):
+        for _, X, y in iter_split(path, "train", chunk_rows, validation=True):
+            mlp.partial_fit(_standardize(scaler, X), y, classes=classes)
+        score = _stream_accuracy(model, path, "validation", chunk_rows)
+        if verbose:
+            print(f"epoch {epoch + 1}: validation accuracy {score:.4f}")
+        if score > best_score + tol:
+            best_score, best_mlp, stale = score, copy.deepcopy(mlp), 0
+        else:
+            stale += 1
+            if stale >= n_iter_no_change:
+                break
+    best_mlp.n_iter_ = epoch + 1
+    best_mlp.best_validation_score_ = best_score
+    return Pipeline(steps=[('scaler', scaler), ('classifier', best_mlp)])
+
+
+def fit_streaming(model, path, chunk_rows=CHUNK_ROWS, **kwargs):
+    if model == "lr":
+        return fit_logistic(path, chunk_rows, **kwargs)
+    if model == "mlp":
+        return fit_mlp(path, chunk_rows, **kwargs)
+    raise ValueError(f"model must be one of {MODELS}.")
+
+
+# ---------------------- PARITY ----------------------
+def fit_in_memory(model, path):
+    """The notebook's in-memory pipeline, fitted on the same training rows (the reference for `parity`)."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    parts = list(iter_split(path, "train", 10 ** 9))
+    X = _frame(parts[0][0], np.concatenate([X for _, X, _ in parts]))
+    y = np.concatenate([y for _, _, y in parts])
+    if model == "lr":
+        classifier = LogisticRegression(random_state=42, max_iter=1000)
+    else:
+        classifier = MLPClassifier(activation='tanh', alpha=0.01, hidden_layer_sizes=(50, 25), random_state=42,
+                                   max_iter=500, early_stopping=True)
+    return Pipeline(steps=[('scaler', StandardScaler()), ('classifier', classifier)]).fit(X, y)
+
+
+def _peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def parity(path, models=MODELS, chunk_rows=CHUNK_ROWS):
+    """Streamed vs in-memory fit per model: test accuracy, prediction agreement, time and peak RSS.
+
+    The streamed fits run first, so the peak RSS after them is theirs; the in-memory peak comes after.
+    """
+    test = list(iter_split(path, "test", chunk_rows))
+    X_test = _frame(test[0][0], np.concatenate([X for _, X, _ in test]))
+    y_test = np.concatenate([y for _, _, y in test])
+    rows, fitted = [], {}
+    for mode in ("streamed", "in_memory"):
+        for model in models:
+            started = time.perf_counter()
+            fitted[mode, model] = (fit_streaming(model, path, chunk_rows) if mode == "streamed"
+                                   else fit_in_memory(model, path))
+            rows.append({
+                "model": model, "mode": mode, "seconds": time.perf_counter() - started,
+                "peak_rss_mb": _peak_mb(),
+                "test_accuracy": float((fitted[mode, model].predict(X_test) == y_test).mean()),
+            })
+            print(f"{model:<5} {mode:<10} {rows[-1]['seconds']:>8.1f} {rows[-1]['peak_rss_mb']:>8.0f} "
+                  f"{rows[-1]['test_accuracy']:>9.4f}", flush=True)
+    for model in models:
+        streamed, reference = fitted["streamed", model], fitted["in_memory", model]
+        agreement = (streamed.predict(X_test) == reference.predict(X_test)).mean()
+        gap = np.abs(streamed.predict_proba(X_test) - reference.predict_proba(X_test)).max()
+        print(f"{model:<5} predictions agree on {agreement:.2%} of the test rows; max probability gap {gap:.2g}")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Out-of-core training of the LR and MLP pipelines.")
+    parser.add_argument("command", choices=("train", "parity"))
+    parser.add_argument("--data", default=None, help="CSV or Parquet file in the preprocessed layout.")
+    parser.add_argument("--model", default=",".join(MODELS), help="lr, mlp or both (parity).")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--rows", type=int, default=500_000, help="Rows of the generated cohort used when --data is not given.")
+    parser.add_argument("--out", default=None, help="train: folder for the four app artifacts.")
+    parser.add_argument("--data-dir", default=None, help="train: Dataset folder for the feature and target encoders.")
+    args = parser.parse_args(argv)
+    models = args.model.split(",")
+
+    with tempfile.TemporaryDirectory(prefix="hd-streaming-") as tmp:
+        data = args.data
+        if data is None:
+            import sys
+
+            sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "STREAMLIT"))
+            from synthetic_cohort import write_cohort
+
+            data = Path(tmp) / "cohort.parquet"
+            write_cohort(data, args.rows, preprocessed=True)
+
+        if args.command == "parity":
+            print(f"{'model':<5} {'mode':<10} {'seconds':>8} {'peak MB':>8} {'test acc':>9}")
+            parity(data, models, args.chunk_rows)
+            return 0
+
+        if len(models) != 1:
+            parser.error("train takes a single --model")
+        started = time.perf_counter()
+        pipeline = fit_streaming(models[0], data, args.chunk_rows)
+        print(f"Trained {models[0]} out of core in {time.perf_counter() - started:.1f}s (peak RSS {_peak_mb():.0f} MB)")
+        if args.out:
+            data_dir = args.data_dir or (synthetic_dataset(tmp, 1000) if args.data is None else None)
+            print(f"Artifacts written to {write_artifacts(pipeline, pipeline[0].feature_names_in_, args.out, data_dir)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
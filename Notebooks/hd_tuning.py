@@ -0,0 +1,256 @@
+"""Successive-halving hyperparameter search for the training notebooks.
+
+The notebooks tune with exhaustive GridSearchCV: every candidate is fitted
+on every fold of the full training split (450 fits for DT_Training). Here
+each notebook grid runs through sklearn's HalvingGridSearchCV instead:
+all candidates start on a small sample of the training split, and only the
+best third of each round moves on to three times as many rows, until the
+survivors train on the whole split. XGBoost candidates stop adding trees
+once a held-out tenth of their training rows stops improving
+(`EarlyStoppingXGBClassifier`); the MLP already uses early stopping.
+
+`compare` runs both searches on the same split and folds. For each one it
+reports the wall-clock time, the best CV score and parameters, and the
+held-out accuracy of the refitted best model, so a cheaper search can be
+shown to land on equally good parameters.
+
+    from hd_tuning import tune
+    search = tune("xgb", X_train, y_train)        # a fitted HalvingGridSearchCV
+    search.best_params_
+
+    python Notebooks/hd_tuning.py compare --model dt,xgb [--synthetic 48800] [--n-jobs -1]
+    python Notebooks/hd_tuning.py tune --model mlp
+"""
+import argparse
+import json
+import time
+
+import xgboost as xgb
+
+from hd_data import load_xy, synthetic_dataset, train_val_test_split
+from hd_shared import share
+
+MODELS = ("dt", "rf", "xgb", "mlp")
+HALVING_FACTOR = 3
+FLOAT32_MODELS = ("dt", "rf", "xgb")  # trees and XGBoost convert their input to float32 before fitting
+
+
+class EarlyStoppingXGBClassifier(xgb.XGBClassifier):
+    """XGBClassifier that holds out `validation_fraction` of its training rows and stops adding trees when
+    their mlogloss has not improved for `early_stopping_rounds` rounds, like MLPClassifier(early_stopping=True).
+
+    `n_estimators` becomes an upper bound, and prediction uses the best iteration.
+    """
+
+    def __init__(self, *, validation_fraction=0.1, early_stopping_rounds=10, **kwargs):
+        super().__init__(early_stopping_rounds=early_stopping_rounds, **kwargs)
+        self.validation_fraction = validation_fraction
+
+    def get_xgb_params(self):
+        params = super().get_xgb_params()
+        params.pop("validation_fraction", None)  # a wrapper setting, not a booster parameter
+        return params
+
+    def fit(self, X, y, **kwargs):
+        from sklearn.model_selection import train_test_split
+
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X, y, test_size=self.validation_fraction, random_state=self.random_state, stratify=y
+        )
+        return super().fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False, **kwargs)
+
+
+# ---------------------- NOTEBOOK GRIDS ----------------------
+def search_space(model, n_jobs=1):
+    """(estimator, param_grid, cv) as in `<MODEL>_Training.ipynb`, with the estimator's own threads set to `n_jobs`."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+
+    if model == "dt":
+        return DecisionTreeClassifier(random_state=42), {
+            'criterion': ['gini', 'entropy'],
+            'max_depth': [3, 5, 7, 10, None],
+            'min_samples_split': [2, 5, 10],
+            'min_samples_leaf': [1, 2, 4],
+        }, 5
+    if model == "rf":
+        return RandomForestClassifier(random_state=42, n_jobs=n_jobs), {
+            'n_estimators': [100, 200],
+            'max_depth': [10, 20, None],
+            'min_samples_split': [2, 5],
+            'min_samples_leaf': [1, 2],
+            'bootstrap': [True],
+        }, 5
+    if model == "xgb":
+        return xgb.XGBClassifier(objective='multi:softmax', eval_metric='mlogloss', random_state=42,
+                                 n_jobs=n_jobs), {
+            'max_depth': [3, 5],
+            'n_estimators': [100, 200],
+            'learning_rate': [0.1, 0.01],
+            'subsample': [0.8, 1.0],
+            'colsample_bytree': [0.8, 1.0],
+        }, 3
+    if model == "mlp":
+        return Pipeline(steps=[
+            ('scaler', StandardScaler()),
+            ('classifier', MLPClassifier(random_state=42, max_iter=500, early_stopping=True,
+                                         n_iter_no_change=10, validation_fraction=0.1)),
+        ]), {
+            'classifier__hidden_layer_sizes': [(50,), (100,), (50, 25)],
+            'classifier__alpha': [0.0001, 0.001, 0.01],
+            'classifier__activation': ['relu', 'tanh'],
+        }, 3
+    raise ValueError(f"model must be one of {MODELS}.")
+
+
+def fit_dtype(model):
+    """The dtype `model` fits on; sharing the training split in it saves each worker a conversion copy."""
+    return "float32" if model in FLOAT32_MODELS else "float64"
+
+
+def _early_stopping(estimator):
+    if type(estimator) is xgb.XGBClassifier:
+        return EarlyStoppingXGBClassifier(**estimator.get_params())
+    return estimator
+
+
+def tune(model, X_train, y_train, n_jobs=-1, factor=HALVING_FACTOR, random_state=42, verbose=0):
+    """Fitted HalvingGridSearchCV over the notebook grid for `model` ('dt', 'rf', 'xgb' or 'mlp').
+
+    The rows are the budget: the first round gets the fewest rows that still
+    let the last round use the whole split, and each later round `factor`
+    times as many. Candidates' own threads are pinned to 1 so the search's
+    `n_jobs` workers do not oversubscribe the cores.
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV, StratifiedKFold
+
+    estimator, grid, cv = search_space(model, n_jobs=1)
+    search = HalvingGridSearchCV(
+        _early_stopping(estimator), grid, factor=factor, resource='n_samples', min_resources='exhaust',
+        cv=StratifiedKFold(cv, shuffle=True, random_state=random_state), scoring='accuracy',
+        n_jobs=n_jobs, random_state=random_state, verbose=verbose,
+    )
+    return search.fit(X_train, y_train)
+
+
+def grid_search(model, X_train, y_train, n_jobs=-1, random_state=42, verbose=0):
+    """The notebook's exhaustive GridSearchCV for `model`, on the same folds as `tune` (the baseline)."""
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
+    estimator, grid, cv = search_space(model, n_jobs=1)
+    search = GridSearchCV(estimator, grid, cv=StratifiedKFold(cv, shuffle=True, random_state=random_state),
+                          scoring='accuracy', n_jobs=n_jobs, verbose=verbose)
+    return search.fit(X_train, y_train)
+
+
+def _fits(search, n_train):
+    """(fits, training rows summed over all fits); each fold trains on (k - 1) / k of a round's rows."""
+    k = search.n_splits_
+    if hasattr(search, "n_candidates_"):
+        rounds = list(zip(search.n_candidates_, search.n_resources_))
+    else:
+        rounds = [(len(search.cv_results_["params"]), n_train)]
+    return sum(c for c, _ in rounds) * k, int(sum(c * r for c, r in rounds) * (k - 1))
+
+
+def grid_rank(grid, params):
+    """(rank, mean, std) of `params` among the exhaustive search's CV results."""
+    results = grid.cv_results_
+    i = results["params"].index(params)
+    return int(results["rank_test_score"][i]), results["mean_test_score"][i], results["std_test_score"][i]
+
+
+def compare(models, data_dir=None, n_jobs=-1):
+    """Runs GridSearchCV and the halving search per model on the notebooks' 80/20 split; returns one row per search."""
+    X, y = load_xy(data_dir)
+    X_train, X_test, y_train, y_test = train_val_test_split(X, y, validation=False)
+    rows = []
+    for model in models:
+        searches = {}
+        with share(X_train, y_train, fit_dtype(model)) as train:
+            for method, run in (("grid", grid_search), ("halving", tune)):
+                started = time.perf_counter()
+                searches[method] = run(model, train.X, train.y, n_jobs=n_jobs)
+                rows.append(_row(model, method, searches[method], time.perf_counter() - started, len(train.y),
+                                 X_test, y_test))
+                print(_format_row(rows[-1]), flush=True)
+        # Where the halving pick lands in the full grid: within one std of the best means equally good.
+        rank, mean, std = grid_rank(searches["grid"], searches["halving"].best_params_)
+        rows[-1]["grid_rank"], rows[-1]["grid_cv_accuracy"], rows[-1]["grid_cv_std"] = rank, mean, std
+        print(f"      halving pick ranks {rank} of {len(searches['grid'].cv_results_['params'])} in the grid "
+              f"(CV {mean:.4f} ± {std:.4f}; best {searches['grid'].best_score_:.4f})", flush=True)
+    return rows
+
+
+def _row(model, method, search, seconds, n_train, X_test, y_test):
+    fits, rows_fitted = _fits(search, n_train)
+    return {
+        "model": model,
+        "method": method,
+        "seconds": seconds,
+        "fits": fits,
+        "rows_fitted": rows_fitted,
+        "cv_accuracy": search.best_score_,
+        "test_accuracy": search.score(X_test, y_test),
+        "best_params": search.best_params_,
+    }
+
+
+def _format_row(row):
+    params = ", ".join(f"{k.split('__')[-1]}={v}" for k, v in row["best_params"].items())
+    rows_fitted = f"{row['rows_fitted'] / 1e6:.1f}M"
+    return (f"{row['model']:<5} {row['method']:<8} {row['seconds']:>8.1f} {row['fits']:>5} {rows_fitted:>7} "
+            f"{row['cv_accuracy']:>7.4f} {row['test_accuracy']:>7.4f}  {params}")
+
+
+def _models(text):
+    models = [m for m in text.split(",") if m]
+    if text == "all":
+        return list(MODELS)
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown model(s) {sorted(unknown)}; choose from {', '.join(MODELS)} or all")
+    return models
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Successive-halving search over the notebook grids.")
+    parser.add_argument("command", choices=("tune", "compare"))
+    parser.add_argument("--model", type=_models, default=list(MODELS), help="Comma-separated subset of dt,rf,xgb,mlp.")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--synthetic", type=int, default=None, metavar="ROWS",
+                        help="Use a generated dataset of this many rows instead of ../Dataset.")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--output", default=None, help="Write the rows as JSON here.")
+    args = parser.parse_args(argv)
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="hd-tuning-") as tmp:
+        data_dir = synthetic_dataset(tmp, args.synthetic) if args.synthetic else args.data_dir
+        print(f"{'model':<5} {'method':<8} {'seconds':>8} {'fits':>5} {'rows':>7} {'cv acc':>7} {'test':>7}  best parameters")
+        if args.command == "compare":
+            rows = compare(args.model, data_dir, args.n_jobs)
+        else:
+            X, y = load_xy(data_dir)
+            X_train, X_test, y_train, y_test = train_val_test_split(X, y, validation=False)
+            rows = []
+            for model in args.model:
+                with share(X_train, y_train, fit_dtype(model)) as train:
+                    started = time.perf_counter()
+                    search = tune(model, train.X, train.y, n_jobs=args.n_jobs)
+                rows.append(_row(model, "halving", search, time.perf_counter() - started, len(X_train),
+                                 X_test, y_test))
+                print(_format_row(rows[-1]), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
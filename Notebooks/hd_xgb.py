@@ -0,0 +1,315 @@
+"""XGBoost training fast path for the training notebooks.
+
+`XGB_Training.ipynb` tunes `XGBClassifier` with GridSearchCV (32
+candidates x 3 folds at a fixed `n_estimators`). Each of those fits
+re-quantizes the training rows into a fresh internal matrix. Here the
+training and validation rows are quantized once into `QuantileDMatrix`
+objects (histogram method), and every candidate trains on them with the
+native API. A candidate stops once the validation mlogloss (the notebooks'
+80/10/10 validation split) has not improved for `early_stopping_rounds`
+rounds. The grid keeps the notebook's values, except that `n_estimators`
+becomes a cap of 200 rounds instead of a dimension.
+
+For cohorts larger than RAM, `train_external` streams a Parquet or CSV
+file in the `pre_processed_dataset.csv` layout, batch by batch, into an
+`ExtMemQuantileDMatrix`. Only the quantized pages, cached on disk, are
+kept. The first `holdout_rows` rows are held in memory as the validation
+set, so shuffle a file that is sorted (by stage, site, date, ...) first.
+
+`to_classifier` wraps a trained Booster as an `XGBClassifier`, so it can be
+saved as the app's `huntington_model_pipeline.pkl`.
+
+    from hd_xgb import search, to_classifier
+    results, booster = search(X_train, y_train, X_val, y_val)
+    model = to_classifier(booster)
+
+    python Notebooks/hd_xgb.py bench [--synthetic 48800] [--skip-grid]   # time and peak RSS vs the notebook
+    python Notebooks/hd_xgb.py external --data cohort.parquet [--batch-rows 500000] [--out model.pkl]
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import xgboost as xgb
+
+from hd_data import BATCH_ROWS, TARGET_COLUMN, iter_batches, load_xy, synthetic_dataset, train_val_test_split
+
+# XGB_Training.ipynb's grid; n_estimators is the round cap for early stopping rather than a grid dimension.
+XGB_GRID = {
+    'max_depth': [3, 5],
+    'learning_rate': [0.1, 0.01],
+    'subsample': [0.8, 1.0],
+    'colsample_bytree': [0.8, 1.0],
+}
+MAX_ROUNDS = 200
+EARLY_STOPPING_ROUNDS = 20
+MAX_BIN = 256
+HOLDOUT_ROWS = 50_000
+
+
+def booster_params(num_class, nthread=-1, **params):
+    """Native-API parameters matching the notebook's classifier (softprob so probabilities are available)."""
+    return {
+        'objective': 'multi:softprob',
+        'num_class': num_class,
+        'eval_metric': 'mlogloss',
+        'tree_method': 'hist',
+        'max_bin': MAX_BIN,
+        'seed': 42,
+        'nthread': nthread,
+        **params,
+    }
+
+
+def quantized(X, y, ref=None, max_bin=MAX_BIN):
+    """QuantileDMatrix of (X, y); pass the training matrix as `ref` for validation data so both share bin edges."""
+    return xgb.QuantileDMatrix(X, label=np.asarray(y), ref=ref, max_bin=max_bin)
+
+
+def train(params, dtrain, dval=None, num_boost_round=MAX_ROUNDS, early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    """Booster trained on `dtrain`; with `dval`, stops once its mlogloss stalls and keeps `best_iteration`."""
+    return xgb.train(params, dtrain, num_boost_round=num_boost_round,
+                     evals=[(dval, "validation")] if dval is not None else (),
+                     early_stopping_rounds=early_stopping_rounds if dval is not None else None, verbose_eval=False)
+
+
+def _accuracy(booster, dmatrix, y):
+    proba = booster.predict(dmatrix, iteration_range=(0, booster.best_iteration + 1))
+    return float((proba.argmax(axis=1) == np.asarray(y)).mean())
+
+
+def search(X_train, y_train, X_val, y_val, grid=XGB_GRID, nthread=-1, num_boost_round=MAX_ROUNDS):
+    """(results, best_booster): every grid candidate trained on one shared quantized matrix, ranked by
+    validation accuracy like the notebook's `scoring='accuracy'`."""
+    num_class = int(np.max(y_train)) + 1
+    dtrain = quantized(X_train, y_train)
+    dval = quantized(X_val, y_val, ref=dtrain)
+    results, best = [], None
+    for values in itertools.product(*grid.values()):
+        candidate = dict(zip(grid, values))
+        started = time.perf_counter()
+        booster = train(booster_params(num_class, nthread, **candidate), dtrain, dval, num_boost_round)
+        results.append({
+            "params": candidate,
+            "rounds": booster.best_iteration + 1,
+            "val_mlogloss": booster.best_score,
+            "val_accuracy": _accuracy(booster, dval, y_val),
+            "seconds": time.perf_counter() - started,
+        })
+        if best is None or results[-1]["val_accuracy"] > best[0]:
+            best = (results[-1]["val_accuracy"], booster)
+    return results, best[1]
+
+
+def to_classifier(booster):
+    """XGBClassifier backed by `booster`, trimmed to its best iteration (predict, predict_proba, pickling)."""
+    if booster.attr("best_iteration") is not None:
+        booster = booster[: booster.best_iteration + 1]
+    model = xgb.XGBClassifier()
+    model.load_model(booster.save_raw("ubj"))
+    return model
+
+
+# ---------------------- EXTERNAL MEMORY ----------------------
+class CohortBatches(xgb.DataIter):
+    """Feeds a cohort file to XGBoost one batch at a time, skipping the first `skip_rows` rows (the holdout)."""
+
+    def __init__(self, path, batch_rows=BATCH_ROWS, skip_rows=0, cache_prefix=None):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.skip_rows = skip_rows
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix, release_data=True)
+
+    def reset(self):
+        self._batches = None
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = _skip_rows(iter_batches(self.path, self.batch_rows), self.skip_rows)
+        for features, X, y in self._batches:
+            input_data(data=X, label=y, feature_names=features)
+            return True
+        return False
+
+
+def _skip_rows(batches, rows):
+    """`batches` without their first `rows` rows."""
+    for features, X, y in batches:
+        if rows >= len(y):
+            rows -= len(y)
+            continue
+        yield features, X[rows:], y[rows:]
+        rows = 0
+
+
+def holdout(path, rows=HOLDOUT_ROWS, batch_rows=BATCH_ROWS):
+    """(features, X, y) of the first `rows` rows of the file, the external-memory validation set.
+
+    These are the file's leading rows, not a random sample: shuffle a file sorted by stage, site or date first,
+    or the validation set (and early stopping) is biased.
+    """
+    parts, labels, taken, features = [], [], 0, None
+    for features, X, y in iter_batches(path, min(batch_rows, rows)):
+        parts.append(X[: rows - taken])
+        labels.append(y[: rows - taken])
+        taken += len(parts[-1])
+        if taken >= rows:
+            break
+    return features, np.concatenate(parts), np.concatenate(labels)
+
+
+def train_external(path, params=None, batch_rows=BATCH_ROWS, holdout_rows=HOLDOUT_ROWS, cache_dir=None,
+                   num_boost_round=MAX_ROUNDS, nthread=-1):
+    """Booster trained from a cohort file through external memory, early-stopped on its first `holdout_rows` rows
+    (see `holdout`). Raises ValueError when the file has no rows beyond the holdout."""
+    features, X_val, y_val = holdout(path, holdout_rows, batch_rows)
+    if next(_skip_rows(iter_batches(path, batch_rows), holdout_rows), None) is None:
+        raise ValueError(f"{path} has only {len(y_val):,} rows, all of them in the {holdout_rows:,}-row holdout; "
+                         "pass a smaller holdout_rows.")
+    num_class = int(y_val.max()) + 1
+    with tempfile.TemporaryDirectory(prefix="hd-xgb-pages-", dir=cache_dir) as pages:
+        batches = CohortBatches(path, batch_rows, skip_rows=holdout_rows, cache_prefix=os.path.join(pages, "cohort"))
+        dtrain = xgb.ExtMemQuantileDMatrix(batches, max_bin=MAX_BIN, nthread=nthread)
+        dval = xgb.QuantileDMatrix(X_val, label=y_val, ref=dtrain, feature_names=features)
+        booster = train(booster_params(num_class, nthread, **(params or {})), dtrain, dval, num_boost_round)
+        del dtrain, dval  # release the page files before their folder is removed
+    return booster
+
+
+# ---------------------- BENCHMARK ----------------------
+# The notebook's final model; single-fit cases get its 100 rounds as their cap so time per fit is comparable.
+NOTEBOOK_FINAL = {'colsample_bytree': 0.8, 'learning_rate': 0.1, 'max_depth': 3, 'n_estimators': 100, 'subsample': 0.8}
+NOTEBOOK_FINAL_NATIVE = {k: v for k, v in NOTEBOOK_FINAL.items() if k != 'n_estimators'}
+
+
+def _run_case(case, data_dir, data_file, nthread):
+    """Runs one benchmark case in this process; returns its result with the peak RSS."""
+    started = time.perf_counter()
+    result = {"case": case}
+    if case == "external":
+        booster = train_external(data_file, NOTEBOOK_FINAL_NATIVE, nthread=nthread,
+                                 num_boost_round=NOTEBOOK_FINAL["n_estimators"])
+        features, X_val, y_val = holdout(data_file)
+        result["rounds"] = booster.best_iteration + 1
+        result["accuracy"] = _accuracy(booster, xgb.DMatrix(X_val, feature_names=features), y_val)
+    elif case == "in_memory":
+        import pandas as pd
+
+        df = pd.read_parquet(data_file) if str(data_file).endswith((".parquet", ".pq")) else pd.read_csv(data_file)
+        X, y = df.drop(columns=TARGET_COLUMN), df[TARGET_COLUMN]
+        model = xgb.XGBClassifier(objective='multi:softmax', eval_metric='mlogloss', random_state=42, n_jobs=nthread,
+                                  **NOTEBOOK_FINAL)
+        model.fit(X.iloc[HOLDOUT_ROWS:], y.iloc[HOLDOUT_ROWS:])
+        result["rounds"] = NOTEBOOK_FINAL["n_estimators"]
+        result["accuracy"] = float((model.predict(X.iloc[:HOLDOUT_ROWS]) == y.iloc[:HOLDOUT_ROWS]).mean())
+    else:
+        X, y = load_xy(data_dir)
+        X_train, X_val, X_test, y_train, y_val, y_test = train_val_test_split(X, y)
+        if case == "notebook_grid":
+            from sklearn.model_selection import GridSearchCV
+
+            grid = GridSearchCV(
+                xgb.XGBClassifier(objective='multi:softmax', eval_metric='mlogloss', random_state=42, n_jobs=nthread),
+                {**XGB_GRID, 'n_estimators': [100, 200]}, cv=3, scoring='accuracy',
+            ).fit(X_train, y_train)
+            result["best_params"] = grid.best_params_
+            result["accuracy"] = float(grid.score(X_test, y_test))
+        elif case == "fast_grid":
+            results, booster = search(X_train, y_train, X_val, y_val, nthread=nthread)
+            result["best_params"] = max(results, key=lambda r: r["val_accuracy"])["params"]
+            result["rounds"] = booster.best_iteration + 1
+            result["accuracy"] = float((to_classifier(booster).predict(X_test) == np.asarray(y_test)).mean())
+        elif case == "notebook_fit":
+            model = xgb.XGBClassifier(objective='multi:softmax', eval_metric='mlogloss', random_state=42,
+                                      n_jobs=nthread, **NOTEBOOK_FINAL).fit(X_train, y_train)
+            result["rounds"] = NOTEBOOK_FINAL["n_estimators"]
+            result["accuracy"] = float(model.score(X_test, y_test))
+        elif case == "fast_fit":
+            dtrain = quantized(X_train, y_train)
+            booster = train(booster_params(int(y.max()) + 1, nthread, **NOTEBOOK_FINAL_NATIVE), dtrain,
+                            quantized(X_val, y_val, ref=dtrain), num_boost_round=NOTEBOOK_FINAL["n_estimators"])
+            result["rounds"] = booster.best_iteration + 1
+            result["accuracy"] = float((to_classifier(booster).predict(X_test) == np.asarray(y_test)).mean())
+        else:
+            raise ValueError(f"unknown case {case}")
+    result["seconds"] = time.perf_counter() - started
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def run_case(case, data_dir=None, data_file=None, nthread=-1):
+    """`_run_case` in a fresh interpreter, so each case's peak RSS is its own."""
+    command = [sys.executable, __file__, "_case", case, "--nthread", str(nthread)]
+    if data_dir:
+        command += ["--data-dir", str(data_dir)]
+    if data_file:
+        command += ["--data", str(data_file)]
+    out = subprocess.run(command, check=True, capture_output=True, text=True, cwd=Path(__file__).resolve().parent)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="XGBoost fast path: cached quantized matrices, early stopping, "
+                                                 "external memory.")
+    parser.add_argument("command", choices=("bench", "external", "_case"))
+    parser.add_argument("case", nargs="?", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--data", default=None, help="Cohort file (preprocessed layout) for external memory.")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="ROWS",
+                        help="bench: generated dataset of this many rows instead of ../Dataset.")
+    parser.add_argument("--cohort-rows", type=int, default=2_000_000,
+                        help="bench: rows of the generated cohort for the in-memory vs external-memory cases.")
+    parser.add_argument("--skip-grid", action="store_true", help="bench: skip the notebook GridSearchCV (slowest).")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    parser.add_argument("--nthread", type=int, default=-1)
+    parser.add_argument("--out", default=None, help="external: save the model as a pickled XGBClassifier.")
+    args = parser.parse_args(argv)
+
+    if args.command == "_case":
+        print(json.dumps(_run_case(args.case, args.data_dir, args.data, args.nthread), default=str))
+        return 0
+
+    if args.command == "external":
+        started = time.perf_counter()
+        booster = train_external(args.data, batch_rows=args.batch_rows, nthread=args.nthread)
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"Trained {booster.best_iteration + 1} rounds in {time.perf_counter() - started:.1f}s "
+              f"(peak RSS {peak_mb:.0f} MB)")
+        if args.out:
+            import joblib
+
+            joblib.dump(to_classifier(booster), args.out)
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="hd-xgb-") as tmp:
+        data_dir = synthetic_dataset(tmp, args.synthetic) if args.synthetic else args.data_dir
+        cohort = args.data
+        if cohort is None:
+            sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "STREAMLIT"))
+            from synthetic_cohort import write_cohort
+
+            cohort = Path(tmp) / "cohort.parquet"
+            write_cohort(cohort, args.cohort_rows, preprocessed=True)
+        cases = [("notebook_fit", "fast_fit")] + ([] if args.skip_grid else [("notebook_grid", "fast_grid")])
+        cases.append(("in_memory", "external"))
+        print(f"{'case':<14} {'seconds':>8} {'peak MB':>8} {'rounds':>7} {'accuracy':>9}  notes")
+        for pair in cases:
+            for case in pair:
+                r = run_case(case, data_dir, cohort, args.nthread)
+                notes = json.dumps(r.get("best_params")) if "best_params" in r else ""
+                print(f"{case:<14} {r['seconds']:>8.1f} {r['peak_rss_mb']:>8.0f} {str(r.get('rounds', '-')):>7} "
+                      f"{r['accuracy']:>9.4f}  {notes}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
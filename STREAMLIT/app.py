@@ -1,13 +1,20 @@
 import streamlit as st
-import pandas as pd
-import joblib
-import json
+import os
+import threading
 import warnings
+import weakref
 from streamlit_option_menu import option_menu
-import requests  # For Lottie
-from streamlit_lottie import st_lottie  # For Lottie
-from streamlit_extras.add_vertical_space import add_vertical_space # Import for home page
 from pathlib import Path
+from predictor import (
+    Predictor, load_artifacts, artifact_fingerprint, FORM_BOUNDS, CATEGORICAL_CODES, CONSTANT_FEATURES,
+    INPUT_FEATURES, STAGES,
+)
+from prediction_cache import PredictionCache, canonical_inputs
+from artifact_store import fetch_artifacts
+from assets import build_assets, image_url, picture_html
+from what_if import SWEEP_FEATURES, run_sweep
+from metrics import span, start_file_exporter, timed
+from stage_render import LIGHT_RENDER, NEXT_STEPS, STAGE_NARRATIVE, gauge_figure, gauge_svg, result_html
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -215,31 +222,22 @@ div[data-testid="stFormSubmitButton"] > button:hover {
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # ---------------------- MODEL LOADING  ----------------------
-import zipfile
-from io import BytesIO
-
 DEMO_MODE = False
 
 @st.cache_resource
-def load_models_from_zip():
-    """Downloads and loads ML model + encoders from Google Drive ZIP (Streamlit Secrets)."""
-    try:
-        zip_url = st.secrets["model"]["zip_url"]
-        response = requests.get(zip_url)
-        response.raise_for_status()
-
-        # Extract model artifacts to a folder
-        with zipfile.ZipFile(BytesIO(response.content)) as z:
-            z.extractall("models")
+def fetch_model_dir():
+    """Folder with the model artifacts: $HD_MODELS_DIR, or the ZIP from Streamlit Secrets via the on-disk artifact cache."""
+    if os.environ.get("HD_MODELS_DIR"):
+        return Path(os.environ["HD_MODELS_DIR"])
+    model_secrets = st.secrets["model"]
+    return fetch_artifacts(model_secrets["zip_url"], expected_sha256=model_secrets.get("sha256"))
 
-        model = joblib.load("models/huntington_model_pipeline.pkl")
-        feature_encoders = joblib.load("models/feature_encoders.pkl")
-        target_encoder = joblib.load("models/target_encoder.pkl")
 
-        with open("models/model_columns.json") as f:
-            model_columns = json.load(f)
-
-        return model, target_encoder, feature_encoders, model_columns
+@st.cache_resource
+def load_models_from_zip():
+    """Downloads (once, into the artifact cache) and loads ML model + encoders."""
+    try:
+        return load_artifacts(fetch_model_dir())
 
     except Exception as e:
         global DEMO_MODE
@@ -249,41 +247,286 @@ def load_models_from_zip():
         return None, None, None, None
 
 
-with st.spinner("⏳ Loading ML model... Please wait."):
-    model, target_encoder, feature_encoders, model_columns = load_models_from_zip()
+@st.cache_resource
+def build_predictor(_artifacts):
+    """Wraps the loaded artifacts in the vectorized inference engine (built once per process)."""
+    version = artifact_fingerprint(fetch_model_dir()) if _artifacts[0] is not None else None
+    predictor = Predictor.from_artifacts(_artifacts, version=version)
+    if os.environ.get("HD_COMPILED_MODEL") == "1":
+        try:
+            predictor.use_compiled()
+        except TypeError as e:
+            print(f"Compiled model unavailable, using the original pipeline: {e}")
+    return predictor
+
+
+@st.cache_resource
+def get_prediction_cache():
+    """Process-wide prediction cache shared by all sessions; HD_PREDICTION_CACHE_DB adds a disk tier."""
+    return PredictionCache(
+        maxsize=int(os.environ.get("HD_PREDICTION_CACHE_SIZE", 4096)),
+        ttl=float(os.environ.get("HD_PREDICTION_CACHE_TTL", 3600)),
+        disk_path=os.environ.get("HD_PREDICTION_CACHE_DB"),
+    )
+
+
+model = model_columns = predictor = prediction_cache = None
+
+
+def load_prediction_engine():
+    """Loads the model when the prediction page first needs it, so other pages never import sklearn/xgboost."""
+    global DEMO_MODE, model, model_columns, predictor, prediction_cache
+    with st.spinner("⏳ Loading ML model... Please wait."), start_warm_up().lock:
+        model, target_encoder, feature_encoders, model_columns = load_models_from_zip()
+        predictor = build_predictor((model, target_encoder, feature_encoders, model_columns))
+        prediction_cache = get_prediction_cache()
+
+    # load_models_from_zip only runs once per process, so derive demo mode from the predictor on every rerun.
+    DEMO_MODE = predictor.demo
+
+
+def _warm_up_prediction_imports():
+    # pandas first: plotly imports it lazily from update_layout, and if the main thread is still initialising
+    # it plotly sees the half-built module ("partially initialized module 'pandas' has no attribute 'Series'").
+    # A plain import here waits for the other thread's import to finish.
+    import pandas  # noqa: F401
+    if not LIGHT_RENDER:
+        import plotly.graph_objects  # noqa: F401
+
+        # Builds plotly's validator tables and the four cached gauges before the first prediction.
+        for stage in STAGES:
+            gauge_figure(stage)
+    import joblib  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+    import sklearn.neural_network  # noqa: F401
+    try:
+        import xgboost  # noqa: F401
+    except ImportError:
+        pass
+
+
+class WarmUpThread(threading.Thread):
+    """Runs `_warm_up_prediction_imports` in the background.
+
+    `lock` is held until the imports finish, so `load_prediction_engine` waits for them instead of importing
+    the same modules concurrently. A failure is printed and kept in `error`.
+    """
+
+    def __init__(self):
+        super().__init__(name="hd-warm-up", daemon=True)
+        self.lock = threading.Lock()
+        self.error = None
+
+    def start(self):
+        self.lock.acquire()  # taken before the thread runs, so no caller can slip in ahead of the imports
+        super().start()
+
+    def run(self):
+        try:
+            _warm_up_prediction_imports()
+        except Exception as e:
+            self.error = e
+            print(f"Warm-up of the prediction imports failed: {e!r}")
+        finally:
+            self.lock.release()
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Imports the prediction page's heavy dependencies in a background thread, once per process.
+
+    Called after the script's own top-level imports. Also starts the HD_METRICS_FILE exporter when metrics
+    are enabled.
+    """
+    start_file_exporter()
+    thread = WarmUpThread()
+    thread.start()
+    return thread
+
+
+# ---------------------- BATCH COHORT SCORING ----------------------
+BATCH_CHUNK_SIZE = 5000
 
 
-def demo_predict_stage(row):
-    motor = row.get('Motor_Score', 0)
-    func = row.get('Functional_Capacity_Score', 100)
-    cog = row.get('Cognitive_Score', 100)
-    chorea = row.get('Chorea_Score', 0)
-    if motor < 30 and func >= 70 and cog >= 70:
-        return 'No Disease'
-    if motor < 45 and func >= 60 and cog >= 60:
-        return 'Early'
-    if motor < 80 and func >= 30:
-        return 'Middle'
-    return 'Severe'
+def iter_cohort_chunks(uploaded_file, chunksize=BATCH_CHUNK_SIZE):
+    """Yields DataFrames of at most `chunksize` rows from an uploaded CSV or Parquet file."""
+    import pandas as pd
+
+    if uploaded_file.name.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(uploaded_file)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(uploaded_file, chunksize=chunksize)
+
+
+def _category_values(values, codes):
+    """CATEGORICAL_CODES lookup with encode_row's rules: strings are mapped, numbers must be 0 or 1; NaN otherwise."""
+    import pandas as pd
+
+    if values.dtype.kind in 'biuf':
+        return values.where(values.isin((0, 1))).astype(float)
+    text = values.map(lambda v: isinstance(v, str)).astype(bool)
+    numbers = pd.to_numeric(values[~text], errors='coerce')
+    return pd.concat([
+        values[text].str.strip().str.lower().map(codes),
+        numbers.where(numbers.isin((0, 1))),
+    ]).reindex(values.index).astype(float)
+
+
+def validate_cohort_chunk(chunk):
+    """Returns a per-row rejection reason Series ('' for valid rows) and the numeric features."""
+    import pandas as pd
+
+    reasons = pd.Series('', index=chunk.index, dtype=object)
+    features = pd.DataFrame(index=chunk.index)
+
+    for col, (low, high) in FORM_BOUNDS.items():
+        if col not in chunk.columns:
+            reasons += f"missing column {col}; "
+            features[col] = float('nan')
+            continue
+        values = pd.to_numeric(chunk[col], errors='coerce')
+        bad = values.isna() | (values < low) | (values > high)
+        reasons = reasons.mask(bad, reasons + f"{col} not in [{low}, {high}]; ")
+        features[col] = values
+
+    for col, codes in CATEGORICAL_CODES.items():
+        if col not in chunk.columns:
+            reasons += f"missing column {col}; "
+            features[col] = float('nan')
+            continue
+        values = _category_values(chunk[col], codes)
+        reasons = reasons.mask(values.isna(), reasons + f"{col} not one of {sorted(codes)}; ")
+        features[col] = values
+
+    return reasons.str.rstrip('; '), features
+
+
+def score_cohort_chunk(chunk):
+    """Scores one chunk with a single batched prediction; invalid rows keep their rejection reason."""
+    reasons, features = validate_cohort_chunk(chunk)
+    valid = reasons == ''
+
+    result = chunk.copy()
+    result['Predicted_Stage'] = ''
+    result['Rejection_Reason'] = reasons
+    if valid.any():
+        result.loc[valid, 'Predicted_Stage'] = predictor.predict_batch(features[valid])
+    return result
+
+
+class ScoredCohort:
+    """Scored cohort CSV on disk for one uploaded file; the file is deleted on `discard` or when the session ends."""
+
+    def __init__(self, file_id, path, scored_rows, rejected_rows):
+        self.file_id = file_id
+        self.path = Path(path)
+        self.scored_rows = scored_rows
+        self.rejected_rows = rejected_rows
+        # Runs when the session state holding this object is dropped (or at interpreter exit).
+        self._finalizer = weakref.finalize(self, self.path.unlink, missing_ok=True)
+
+    def read(self):
+        return self.path.read_bytes()
+
+    def discard(self):
+        self._finalizer()
+
+
+def score_cohort_file(uploaded_file):
+    """Scores `uploaded_file` into a temporary CSV, streaming chunk by chunk, and returns a ScoredCohort."""
+    import tempfile
+
+    scored_rows = 0
+    rejected_rows = 0
+    progress = st.progress(0.0, text="Scoring cohort...")
+    total_size = max(uploaded_file.size, 1)
+
+    # Results are streamed to disk chunk by chunk so memory stays bounded by BATCH_CHUNK_SIZE.
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="") as out:
+        try:
+            for i, chunk in enumerate(iter_cohort_chunks(uploaded_file)):
+                result = score_cohort_chunk(chunk)
+                result.to_csv(out, header=(i == 0), index=False)
+                scored_rows += len(result)
+                rejected_rows += int((result['Rejection_Reason'] != '').sum())
+                progress.progress(min(uploaded_file.tell() / total_size, 1.0), text=f"Scored {scored_rows:,} rows...")
+        except Exception as e:
+            out.close()
+            Path(out.name).unlink(missing_ok=True)
+            st.error(f"Error while scoring cohort: {e}")
+            st.stop()
+
+    progress.progress(1.0, text="Scoring complete.")
+    return ScoredCohort(uploaded_file.file_id, out.name, scored_rows, rejected_rows)
+
+
+def show_batch_scoring():
+    st.header("Batch Cohort Scoring")
+    st.markdown(
+        "Upload a CSV or Parquet file with one visit per row and the columns "
+        f"{', '.join(list(FORM_BOUNDS) + list(CATEGORICAL_CODES))}. "
+        "Rows outside the form's valid ranges are returned with a rejection reason instead of a stage."
+    )
+
+    uploaded_file = st.file_uploader("Cohort file", type=["csv", "parquet"])
+    # One scored file per session: reruns (and the download click) reuse it until a different file is uploaded.
+    cohort = st.session_state.get("scored_cohort")
+    if cohort is not None and (uploaded_file is None or cohort.file_id != uploaded_file.file_id):
+        cohort.discard()
+        del st.session_state["scored_cohort"]
+        cohort = None
+    if uploaded_file is None:
+        return
+
+    if model_columns is None and not DEMO_MODE:
+        st.error("Model columns not loaded.")
+        st.stop()
+
+    if cohort is None:
+        cohort = st.session_state.scored_cohort = score_cohort_file(uploaded_file)
+
+    st.success(f"Scored {cohort.scored_rows - cohort.rejected_rows:,} rows; rejected {cohort.rejected_rows:,}.")
+    st.download_button(
+        "Download predictions (CSV)",
+        data=cohort.read,  # read only when the button is clicked
+        file_name=f"{Path(uploaded_file.name).stem}_predictions.csv",
+        mime="text/csv",
+        on_click="ignore",
+    )
 
 def set_page(page_name):
     st.session_state.nav_menu = page_name
 
+@st.cache_resource(show_spinner=False)
+def get_page_assets():
+    """Builds the resized page images into STREAMLIT/static once per process and returns their manifest."""
+    try:
+        return build_assets()
+    except OSError as e:
+        print(f"Could not build page images: {e}")
+        return {}
+
+
+def page_image(name, alt, sizes, style=""):
+    return picture_html(
+        get_page_assets(), name, alt, sizes, style,
+        static_serving=st.get_option("server.enableStaticServing"),
+    )
+
+
+def page_image_url(name):
+    return image_url(get_page_assets(), name, static_serving=st.get_option("server.enableStaticServing"))
+
+
 PAGE_OPTIONS = ["Home", "About HD", "Stage Prediction Tool", "Resources", "Wellness & Support Tips"]
 page_to_index = {page: i for i, page in enumerate(PAGE_OPTIONS)}
 
-@st.cache_data
-def load_lottieurl(url: str):
-    try:
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
-    except Exception as e:
-        st.error(f"Error loading Lottie animation: {e}")
-        return None
-
 # --- 1. Home ---
+@timed("page_home")
 def show_home_page():
     import streamlit as st
     from streamlit_extras.add_vertical_space import add_vertical_space
@@ -387,17 +630,9 @@ def show_home_page():
         unsafe_allow_html=True,
     )
 
-    import base64
-    from pathlib import Path
-
-    image_path = BASE_DIR / "brain.png"
-
-    if image_path.exists():
-        with open(image_path, "rb") as img_file:
-            encoded = base64.b64encode(img_file.read()).decode()
-            img_src = f"data:image/png;base64,{encoded}"
-    else:
-        img_src = ""
+    img_html = page_image(
+        "brain", "Brain illustration", "(max-width: 600px) 150px, (max-width: 768px) 180px, 230px"
+    )
 
     st.markdown(
         f"""
@@ -410,7 +645,7 @@ def show_home_page():
                 </div>
             </div>
             <div class="hero-image">
-                <img src="{img_src}" alt="Brain illustration"/>
+                {img_html}
             </div>
         </div>
         """,
@@ -574,18 +809,12 @@ def show_home_page():
     st.markdown(footer_html, unsafe_allow_html=True)
 
 # --- 2. About HD ---
+IMAGE_STYLE = "width:70%; border-radius:12px; box-shadow:0 4px 10px rgba(0,0,0,0.1); margin: 0 auto {bottom}px; display:block;"
+
+@timed("page_about_hd")
 def show_about_hd_page():
     import streamlit as st
     from streamlit_extras.add_vertical_space import add_vertical_space
-    from PIL import Image
-    import base64
-    from io import BytesIO
-
-    def image_to_base64(img_path):
-        img = Image.open(img_path)
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        return base64.b64encode(buffered.getvalue()).decode()
 
     st.markdown("""
         <style>
@@ -673,11 +902,7 @@ def show_about_hd_page():
 
     add_vertical_space(1)
 
-    try:
-        image1_base64 = image_to_base64(BASE_DIR / "HD1.png")
-        image2_base64 = image_to_base64(BASE_DIR / "HD2.png")
-
-    except Exception:
+    if not {"HD1", "HD2"} <= get_page_assets().keys():
         st.warning("⚠️ Please ensure 'HD1.png' and 'HD2.png' are in the same directory.")
         return
 
@@ -701,21 +926,13 @@ def show_about_hd_page():
     st.markdown(f"""
         <a href="#img1">
             <div class="img-container">
-                <img src="data:image/png;base64,{image1_base64}" 
-                    alt="HD Genetic Diagram" 
-                    style="
-                        width:70%;
-                        border-radius:12px;
-                        box-shadow:0 4px 10px rgba(0,0,0,0.1);
-                        margin: 0 auto 10px;
-                        display:block;
-                    ">
+                {page_image("HD1", "HD Genetic Diagram", "70vw", IMAGE_STYLE.format(bottom=10))}
             </div>
         </a>
 
         <div id="img1" class="modal">
             <a href="#" class="close-btn">×</a>
-            <img src="data:image/png;base64,{image1_base64}">
+            <img src="{page_image_url('HD1')}">
         </div>
     """, unsafe_allow_html=True)
 
@@ -724,21 +941,13 @@ def show_about_hd_page():
     st.markdown(f"""
         <a href="#img2">
             <div class="img-container">
-                <img src="data:image/png;base64,{image2_base64}" 
-                    alt="Brain Comparison" 
-                    style="
-                        width:70%;
-                        border-radius:12px;
-                        box-shadow:0 4px 10px rgba(0,0,0,0.1);
-                        margin: 0 auto 14px;
-                        display:block;
-                    ">
+                {page_image("HD2", "Brain Comparison", "70vw", IMAGE_STYLE.format(bottom=14))}
             </div>
         </a>
 
         <div id="img2" class="modal">
             <a href="#" class="close-btn">×</a>
-            <img src="data:image/png;base64,{image2_base64}">
+            <img src="{page_image_url('HD2')}">
         </div>
 
         <div class="section-header"><span class="icon">🧬</span>Causes & Genetics</div>
@@ -788,11 +997,12 @@ def show_about_hd_page():
     """, unsafe_allow_html=True)
 
 # --- 3. Prediction ---
+@timed("page_prediction")
 def show_prediction_page():
     import streamlit as st
-    import pandas as pd
 
     st.title("📊 Stage Prediction Tool")
+    load_prediction_engine()
 
     st.markdown("""
         <style>
@@ -900,52 +1110,68 @@ def show_prediction_page():
         st.error("Model is not loaded. Cannot proceed with prediction.")
         st.stop()
 
-    with st.form("prediction_form"):
-        st.markdown("""
-            <style>
-            .content-card { background-color: #f9fcff; padding: 1.5rem; border-radius: 16px; box-shadow: 0 2px 6px rgba(0,0,0,0.05); margin-top: 1rem; transition: all 0.3s ease-in-out; }
-            </style>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <style>
-        div[data-baseweb="select"] > div {
-            background-color: #e8f4fa !important;
-            border: 1px solid #b5e0f0 !important;
-            color: #000000 !important;
-            border-radius: 10px !important;
-        }
-        div[role="listbox"], div[data-baseweb="popover"], ul[role="listbox"] {
-            background-color: #e8f4fa !important; color: #000000 !important; border: 1px solid #b5e0f0 !important; border-radius: 10px !important;
-        }
-        div[role="option"]:hover, li[role="option"]:hover { background-color: #d7edf8 !important; }
+    mode = st.radio("Prediction mode", ["Single patient", "Batch cohort upload"], horizontal=True)
+    if mode == "Batch cohort upload":
+        show_batch_scoring()
+        return
 
-        /* Inputs spacing on mobile */
-        @media (max-width: 768px) {
-          [data-testid="stNumberInput"], [data-testid="stSelectbox"] { margin-bottom: 8px; }
-        }
+    st.markdown("""
+        <style>
+        .content-card { background-color: #f9fcff; padding: 1.5rem; border-radius: 16px; box-shadow: 0 2px 6px rgba(0,0,0,0.05); margin-top: 1rem; transition: all 0.3s ease-in-out; }
         </style>
-        """, unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
+
+    st.markdown("""
+    <style>
+    div[data-baseweb="select"] > div {
+        background-color: #e8f4fa !important;
+        border: 1px solid #b5e0f0 !important;
+        color: #000000 !important;
+        border-radius: 10px !important;
+    }
+    div[role="listbox"], div[data-baseweb="popover"], ul[role="listbox"] {
+        background-color: #e8f4fa !important; color: #000000 !important; border: 1px solid #b5e0f0 !important; border-radius: 10px !important;
+    }
+    div[role="option"]:hover, li[role="option"]:hover { background-color: #d7edf8 !important; }
+
+    /* Inputs spacing on mobile */
+    @media (max-width: 768px) {
+      [data-testid="stNumberInput"], [data-testid="stSelectbox"] { margin-bottom: 8px; }
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+    show_prediction_form()
+
+
+@st.fragment
+@timed("prediction_form")
+def show_prediction_form():
+    """Form and results of the single-patient prediction.
 
+    Submitting reruns only this fragment; the page CSS, navigation and the
+    rest of the page are left as they are.
+    """
+    with st.form("prediction_form"):
         st.header("Patient & Clinical Information")
         st.markdown("Enter the patient's details below. This information helps estimate the likely stage based on clinical patterns and research data.")
 
         col1, col2 = st.columns(2)
         with col1:
-            age = st.number_input("Current Age", min_value=1, max_value=120, value=65)
+            age = st.number_input("Current Age", *FORM_BOUNDS['Age'], value=65)
             sex = st.selectbox("Sex", ['Male', 'Female'])
             family_history = st.selectbox("Family History of Huntington's", ['Yes', 'No'])
-            age_of_onset = st.number_input("Age of Symptom Onset", min_value=1, max_value=120, value=55)
+            age_of_onset = st.number_input("Age of Symptom Onset", *FORM_BOUNDS['Age_of_Onset'], value=55)
 
         with col2:
-            htt_cag_repeat = st.number_input("HTT CAG Repeat Length", min_value=10, max_value=100, value=45)
-            motor_score = st.number_input("Motor Score", min_value=0, max_value=124, value=50)
-            cognitive_score = st.number_input("Cognitive Score", min_value=0, max_value=100, value=40)
-            chorea_score = st.number_input("Chorea Score", min_value=0.0, max_value=28.0, value=10.0, step=0.1)
+            htt_cag_repeat = st.number_input("HTT CAG Repeat Length", *FORM_BOUNDS['HTT_CAG_Repeat_Length'], value=45)
+            motor_score = st.number_input("Motor Score", *FORM_BOUNDS['Motor_Score'], value=50)
+            cognitive_score = st.number_input("Cognitive Score", *FORM_BOUNDS['Cognitive_Score'], value=40)
+            chorea_score = st.number_input("Chorea Score", *FORM_BOUNDS['Chorea_Score'], value=10.0, step=0.1)
 
         functional_score = st.number_input(
             "Functional Capacity Score (0-100)",
-            min_value=0, max_value=100, value=35,
+            *FORM_BOUNDS['Functional_Capacity_Score'], value=35,
             help="A score from 0 (total dependence) to 100 (fully independent)."
         )
 
@@ -960,223 +1186,87 @@ def show_prediction_page():
             'HTT_CAG_Repeat_Length': htt_cag_repeat, 'Age_of_Onset': age_of_onset,
             'Motor_Score': motor_score, 'Cognitive_Score': cognitive_score,
             'Chorea_Score': chorea_score, 'Functional_Capacity_Score': functional_score,
-            'Gene/Factor': 'HTT', 'Function': 'CAG Trinonucleotide Repeat Expansion',
-            'Effect': 'Neurodegeneration', 'Category': 'Primary Cause'
+            **CONSTANT_FEATURES
         }
 
-        input_df = pd.DataFrame([input_data])
-        input_df['Disease_Duration'] = input_df['Age'] - input_df['Age_of_Onset']
-        input_df['Disease_Duration'] = input_df['Disease_Duration'].clip(lower=0)
-
-        if feature_encoders:
-            for col, encoder in feature_encoders.items():
-                if col in input_df.columns and col not in ['Sex', 'Family_History']:
-                    try:
-                        input_df[col] = encoder.transform(input_df[col])
-                    except Exception as e:
-                        st.warning(f"Could not encode feature {col}: {e}")
-
-        try:
-            if model_columns:
-                for col in model_columns:
-                    if col not in input_df.columns:
-                        input_df[col] = 0
-                input_df = input_df[model_columns]
-            else:
-                st.error("Model columns not loaded.")
-                st.stop()
-        except Exception as e:
-            st.error(f"Unexpected error during data prep: {e}")
-            st.stop()
-
-        final_prediction = "No Disease"
         try:
-            if DEMO_MODE or model is None or target_encoder is None:
-                final_prediction = demo_predict_stage(input_data)
-            else:
-                prediction_encoded = model.predict(input_df)
-                final_prediction = target_encoder.inverse_transform(prediction_encoded)[0]
+            final_prediction = prediction_cache.predict(predictor, input_data)
         except Exception as e:
             st.error(f"Error during prediction: {e}")
             st.stop()
         
-        import plotly.graph_objects as go
-
-        def render_stage_gauge(stage):
-            stage_levels = {"No Disease": 0.1, "Early": 0.4, "Middle": 0.7, "Severe": 1.0}
-            value = stage_levels.get(stage, 0.1)
-            fig = go.Figure()
-            fig.add_trace(go.Indicator(
-                mode="gauge",
-                value=value * 100,
-                gauge={
-                    "shape": "angular",
-                    "axis": {
-                        "range": [0, 100],
-                        "tickmode": "array",
-                        "tickvals": [12.5, 37.5, 62.5, 87.5],
-                        "ticktext": ["No Disease", "Early", "Middle", "Severe"],
-                        "tickfont": {"size": 15, "color": "#2a2a2a", "family": "Inter, sans-serif"},
-                    },
-                    "bar": {"color": "#003366", "thickness": 0.2},
-                    "bgcolor": "#ffffff",
-                    "steps": [
-                        {"range": [0, 25], "color": "#a5f0b3"},
-                        {"range": [25, 50], "color": "#f9e79f"},
-                        {"range": [50, 75], "color": "#f8c471"},
-                        {"range": [75, 100], "color": "#f1948a"},
-                    ],
-                    "threshold": {
-                        "line": {"color": "#003366", "width": 6},
-                        "thickness": 0.8,
-                        "value": value * 100,
-                    },
-                },
-                domain={'x': [0, 1], 'y': [0, 1]},
-            ))
-            fig.update_layout(
-                paper_bgcolor="rgba(0,0,0,0)",
-                height=280,
-                margin=dict(l=20, r=20, t=30, b=0),
-                font={"color": "#2a2a2a", "size": 18},
-            )
-            fig.add_annotation(
-                text=f"<b>{stage}</b>",
-                x=0.5, y=0.1, showarrow=False,
-                font={"color": "#003366", "size": 24, "family": "Inter, sans-serif"}
-            )
-            return fig
-
         st.markdown('<div class="section-heading">🧠 Stage Severity Indicator</div>', unsafe_allow_html=True)
-        st.plotly_chart(render_stage_gauge(final_prediction), use_container_width=True)
-        
+        with span("render_gauge"):
+            if LIGHT_RENDER:
+                st.markdown(gauge_svg(final_prediction), unsafe_allow_html=True)
+            else:
+                st.plotly_chart(gauge_figure(final_prediction), use_container_width=True)
+
         st.markdown('<div class="section-heading">Prediction Result</div>', unsafe_allow_html=True)
-        st.markdown(
-            f"""
-            <div class="content-box">
-                Based on the details provided, our analysis suggests the predicted stage is: 
-                <b>{final_prediction}</b>.
-                <br>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+        st.markdown(result_html(final_prediction), unsafe_allow_html=True)
 
         st.markdown(f'<div class="section-heading"> \'{final_prediction}\' Stage</div>', unsafe_allow_html=True)
-
-        if final_prediction == 'Early':
-            st.markdown(
-                """
-                <div class="content-box">
-                    In the <b>early stage</b> of Huntington’s disease, changes may be mild and gradual.  
-                    Subtle issues such as small movement difficulties, mild balance changes, mood shifts, or problems with focus and concentration may begin to appear.  
-                    <br>
-                    Most people can continue with work, hobbies, and daily responsibilities independently.  
-                    Regular medical check-ups and early lifestyle adjustments can help slow down progression and improve quality of life.
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        elif final_prediction == 'Middle':
-            st.markdown(
-                """
-                <div class="content-box">
-                    The <b>middle stage</b> usually involves more noticeable symptoms.  
-                    Movements can become slower or more rigid, and tasks like writing, speaking, or walking may require more effort.  
-                    Cognitive and emotional changes — such as forgetfulness, frustration, or anxiety — may also become more apparent.  
-                    <br>
-                    At this stage, people often benefit from structured routines, supportive therapies, and occasional assistance with daily activities.
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        elif final_prediction == 'Severe':
-            st.markdown(
-                """
-                <div class="content-box">
-                    The <b>advanced stage</b> of Huntington’s disease is marked by significant loss of motor control and communication abilities.  
-                    People may rely on full-time care for eating, movement, and personal hygiene.  
-                    Cognitive awareness may still be present, so compassionate care and emotional support are especially important.  
-                    <br>
-                    Medical teams often focus on comfort, dignity, and symptom relief — ensuring the person’s environment is calm, safe, and nurturing.
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        elif final_prediction == 'No Disease':
-            st.markdown(
-                """
-                <div class="content-box">
-                    Your results do <b>not suggest active features</b> of Huntington’s disease based on typical clinical patterns.  
-                    However, this does <b>not replace professional evaluation</b>.  
-                    If you have a family history or ongoing neurological concerns, a neurologist or genetic counselor can help provide further testing and reassurance.  
-                    <br>
-                    Maintaining regular health check-ups and healthy lifestyle habits remains the best approach to long-term wellbeing.
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
+        if final_prediction in STAGE_NARRATIVE:
+            st.markdown(STAGE_NARRATIVE[final_prediction], unsafe_allow_html=True)
 
         st.markdown('<div class="section-heading">Next Steps</div>', unsafe_allow_html=True)
+        if final_prediction in NEXT_STEPS:
+            st.markdown(NEXT_STEPS[final_prediction], unsafe_allow_html=True)
 
-        if final_prediction == 'Early':
-            st.markdown(
-                """
-                <div class="content-box">
-                    💡 Focus on early prevention and awareness.  
-                    Maintain physical activity, eat a balanced diet, and stay socially connected.  
-                    Discuss possible long-term care planning with healthcare professionals while independence is still high.  
-                    <br>
-                    Regular physiotherapy, speech therapy, and mindfulness-based activities may help preserve both mental and physical function.
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        elif final_prediction == 'Middle':
-            st.markdown(
-                """
-                <div class="content-box">
-                    💡 Prioritize daily safety and physical stability.  
-                    Occupational and speech therapies can help adapt your home and communication for comfort and confidence.  
-                    Emotional health is equally important — regular counseling and support groups can reduce stress and isolation.  
-                    <br>
-                    Family education at this stage can help prepare for care needs and strengthen support networks.
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        elif final_prediction == 'Severe':
-            st.markdown(
-                """
-                <div class="content-box">
-                    💡 Emphasis now shifts to <b>comfort and compassionate care</b>.  
-                    Managing nutrition, preventing infections, and providing emotional reassurance are the primary goals.  
-                    Specialized nursing, physiotherapy, and palliative care can greatly improve quality of life for both patients and caregivers.  
-                    <br>
-                    Caregivers are encouraged to seek community and respite support to maintain their own health and wellbeing.
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-        elif final_prediction == 'No Disease':
-            st.markdown(
-                """
-                <div class="content-box">
-                    💡 Continue leading a healthy, active lifestyle and consider speaking to a healthcare professional for reassurance or screening.  
-                    Genetic counseling can offer clarity if there is a family history of Huntington’s disease.  
-                    Remember — early awareness and informed lifestyle choices can make a lasting difference.
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
+        show_what_if_panel(canonical_inputs(input_data))
+
+# --- What-if explorer (rendered under a prediction) ---
+@st.cache_data(max_entries=512, show_spinner=False)
+def cached_sweep(profile, feature, version):
+    """One batched what-if sweep per (base profile, feature, artifact version)."""
+    return run_sweep(predictor, profile, feature)
+
+
+@st.fragment
+@timed("what_if_panel")
+def show_what_if_panel(profile):
+    import plotly.graph_objects as go
+
+    st.markdown('<div class="section-heading">🔍 What-If Explorer</div>', unsafe_allow_html=True)
+    st.markdown("See how the predicted stage changes as one input varies across its full range, with every other input held at the values above.")
+
+    feature = st.selectbox(
+        "Input to vary",
+        list(SWEEP_FEATURES),
+        format_func=lambda f: SWEEP_FEATURES[f]['label'],
+        key="what_if_feature",
+    )
+    label = SWEEP_FEATURES[feature]['label']
+    with span("what_if_sweep"):
+        values, probabilities, classes, transitions = cached_sweep(profile, feature, predictor.version)
+
+    with span("render_what_if"):
+        fig = go.Figure()
+        for i, stage in enumerate(classes):
+            fig.add_trace(go.Scatter(x=values, y=probabilities[:, i], mode="lines", name=stage))
+        fig.add_vline(x=profile[INPUT_FEATURES.index(feature)], line_dash="dash", line_color="#003366")
+        for value, _, _ in transitions:
+            fig.add_vline(x=value, line_dash="dot", line_color="#999999")
+        fig.update_layout(
+            paper_bgcolor="rgba(0,0,0,0)",
+            height=360,
+            margin=dict(l=20, r=20, t=30, b=0),
+            xaxis_title=label,
+            yaxis_title="Stage probability",
+            yaxis_range=[0, 1],
+            legend={"orientation": "h", "y": 1.1},
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    if transitions:
+        items = "".join(f"<li>{label} = <b>{value:g}</b>: {before} → <b>{after}</b></li>" for value, before, after in transitions)
+        st.markdown(f'<div class="content-box">Predicted stage changes at:<ul>{items}</ul></div>', unsafe_allow_html=True)
+    else:
+        stage = classes[int(probabilities[0].argmax())]
+        st.markdown(f'<div class="content-box">The predicted stage stays <b>{stage}</b> across the whole {label} range.</div>', unsafe_allow_html=True)
 
 # --- 4. Resources ---
+@timed("page_resources")
 def show_resources_page():
     st.title("📚 Helpful Resources")
     st.markdown("Here are some trustworthy, supportive links for learning support.")
@@ -1258,6 +1348,7 @@ def show_resources_page():
     """, unsafe_allow_html=True)
 
 # --- 5. Wellness & Support Tips ---
+@timed("page_wellness")
 def show_wellness_page():
     import streamlit as st
 
@@ -1372,6 +1463,8 @@ def show_wellness_page():
     """, unsafe_allow_html=True)
 
 # --- 6. Top Navigation ---
+start_warm_up()
+
 if "nav_menu" not in st.session_state:
     st.session_state.nav_menu = "Home"
 
@@ -0,0 +1,401 @@
+"""Content-addressed on-disk cache for the model artifact ZIP.
+
+The ZIP is streamed to disk in chunks while its SHA-256 is computed, then
+the artifact files are extracted into `<cache>/<sha256>/` next to a
+manifest of per-file checksums. Later starts (and other workers) find the
+verified folder and skip the download entirely.
+
+A pinned sha256 names the bundle outright. Without one, the bundle last
+downloaded from the URL is trusted for $HD_ARTIFACT_MAX_AGE seconds (default
+300); after that a conditional request (ETag / Last-Modified) checks whether
+a new ZIP was published there. An interrupted download is resumed with a
+Range request on the next attempt.
+
+Pre-warm the cache at image build time, or check it against a local HTTP
+stand-in, with:
+
+    python STREAMLIT/artifact_store.py prewarm --url "$MODEL_ZIP_URL" [--sha256 <zip sha256>]
+    python STREAMLIT/artifact_store.py selftest
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from metrics import timed
+from predictor import FEATURE_ENCODERS_FILE, MODEL_COLUMNS_FILE, MODEL_FILE, TARGET_ENCODER_FILE
+
+ARTIFACT_FILES = [MODEL_FILE, FEATURE_ENCODERS_FILE, TARGET_ENCODER_FILE, MODEL_COLUMNS_FILE]
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.json"
+CHUNK_SIZE = 1 << 20
+DEFAULT_TIMEOUT = (10, 60)  # (connect, read) seconds
+DEFAULT_MAX_AGE = 300  # seconds an unpinned bundle is trusted before it is revalidated
+
+
+def default_cache_dir():
+    return Path(os.environ.get("HD_ARTIFACT_CACHE", Path.home() / ".cache" / "hd-prognosis" / "artifacts"))
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@contextmanager
+def _cache_lock(cache_dir):
+    """Serializes downloads across worker processes sharing the cache (no-op where flock is unavailable)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(cache_dir / ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json_atomic(path, data):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def verify_bundle(directory, full=False):
+    """True when `directory` holds every artifact listed in its manifest.
+
+    The default check compares file sizes; `full=True` re-hashes every file.
+    """
+    directory = Path(directory)
+    manifest = _read_json(directory / MANIFEST_FILE, None)
+    if not manifest:
+        return False
+    for name in ARTIFACT_FILES:
+        entry = manifest["files"].get(name)
+        path = directory / name
+        if entry is None or not path.is_file() or path.stat().st_size != entry["size"]:
+            return False
+        if full and sha256_file(path) != entry["sha256"]:
+            return False
+    return True
+
+
+def _validators(headers):
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+def _download(url, destination, timeout, cached=None):
+    """Streams `url` into `destination` in CHUNK_SIZE pieces and returns (SHA-256 of the payload, validators).
+
+    `cached` holds the ETag / Last-Modified of the bundle already in the cache; when the server answers 304 to
+    them, nothing is downloaded and None is returned. A partial `destination` left by an interrupted download
+    is resumed when the server confirms (If-Range) that it still serves the same version.
+    """
+    import requests
+
+    destination = Path(destination)
+    sidecar = destination.with_name(destination.name + ".json")
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    partial = _read_json(sidecar, {}) if destination.is_file() else {}
+    # If-Range needs a strong ETag; fall back to Last-Modified.
+    etag = partial.get("etag")
+    if_range = etag if etag and not etag.startswith("W/") else partial.get("last_modified")
+    offset = destination.stat().st_size if if_range else 0
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = if_range
+
+    digest = hashlib.sha256()
+    with requests.get(url, stream=True, timeout=timeout, headers=headers) as response:
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        validators = _validators(response.headers)
+        if response.status_code == 206:
+            if not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                raise ValueError(f"Unexpected Content-Range {response.headers.get('Content-Range')!r} for {url}")
+            with open(destination, "rb") as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(block)
+            mode = "ab"
+        else:
+            _write_json_atomic(sidecar, validators)
+            mode = "wb"
+        with open(destination, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+    return digest.hexdigest(), validators
+
+
+def _extract(zip_path, destination):
+    """Extracts the known artifact files (by basename, ignoring folders in the ZIP) and writes the manifest."""
+    destination.mkdir(parents=True)
+    with zipfile.ZipFile(zip_path) as z:
+        members = {Path(info.filename).name: info for info in z.infolist() if not info.is_dir()}
+        missing = [name for name in ARTIFACT_FILES if name not in members]
+        if missing:
+            raise ValueError(f"Artifact ZIP is missing {', '.join(missing)}")
+        files = {}
+        for name in ARTIFACT_FILES:
+            with z.open(members[name]) as src, open(destination / name, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            files[name] = {"sha256": sha256_file(destination / name), "size": (destination / name).stat().st_size}
+    return files
+
+
+def _index_entry(cache_dir, url):
+    entry = _read_json(cache_dir / INDEX_FILE, {}).get(url)
+    # Indexes written before revalidation stored the bare digest.
+    return {"sha256": entry, "checked": 0} if isinstance(entry, str) else entry
+
+
+def _update_index(cache_dir, url, entry):
+    index = _read_json(cache_dir / INDEX_FILE, {})
+    index[url] = entry
+    _write_json_atomic(cache_dir / INDEX_FILE, index)
+
+
+@timed("fetch_artifacts")
+def fetch_artifacts(url, expected_sha256=None, cache_dir=None, timeout=DEFAULT_TIMEOUT, max_age=None):
+    """Returns a verified folder with the extracted artifacts of `url`, downloading only on a cache miss.
+
+    `expected_sha256` is the SHA-256 of the ZIP. When given, a download with a
+    different checksum is rejected. Without it, the bundle last downloaded from
+    `url` is reused for `max_age` seconds (default $HD_ARTIFACT_MAX_AGE or 300)
+    and then revalidated with a conditional request; if the server cannot be
+    reached, the cached bundle is kept and a warning is printed.
+    """
+    import requests
+
+    cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+    expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+    if max_age is None:
+        max_age = float(os.environ.get("HD_ARTIFACT_MAX_AGE", DEFAULT_MAX_AGE))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def cached_bundle(fresh_only=True):
+        if expected_sha256:
+            digest = expected_sha256
+        else:
+            entry = _index_entry(cache_dir, url)
+            if not entry or (fresh_only and time.time() - entry.get("checked", 0) >= max_age):
+                return None
+            digest = entry["sha256"]
+        return cache_dir / digest if verify_bundle(cache_dir / digest) else None
+
+    bundle = cached_bundle()
+    if bundle:
+        return bundle
+
+    with _cache_lock(cache_dir):
+        # Another worker may have finished the download while we waited for the lock.
+        bundle = cached_bundle()
+        if bundle:
+            return bundle
+
+        current = cached_bundle(fresh_only=False)
+        entry = _index_entry(cache_dir, url) if current else None
+        # Kept across failed attempts (under a per-URL name) so the next one can resume it.
+        zip_path = cache_dir / f"{hashlib.sha256(url.encode()).hexdigest()[:16]}.zip.part"
+        staging = Path(tempfile.mkdtemp(dir=cache_dir)) / "bundle"
+        try:
+            try:
+                download = _download(url, zip_path, timeout, entry)
+            except (requests.RequestException, OSError) as e:
+                if current is None:
+                    raise
+                print(f"Could not revalidate the model artifacts at {url} ({e}); using cached bundle {current.name}.")
+                _update_index(cache_dir, url, dict(entry, checked=time.time()))
+                return current
+            if download is None:  # 304: the cached bundle is still what the URL serves.
+                _update_index(cache_dir, url, dict(entry, checked=time.time()))
+                return current
+
+            digest, validators = download
+            try:
+                if expected_sha256 and digest != expected_sha256:
+                    raise ValueError(f"Artifact ZIP checksum mismatch: expected {expected_sha256}, got {digest}")
+                bundle = cache_dir / digest
+                if not verify_bundle(bundle):
+                    files = _extract(zip_path, staging)
+                    _write_json_atomic(staging / MANIFEST_FILE, {
+                        "source": url, "sha256": digest, "created": time.time(), "files": files,
+                    })
+                    if bundle.exists():
+                        shutil.rmtree(bundle)
+                    os.replace(staging, bundle)
+            finally:
+                # A complete download is never resumed, whether or not it was usable.
+                zip_path.unlink(missing_ok=True)
+                zip_path.with_name(zip_path.name + ".json").unlink(missing_ok=True)
+
+            if current is not None and current != bundle:
+                print(f"A new artifact ZIP was published at {url}: {current.name[:12]} -> {digest[:12]}.")
+            _update_index(cache_dir, url, {"sha256": digest, "checked": time.time(), **validators})
+            return bundle
+        finally:
+            shutil.rmtree(staging.parent, ignore_errors=True)
+
+
+# ---------------------- SELF-TEST ----------------------
+def _stand_in_server():
+    """Local HTTP stand-in for the artifact host: serves `state['body']` at /model.zip with an ETag and
+    Last-Modified, honours If-None-Match and Range/If-Range, and cuts the body short after `state['drop_after']`
+    bytes when that is set. Every request is logged in `state['requests']`."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {"body": b"", "etag": None, "drop_after": None, "requests": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body, etag = state["body"], state["etag"]
+            state["requests"].append({k: self.headers[k] for k in ("If-None-Match", "Range") if self.headers[k]})
+            if self.headers["If-None-Match"] == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            start = 0
+            if self.headers["Range"] and self.headers["If-Range"] == etag:
+                start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+            self.send_response(206 if start else 200)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", "Sat, 01 Aug 2026 00:00:00 GMT")
+            self.send_header("Content-Length", str(len(body) - start))
+            if start:
+                self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            self.end_headers()
+            self.wfile.write(body[start:state["drop_after"]])
+            state["requests"][-1]["sent"] = len(body[start:state["drop_after"]])
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def _stand_in_zip(version, size=3 * CHUNK_SIZE):
+    """Artifact ZIP with incompressible stand-in files (the cache never parses them)."""
+    import io
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        for name in ARTIFACT_FILES:
+            z.writestr(f"models/{name}", version.encode() + os.urandom(size // len(ARTIFACT_FILES)))
+    return buffer.getvalue()
+
+
+def selftest():
+    """Runs fetch_artifacts against the local stand-in: download, cache hit, 304 revalidation, a new ZIP at the
+    same URL, a checksum mismatch, a resumed download and an unreachable server. Returns the number of failures."""
+    server, state = _stand_in_server()
+    url = f"http://127.0.0.1:{server.server_port}/model.zip"
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':<5} {label}")
+
+    def publish(version):
+        state["body"], state["etag"] = _stand_in_zip(version), f'"{version}"'
+        return hashlib.sha256(state["body"]).hexdigest()
+
+    def fetch(**kwargs):
+        state["requests"].clear()
+        return fetch_artifacts(url, cache_dir=cache_dir, timeout=(2, 5), **kwargs)
+
+    with tempfile.TemporaryDirectory(prefix="hd-artifacts-selftest-") as cache_dir:
+        v1 = publish("v1")
+        bundle = fetch()
+        check("cold start downloads and verifies the ZIP",
+              bundle.name == v1 and verify_bundle(bundle, full=True) and len(state["requests"]) == 1)
+        check("a second start within max_age makes no request", fetch() == bundle and not state["requests"])
+        check("revalidation of an unchanged ZIP gets 304",
+              fetch(max_age=0) == bundle and state["requests"] == [{"If-None-Match": '"v1"'}])
+
+        v2 = publish("v2")
+        check("a new ZIP at the same URL is not used before max_age", fetch().name == v1)
+        check("a new ZIP at the same URL is downloaded after max_age", fetch(max_age=0).name == v2)
+
+        try:
+            fetch(expected_sha256=v1[::-1])
+            check("a wrong pinned sha256 is rejected", False)
+        except ValueError:
+            check("a wrong pinned sha256 is rejected", _index_entry(Path(cache_dir), url)["sha256"] == v2)
+        check("a pinned sha256 already in the cache makes no request",
+              fetch(expected_sha256=v1).name == v1 and not state["requests"])
+
+        v3 = publish("v3")
+        state["drop_after"] = CHUNK_SIZE
+        check("an interrupted download keeps serving the cached bundle", fetch(max_age=0).name == v2)
+        state["drop_after"] = None
+        resumed = fetch(max_age=0)
+        check("the next attempt resumes it with a Range request",
+              resumed.name == v3 and state["requests"][0].get("Range") == f"bytes={CHUNK_SIZE}-"
+              and state["requests"][0]["sent"] == len(state["body"]) - CHUNK_SIZE)
+        check("the resumed ZIP verifies", verify_bundle(resumed, full=True))
+
+        server.shutdown()
+        server.server_close()
+        check("an unreachable server keeps serving the cached bundle", fetch(max_age=0).name == v3)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the on-disk model artifact cache.")
+    parser.add_argument("--cache-dir", default=None, help="Defaults to $HD_ARTIFACT_CACHE or ~/.cache/hd-prognosis/artifacts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prewarm = commands.add_parser("prewarm", help="Download and verify the artifacts ahead of time.")
+    prewarm.add_argument("--url", required=True)
+    prewarm.add_argument("--sha256", default=None, help="Expected SHA-256 of the ZIP.")
+
+    verify = commands.add_parser("verify", help="Re-hash a cached bundle against its manifest.")
+    verify.add_argument("path")
+
+    commands.add_parser("selftest", help="Exercise the cache against a local HTTP stand-in.")
+
+    args = parser.parse_args(argv)
+    if args.command == "prewarm":
+        started = time.perf_counter()
+        bundle = fetch_artifacts(args.url, args.sha256, args.cache_dir)
+        print(f"Artifacts ready in {bundle} ({time.perf_counter() - started:.2f}s)")
+        return 0
+    if args.command == "selftest":
+        return 1 if selftest() else 0
+    ok = verify_bundle(args.path, full=True)
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+"""Responsive image variants for the app pages.
+
+The page images are resized once into a few widths, encoded as WebP (with a
+PNG fallback) and written to `STREAMLIT/static/` under content-hashed names.
+With `server.enableStaticServing` on, Streamlit serves that folder at
+`app/static/` (with ETag/Last-Modified headers), so pages reference the
+files by URL and browsers fetch only the width they need instead of
+receiving megabytes of base64 on every rerun.
+
+    python STREAMLIT/assets.py build      # e.g. at image build time
+    python STREAMLIT/assets.py report     # payload bytes per page, before vs after
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+STATIC_DIR = APP_DIR / "static"
+STATIC_URL = "app/static/"
+MANIFEST_FILE = "assets.json"
+
+# Source image and the rendered widths (CSS px, doubled for high-density screens) for each page image.
+IMAGE_ASSETS = {
+    'brain': {'source': 'brain.png', 'widths': (240, 480)},
+    'HD1': {'source': 'HD1.png', 'widths': (480, 800, 1177)},
+    'HD2': {'source': 'HD2.png', 'widths': (480, 800, 1262)},
+}
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 82, 'method': 6},
+    'png': {'format': 'PNG', 'optimize': True},
+}
+MIME_TYPES = {'webp': 'image/webp', 'png': 'image/png'}
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _encode(image, fmt):
+    options = dict(FORMATS[fmt])
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def _build_image(name, spec, static_dir):
+    from PIL import Image
+
+    source = APP_DIR / spec['source']
+    source_bytes = source.read_bytes()
+    original = Image.open(io.BytesIO(source_bytes))
+    original.load()
+    variants = []
+    for width in sorted({min(w, original.width) for w in spec['widths']}):
+        height = round(original.height * width / original.width)
+        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+        for fmt in FORMATS:
+            data = _encode(resized, fmt)
+            filename = f"{name}-{width}w.{_sha256(data)[:12]}.{fmt}"
+            (static_dir / filename).write_bytes(data)
+            variants.append({'format': fmt, 'width': width, 'height': height, 'file': filename, 'bytes': len(data)})
+    return {
+        'source': spec['source'],
+        'source_sha256': _sha256(source_bytes),
+        'width': original.width,
+        'height': original.height,
+        'variants': variants,
+    }
+
+
+def build_assets(static_dir=STATIC_DIR, force=False):
+    """Builds the variants of every IMAGE_ASSETS entry whose source or width list changed; returns the manifest."""
+    static_dir = Path(static_dir)
+    static_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = static_dir / MANIFEST_FILE
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+
+    changed = False
+    for name, spec in IMAGE_ASSETS.items():
+        entry = manifest.get(name)
+        source = APP_DIR / spec['source']
+        if not source.is_file():
+            continue
+        up_to_date = (
+            not force and entry is not None
+            and entry.get('source_sha256') == _sha256(source.read_bytes())
+            and sorted({min(w, entry['width']) for w in spec['widths']}) == sorted({v['width'] for v in entry['variants']})
+            and all((static_dir / v['file']).is_file() for v in entry['variants'])
+        )
+        if up_to_date:
+            continue
+        stale = {v['file'] for v in entry['variants']} if entry else set()
+        manifest[name] = _build_image(name, spec, static_dir)
+        for filename in stale - {v['file'] for v in manifest[name]['variants']}:
+            (static_dir / filename).unlink(missing_ok=True)
+        changed = True
+
+    if changed:
+        tmp = manifest_path.with_name(MANIFEST_FILE + ".tmp")
+        tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, manifest_path)
+    return manifest
+
+
+# ---------------------- HTML ----------------------
+def _variants(manifest, name, fmt):
+    return [v for v in manifest[name]['variants'] if v['format'] == fmt]
+
+
+def _srcset(variants):
+    return ", ".join(f"{STATIC_URL}{v['file']} {v['width']}w" for v in variants)
+
+
+@lru_cache(maxsize=None)
+def _data_uri(static_dir, filename, fmt):
+    data = (Path(static_dir) / filename).read_bytes()
+    return f"data:{MIME_TYPES[fmt]};base64,{base64.b64encode(data).decode()}"
+
+
+def image_url(manifest, name, static_serving=True, static_dir=STATIC_DIR):
+    """URL of the largest WebP variant (used for full-size views)."""
+    largest = _variants(manifest, name, 'webp')[-1]
+    if static_serving:
+        return STATIC_URL + largest['file']
+    return _data_uri(str(static_dir), largest['file'], 'webp')
+
+
+def picture_html(manifest, name, alt, sizes, style="", static_serving=True, static_dir=STATIC_DIR):
+    """<picture> markup with WebP and PNG srcsets for `name`.
+
+    Without static serving the largest WebP variant is inlined as a data URI
+    instead; it is encoded once per process.
+    """
+    if name not in manifest:
+        return ""
+    style_attr = f' style="{style}"' if style else ""
+    if not static_serving:
+        return f'<img src="{image_url(manifest, name, False, static_dir)}" alt="{alt}"{style_attr}/>'
+    webp = _variants(manifest, name, 'webp')
+    png = _variants(manifest, name, 'png')
+    return (
+        f'<picture><source type="image/webp" srcset="{_srcset(webp)}" sizes="{sizes}"/>'
+        f'<img src="{STATIC_URL}{png[-1]["file"]}" srcset="{_srcset(png)}" sizes="{sizes}" '
+        f'width="{png[-1]["width"]}" height="{png[-1]["height"]}" alt="{alt}" loading="lazy"{style_attr}/></picture>'
+    )
+
+
+# ---------------------- PAYLOAD REPORT ----------------------
+# Images per page with the CSS width they are displayed at on a desktop layout.
+PAGE_IMAGES = {
+    'Home': [('brain', 230)],
+    'About HD': [('HD1', 700), ('HD2', 700)],
+}
+
+
+def _inline_before(name):
+    """Bytes the pre-pipeline pages inlined for `name`, and the CPU seconds spent producing them."""
+    started = time.perf_counter()
+    source = APP_DIR / IMAGE_ASSETS[name]['source']
+    if name == 'brain':
+        # show_home_page base64-encoded the raw file once.
+        payload = len(base64.b64encode(source.read_bytes()))
+    else:
+        # show_about_hd_page re-encoded through PIL and used each data URI twice (inline + zoom modal).
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.open(source).save(buffer, format="PNG")
+        payload = 2 * len(base64.b64encode(buffer.getvalue()))
+    return payload, time.perf_counter() - started
+
+
+def _chosen_variant(manifest, name, css_width, density):
+    """The WebP variant a browser picks from the srcset for a slot `css_width` px wide."""
+    needed = css_width * density
+    webp = _variants(manifest, name, 'webp')
+    return next((v for v in webp if v['width'] >= needed), webp[-1])
+
+
+def payload_report(manifest, density=2):
+    rows = []
+    for page, images in PAGE_IMAGES.items():
+        before_bytes = before_cpu = 0
+        markup = fetched = 0
+        started = time.perf_counter()
+        for name, css_width in images:
+            payload, cpu = _inline_before(name)
+            before_bytes += payload
+            before_cpu += cpu
+            markup += len(picture_html(manifest, name, name, f"{css_width}px"))
+            fetched += _chosen_variant(manifest, name, css_width, density)['bytes']
+        rows.append({
+            'page': page,
+            'before_websocket_bytes': before_bytes,
+            'before_cpu_ms': before_cpu * 1000,
+            'after_websocket_bytes': markup,
+            'after_first_visit_http_bytes': fetched,
+            'after_cpu_ms': (time.perf_counter() - started) * 1000 - before_cpu * 1000,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and measure the responsive page images.")
+    parser.add_argument("--static-dir", default=str(STATIC_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Write the resized WebP/PNG variants and their manifest.")
+    build.add_argument("--force", action="store_true")
+    report = commands.add_parser("report", help="Payload bytes per page view, before and after.")
+    report.add_argument("--density", type=int, default=2, help="Device pixel ratio used to pick the srcset entry.")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    manifest = build_assets(args.static_dir, force=getattr(args, "force", False))
+    if args.command == "build":
+        for name, entry in manifest.items():
+            sizes = ", ".join(f"{v['width']}w {v['format']} {v['bytes'] / 1024:.0f} KiB" for v in entry['variants'])
+            print(f"{name}: {sizes}")
+        print(f"Built in {time.perf_counter() - started:.2f}s -> {args.static_dir}")
+        return 0
+
+    print(f"{'page':<10} {'before: websocket':>18} {'after: websocket':>17} {'after: HTTP (1st visit)':>24} "
+          f"{'before CPU':>11} {'after CPU':>10}")
+    for row in payload_report(manifest, args.density):
+        print(f"{row['page']:<10} {row['before_websocket_bytes'] / 1024:>14.0f} KiB {row['after_websocket_bytes']:>15} B "
+              f"{row['after_first_visit_http_bytes'] / 1024:>20.0f} KiB {row['before_cpu_ms']:>8.0f} ms {row['after_cpu_ms']:>7.1f} ms")
+    print("Repeat visits revalidate against the ETag/Last-Modified headers (304, no body); the content-hashed\n"
+          "names also let a CDN or reverse proxy cache app/static/ as immutable.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
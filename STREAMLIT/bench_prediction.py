@@ -0,0 +1,262 @@
+"""Regression benchmarks for the prediction path.
+
+Times model loading, the single-patient form path (`Predictor.predict_one`,
+what the Stage Prediction Tool runs on submit), batch scoring from 1 to
+100k rows with and without the compiled graph, the demo fallback, the
+stage rendering and each page's script run. Without --models-dir it trains
+a synthetic bundle once (synthetic_bundle.py) and reuses it from
+~/.cache/hd-prognosis/bench.
+
+Results are written as JSON so runs can be compared across commits; with
+--baseline the run fails (exit 1) when any latency grows, or throughput
+drops, by more than --threshold.
+
+    python STREAMLIT/bench_prediction.py --output bench.json
+    python STREAMLIT/bench_prediction.py --baseline bench.json --threshold 0.2 [--skip-pages]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from predictor import INPUT_FEATURES, Predictor, demo_predict_stage, demo_predict_stages, load_artifacts
+
+APP_DIR = Path(__file__).resolve().parent
+BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000)
+PAGES = ["Home", "About HD", "Stage Prediction Tool", "Resources", "Wellness & Support Tips"]
+FORM_ROW = {
+    'Age': 65, 'Sex': 'Male', 'Family_History': 'Yes', 'HTT_CAG_Repeat_Length': 45, 'Age_of_Onset': 55,
+    'Motor_Score': 50, 'Cognitive_Score': 40, 'Chorea_Score': 10.0, 'Functional_Capacity_Score': 35,
+}
+DEFAULT_THRESHOLD = 0.2
+
+
+def measure(fn, min_time=0.5, max_repeats=1000, min_repeats=3):
+    """{'ms': median, 'min_ms': fastest} milliseconds per call of `fn` (after one warm-up call)."""
+    gc.collect()
+    fn()
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_repeats and (len(samples) < min_repeats or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'ms': statistics.median(samples), 'min_ms': min(samples)}
+
+
+def synthetic_rows(n, seed=0):
+    """`n` random valid form inputs as an array in INPUT_FEATURES order."""
+    from synthetic_cohort import iter_cohort
+
+    cohort = next(iter_cohort(n, chunk_rows=n, seed=seed, preprocessed=True))
+    return cohort[INPUT_FEATURES].to_numpy(dtype=float)
+
+
+def default_bundle(kind="stack"):
+    """Synthetic bundle cached per kind and library versions, trained on first use."""
+    import sklearn
+    import xgboost
+
+    from synthetic_bundle import build_bundle
+
+    cache = Path(os.environ.get("HD_BENCH_CACHE", Path.home() / ".cache" / "hd-prognosis" / "bench"))
+    bundle = cache / f"{kind}-sklearn{sklearn.__version__}-xgb{xgboost.__version__}"
+    if not (bundle / "model_columns.json").is_file():
+        print(f"Training a synthetic {kind} bundle into {bundle} ...")
+        build_bundle(bundle, kind)
+    return bundle
+
+
+# ---------------------- CASES ----------------------
+def bench_loading(models_dir):
+    artifacts = load_artifacts(models_dir)
+    return {
+        'load_artifacts': measure(lambda: load_artifacts(models_dir), min_time=2, max_repeats=10),
+        'build_predictor': measure(lambda: Predictor.from_artifacts(artifacts), max_repeats=50),
+        'compile_model': measure(lambda: Predictor.from_artifacts(artifacts).use_compiled(), max_repeats=20),
+    }
+
+
+def bench_prediction(models_dir, batch_sizes):
+    results = {}
+    artifacts = load_artifacts(models_dir)
+    rows = synthetic_rows(max(batch_sizes))
+    for variant in ("model", "compiled"):
+        predictor = Predictor.from_artifacts(artifacts)
+        if variant == "compiled":
+            predictor.use_compiled()
+        results[f'form_submit.{variant}'] = measure(lambda: predictor.predict_one(FORM_ROW))
+        for n in batch_sizes:
+            X = rows[:n]
+            timing = measure(lambda: predictor.predict_batch(X), min_time=1, max_repeats=200)
+            results[f'predict_batch.{variant}.{n}'] = dict(timing, rows_per_s=n / timing['ms'] * 1000)
+    return results
+
+
+def bench_demo(batch_sizes):
+    row = dict(zip(INPUT_FEATURES, synthetic_rows(1)[0]))
+    results = {'demo_predict_stage': measure(lambda: demo_predict_stage(row))}
+    rows = synthetic_rows(max(batch_sizes))
+    for n in batch_sizes:
+        X = rows[:n]
+        timing = measure(lambda: demo_predict_stages(X), max_repeats=200)
+        results[f'demo_predict_stages.{n}'] = dict(timing, rows_per_s=n / timing['ms'] * 1000)
+    return results
+
+
+def bench_rendering():
+    from stage_render import benchmark
+
+    # stage_render reports a mean per call over its own loop.
+    timings = benchmark()
+    return {f'render.{name[:-3]}': {'ms': value} for name, value in timings.items() if name.endswith('_ms')}
+
+
+_PAGES_SNIPPET = """
+import json, statistics, sys, threading, time
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file({app_file!r}, default_timeout=600)
+at.run()
+# The thread may already have finished (and left threading.enumerate()) by the time the first run returns.
+warm_up = next((t for t in threading.enumerate() if t.name == "hd-warm-up"), None)
+if warm_up is not None:
+    warm_up.join()
+    if warm_up.error is not None:
+        sys.exit("warm-up thread raised: " + repr(warm_up.error))
+result = {{}}
+for page in {pages!r}:
+    samples = []
+    for _ in range({repeats}):
+        at.session_state.nav_menu = page
+        started = time.perf_counter()
+        at.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    if at.exception:
+        sys.exit("page " + page + " raised: " + str(at.exception[0].value))
+    result['page.' + page] = {{'ms': statistics.median(samples[1:]), 'min_ms': min(samples[1:])}}
+at.session_state.nav_menu = "Stage Prediction Tool"
+at.run()
+if [b for b in at.button if b.label == "Predict Disease Stage"]:
+    samples = []
+    for _ in range({repeats}):
+        started = time.perf_counter()
+        [b for b in at.button if b.label == "Predict Disease Stage"][0].click()
+        at.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    result['page.prediction_submit'] = {{'ms': statistics.median(samples[1:]), 'min_ms': min(samples[1:])}}
+print(json.dumps(result))
+"""
+
+
+def bench_pages(models_dir, repeats=8):
+    """Script run time per page (warm, AppTest in a fresh interpreter so the app's imports are not shared)."""
+    code = _PAGES_SNIPPET.format(app_file=str(APP_DIR / "app.py"), pages=PAGES, repeats=repeats)
+    env = dict(os.environ, HD_MODELS_DIR=str(Path(models_dir).resolve()))
+    out = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env=env, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# ---------------------- REPORT ----------------------
+def environment():
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        'commit': commit,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """(rows, regressions): per-case latency ratio against the baseline; a regression is a ratio above 1 + threshold.
+
+    Cases are compared on their fastest run, which is far less sensitive to
+    noisy neighbours than the median; for a fixed batch size a throughput
+    drop shows up as the same ratio.
+    """
+    rows, regressions = [], []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        key = 'min_ms' if 'min_ms' in current and 'min_ms' in previous else 'ms'
+        ratio = current[key] / previous[key]
+        rows.append((name, previous[key], current[key], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction path and check for regressions.")
+    parser.add_argument("--models-dir", default=None, help="Artifact folder; defaults to a cached synthetic bundle.")
+    parser.add_argument("--kind", choices=("stack", "xgb", "lr"), default="stack", help="Synthetic bundle to use.")
+    parser.add_argument("--max-rows", type=int, default=max(BATCH_SIZES))
+    parser.add_argument("--skip-pages", action="store_true", help="Skip the AppTest page runs (the slowest part).")
+    parser.add_argument("--output", default=None, help="Write the results JSON here.")
+    parser.add_argument("--baseline", default=None, help="Results JSON of an earlier run to compare against.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a case counts as a regression (0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    models_dir = Path(args.models_dir) if args.models_dir else default_bundle(args.kind)
+    batch_sizes = [n for n in BATCH_SIZES if n <= args.max_rows]
+    results = {}
+    for title, run in [
+        ("model loading", lambda: bench_loading(models_dir)),
+        ("prediction", lambda: bench_prediction(models_dir, batch_sizes)),
+        ("demo fallback", lambda: bench_demo(batch_sizes)),
+        ("rendering", bench_rendering),
+        ("pages", None if args.skip_pages else lambda: bench_pages(models_dir)),
+    ]:
+        if run is None:
+            continue
+        started = time.perf_counter()
+        results.update(run())
+        print(f"{title:<14} done in {time.perf_counter() - started:.1f}s")
+
+    report = {'environment': environment(), 'models_dir': str(models_dir), 'results': results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    print(f"\n{'case':<36} {'ms':>10} {'rows/s':>12}")
+    for name, r in results.items():
+        rate = f"{r['rows_per_s']:>12,.0f}" if 'rows_per_s' in r else ""
+        print(f"{name:<36} {r['ms']:>10.3f} {rate}")
+    if not args.baseline:
+        return 0
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    rows, regressions = compare(results, baseline['results'], args.threshold)
+    print(f"\nAgainst {args.baseline} ({baseline['environment'].get('commit') or 'unknown commit'}), "
+          f"threshold {args.threshold:.0%}:")
+    print(f"{'case (fastest run)':<36} {'baseline ms':>12} {'ms':>10} {'ratio':>7}")
+    for name, before, after, ratio in rows:
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<36} {before:>12.3f} {after:>10.3f} {ratio:>7.2f}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
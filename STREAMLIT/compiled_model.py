@@ -0,0 +1,540 @@
+"""Pure-NumPy inference graph for the fitted HD stage model.
+
+`compile_model` walks a fitted estimator (the StackingClassifier from
+`Stacked(LR+MLP+XGB).ipynb`, a StandardScaler/ColumnTransformer pipeline, or a
+bare LogisticRegression / MLPClassifier / XGBClassifier) and exports it into
+a few dense arrays:
+
+* scalers are folded into the weights of the linear model or the first MLP
+  layer, so a base model costs one matmul per layer;
+* XGBoost trees are flattened into node arrays and evaluated for every row and
+  tree at once by vectorized traversal (float32 comparisons, default
+  direction for NaN), then summed into per-class margins;
+* the stacking meta-model runs on the concatenated base probabilities.
+
+The graph takes the model-ready feature matrix (`Predictor.build_features`)
+as a plain float array, so no sklearn validation, DataFrame or DMatrix is
+built per call.
+
+    python STREAMLIT/compiled_model.py verify --models-dir models [--holdout holdout.csv]
+    python STREAMLIT/compiled_model.py bench --models-dir models
+"""
+import argparse
+import json
+import pickle
+import time
+
+import numpy as np
+
+# Largest absolute difference in class probabilities `verify` accepts.
+DEFAULT_ATOL = 1e-6
+BENCH_BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+# Rows traversed per block, so (rows x trees) index arrays stay small.
+TREE_BLOCK_ELEMENTS = 1 << 21
+
+
+# ---------------------- ACTIVATIONS ----------------------
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    z /= z.sum(axis=1, keepdims=True)
+    return z
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _binary(p):
+    p = p.ravel()
+    return np.column_stack([1.0 - p, p])
+
+
+_HIDDEN_ACTIVATIONS = {
+    'identity': lambda a: a,
+    'logistic': _sigmoid,
+    'tanh': np.tanh,
+    'relu': lambda a: np.maximum(a, 0.0, out=a),
+}
+
+
+# ---------------------- PREPROCESSING ----------------------
+class _Affine:
+    """Column selection plus per-column `(x - shift) / scale`, the exact form StandardScaler applies."""
+
+    def __init__(self, index, shift, scale):
+        self.index = np.asarray(index, dtype=np.intp)
+        self.shift = np.asarray(shift, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+
+    @classmethod
+    def identity(cls, n_features):
+        return cls(np.arange(n_features), np.zeros(n_features), np.ones(n_features))
+
+    @property
+    def n_inputs(self):
+        return int(self.index.max()) + 1 if self.index.size else 0
+
+    def __call__(self, X):
+        return (X[:, self.index] - self.shift) / self.scale
+
+    def select(self, columns):
+        return _Affine(self.index[columns], self.shift[columns], self.scale[columns])
+
+    def then_scaler(self, scaler):
+        """Composes a fitted StandardScaler applied to this affine's output."""
+        n = self.index.size
+        mean = scaler.mean_ if scaler.with_mean and scaler.mean_ is not None else np.zeros(n)
+        std = scaler.scale_ if scaler.with_std and scaler.scale_ is not None else np.ones(n)
+        # ((x - s1) / c1 - s2) / c2 == (x - (s1 + s2 * c1)) / (c1 * c2); exact when self is the identity.
+        return _Affine(self.index, self.shift + mean * self.scale, self.scale * std)
+
+    def fold(self, weights, bias, n_inputs):
+        """Folds this affine into a dense layer `out = affine(X) @ weights + bias`.
+
+        Returns (weights, bias) acting directly on the raw input columns.
+        """
+        scaled = weights / self.scale[:, None]
+        folded = np.zeros((n_inputs, weights.shape[1]))
+        np.add.at(folded, self.index, scaled)
+        return folded, bias - (self.shift / self.scale) @ weights
+
+
+def _column_indices(columns, feature_names):
+    if isinstance(columns, slice):
+        return np.arange(len(feature_names))[columns]
+    columns = np.atleast_1d(np.asarray(columns))
+    if columns.dtype == bool:
+        return np.flatnonzero(columns)
+    if columns.dtype.kind in 'iu':
+        return columns.astype(np.intp)
+    if feature_names is None:
+        raise TypeError("ColumnTransformer selects columns by name but was not fitted on named features.")
+    lookup = {name: i for i, name in enumerate(feature_names)}
+    return np.array([lookup[name] for name in columns], dtype=np.intp)
+
+
+def _compile_transformer(transformer, affine):
+    """Extends `affine` with one fitted preprocessing step."""
+    name = type(transformer).__name__
+    if transformer is None or transformer == 'passthrough':
+        return affine
+    if name == 'FunctionTransformer' and transformer.func is None:
+        # How a fitted ColumnTransformer stores remainder='passthrough'.
+        return affine
+    if name == 'StandardScaler':
+        return affine.then_scaler(transformer)
+    if name == 'Pipeline':
+        for _, step in transformer.steps:
+            affine = _compile_transformer(step, affine)
+        return affine
+    if name == 'ColumnTransformer':
+        feature_names = getattr(transformer, 'feature_names_in_', None)
+        parts = []
+        for _, step, columns in transformer.transformers_:
+            if step == 'drop':
+                continue
+            index = _column_indices(columns, feature_names)
+            if index.size:
+                parts.append(_compile_transformer(step, affine.select(index)))
+        return _Affine(
+            np.concatenate([p.index for p in parts]),
+            np.concatenate([p.shift for p in parts]),
+            np.concatenate([p.scale for p in parts]),
+        )
+    raise TypeError(f"Cannot compile preprocessing step {name}.")
+
+
+# ---------------------- GRAPH NODES ----------------------
+class _LinearNode:
+    """Logistic regression with the preprocessing folded into its coefficients."""
+
+    def __init__(self, weights, bias, output):
+        self.weights = weights
+        self.bias = bias
+        self.output = output
+
+    def __call__(self, X):
+        z = X @ self.weights + self.bias
+        if self.output == 'softmax':
+            return _softmax(z)
+        if self.output == 'binary_softmax':
+            return _softmax(np.column_stack([-z[:, 0], z[:, 0]]))
+        p = _sigmoid(z)
+        if p.shape[1] == 1:
+            return _binary(p)
+        return p / p.sum(axis=1, keepdims=True)
+
+
+class _MLPNode:
+    """Dense forward pass; the first layer already contains the folded scaler."""
+
+    def __init__(self, layers, activation, output):
+        self.layers = layers
+        self.activation = activation
+        self.output = output
+
+    def __call__(self, X):
+        hidden = _HIDDEN_ACTIVATIONS[self.activation]
+        a = X
+        last = len(self.layers) - 1
+        for i, (weights, bias) in enumerate(self.layers):
+            a = a @ weights
+            a += bias
+            if i != last:
+                a = hidden(a)
+        if self.output == 'softmax':
+            return _softmax(a)
+        out = _HIDDEN_ACTIVATIONS[self.output](a)
+        return _binary(out) if out.shape[1] == 1 else out
+
+
+class _TreeEnsembleNode:
+    """Gradient-boosted trees as flat node arrays, traversed for all rows and trees in lockstep.
+
+    Leaves point back to themselves, so `depth` synchronous steps land every
+    (row, tree) pair on its leaf without per-tree branching.
+    """
+
+    def __init__(self, affine, feature, threshold, left, right, default_left, leaf_value,
+                 roots, tree_class, n_classes, depth, base_margin, objective):
+        self.affine = affine
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.class_matrix = np.zeros((roots.size, n_classes))
+        self.class_matrix[np.arange(roots.size), tree_class] = 1.0
+        self.depth = depth
+        self.base_margin = base_margin
+        self.objective = objective
+
+    def margins(self, X):
+        # XGBoost compares in float32; run the scaler in float64 first exactly like the pipeline did.
+        X = np.ascontiguousarray(self.affine(X), dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        n_trees = self.roots.size
+        block = max(1, TREE_BLOCK_ELEMENTS // max(n_trees, 1))
+        out = np.empty((n_rows, self.class_matrix.shape[1]))
+        for start in range(0, n_rows, block):
+            stop = min(start + block, n_rows)
+            # Offsets of each row in the flattened matrix turn the 2-D gather into a cheaper 1-D one.
+            row_offset = (np.arange(start, stop, dtype=np.int32) * n_features)[:, None]
+            node = np.broadcast_to(self.roots, (stop - start, n_trees)).copy()
+            for _ in range(self.depth):
+                x = flat[row_offset + self.feature[node]]
+                go_left = x < self.threshold[node]
+                missing = np.isnan(x)
+                if missing.any():
+                    go_left = np.where(missing, self.default_left[node], go_left)
+                node = np.where(go_left, self.left[node], self.right[node])
+            out[start:stop] = self.leaf_value[node] @ self.class_matrix
+        return out + self.base_margin
+
+    def __call__(self, X):
+        margins = self.margins(X)
+        if self.objective == 'binary:logistic':
+            return _binary(_sigmoid(margins))
+        return _softmax(margins)
+
+
+class _StackNode:
+    """Base-model probabilities (plus the raw features with passthrough) fed to the meta-model."""
+
+    def __init__(self, bases, final, passthrough, drop_first):
+        self.bases = bases
+        self.final = final
+        self.passthrough = passthrough
+        self.drop_first = drop_first
+
+    def __call__(self, X):
+        meta = []
+        for base in self.bases:
+            proba = base(X)
+            meta.append(proba[:, 1:] if self.drop_first else proba)
+        if self.passthrough:
+            meta.append(X)
+        return self.final(np.hstack(meta))
+
+
+# ---------------------- COMPILERS ----------------------
+def _compile_logistic(model, affine):
+    coef = np.asarray(model.coef_, dtype=float)
+    weights, bias = affine.fold(coef.T, np.asarray(model.intercept_, dtype=float), affine.n_inputs)
+    # Mirrors LogisticRegression.predict_proba: one-vs-rest unless the fit was multinomial.
+    multi_class = getattr(model, 'multi_class', 'deprecated')
+    ovr = multi_class in ('ovr', 'warn') or (
+        multi_class in ('auto', 'deprecated') and (model.classes_.size <= 2 or model.solver == 'liblinear')
+    )
+    if ovr:
+        output = 'ovr'
+    else:
+        output = 'binary_softmax' if coef.shape[0] == 1 else 'softmax'
+    return _LinearNode(weights, bias, output)
+
+
+def _compile_mlp(model, affine):
+    layers = [(np.asarray(w, dtype=float), np.asarray(b, dtype=float))
+              for w, b in zip(model.coefs_, model.intercepts_)]
+    layers[0] = affine.fold(layers[0][0], layers[0][1], affine.n_inputs)
+    return _MLPNode(layers, model.activation, model.out_activation_)
+
+
+def _tree_depth(left, right, root):
+    depth, frontier = 0, [root]
+    while True:
+        children = [c for n in frontier for c in (left[n], right[n]) if c != -1]
+        if not children:
+            return depth
+        depth += 1
+        frontier = children
+
+
+def _compile_xgboost(model, affine):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    gbtree = learner['gradient_booster']
+    if gbtree['name'] != 'gbtree':
+        raise TypeError(f"Cannot compile XGBoost booster {gbtree['name']!r}; only gbtree is supported.")
+    objective = learner['objective']['name']
+    if objective not in ('multi:softmax', 'multi:softprob', 'binary:logistic'):
+        raise TypeError(f"Cannot compile XGBoost objective {objective!r}.")
+
+    trees = gbtree['model']['trees']
+    tree_info = gbtree['model']['tree_info']
+    rounds = booster.num_boosted_rounds()
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is not None:
+        # The sklearn wrapper predicts with the early-stopped iteration range.
+        per_round = len(trees) // rounds
+        rounds = int(best_iteration) + 1
+        trees = trees[:rounds * per_round]
+        tree_info = tree_info[:len(trees)]
+
+    feature, threshold, left, right, default_left, leaf_value, roots = [], [], [], [], [], [], []
+    depth, offset = 0, 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise TypeError("Cannot compile XGBoost trees with categorical splits.")
+        tree_left = np.asarray(tree['left_children'], dtype=np.int32)
+        tree_right = np.asarray(tree['right_children'], dtype=np.int32)
+        is_leaf = tree_left == -1
+        own = np.arange(tree_left.size, dtype=np.int32) + offset
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+
+        feature.append(np.where(is_leaf, 0, np.asarray(tree['split_indices'], dtype=np.int32)))
+        threshold.append(conditions)
+        # Leaves loop onto themselves; XGBoost stores the leaf value in split_conditions.
+        left.append(np.where(is_leaf, own, tree_left + offset))
+        right.append(np.where(is_leaf, own, tree_right + offset))
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        leaf_value.append(np.where(is_leaf, conditions, 0.0))
+        roots.append(offset)
+        depth = max(depth, _tree_depth(tree_left, tree_right, 0))
+        offset += tree_left.size
+
+    n_classes = max(int(learner['learner_model_param']['num_class']), 1)
+    node = _TreeEnsembleNode(
+        affine, np.concatenate(feature), np.concatenate(threshold),
+        np.concatenate(left), np.concatenate(right), np.concatenate(default_left),
+        np.concatenate(leaf_value).astype(float), np.asarray(roots, dtype=np.int32),
+        np.asarray(tree_info, dtype=np.intp), n_classes, depth, np.zeros(n_classes), objective,
+    )
+    # Calibrate the base margin (base_score / fitted intercepts) against the booster itself on one probe row.
+    import xgboost as xgb
+
+    probe = np.zeros((1, affine.n_inputs))
+    dmatrix = xgb.DMatrix(affine(probe), feature_names=booster.feature_names, feature_types=booster.feature_types)
+    reference = booster.predict(dmatrix, output_margin=True, iteration_range=(0, rounds))
+    node.base_margin = np.asarray(reference, dtype=float).reshape(1, -1)[0] - node.margins(probe)[0]
+    return node
+
+
+def _compile_stacking(model, affine):
+    if any(method != 'predict_proba' for method in model.stack_method_):
+        raise TypeError("Only stack_method='predict_proba' stacks can be compiled.")
+    bases = [_compile(estimator, affine) for estimator in model.estimators_]
+    drop_first = len(model.classes_) == 2
+    width = sum(len(model.classes_) - drop_first for _ in bases)
+    if model.passthrough:
+        width += affine.n_inputs
+    final = _compile(model.final_estimator_, _Affine.identity(width))
+    return _StackNode(bases, final, model.passthrough, drop_first)
+
+
+def _compile(model, affine):
+    name = type(model).__name__
+    if name == 'Pipeline':
+        for _, step in model.steps[:-1]:
+            affine = _compile_transformer(step, affine)
+        return _compile(model.steps[-1][1], affine)
+    if name == 'StackingClassifier':
+        return _compile_stacking(model, affine)
+    if name == 'LogisticRegression':
+        return _compile_logistic(model, affine)
+    if name == 'MLPClassifier':
+        return _compile_mlp(model, affine)
+    if name == 'XGBClassifier':
+        return _compile_xgboost(model, affine)
+    raise TypeError(f"Cannot compile estimator {name}.")
+
+
+class CompiledModel:
+    """Fused NumPy inference graph with the `predict` / `predict_proba` interface of the source model."""
+
+    def __init__(self, graph, classes, n_features):
+        self.graph = graph
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a 2-D array with {self.n_features_in_} columns, got shape {X.shape}.")
+        return self.graph(X)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def compile_model(model):
+    """Compiles a fitted estimator into a `CompiledModel`; raises TypeError for unsupported parts."""
+    n_features = int(model.n_features_in_)
+    return CompiledModel(_compile(model, _Affine.identity(n_features)), model.classes_, n_features)
+
+
+# ---------------------- VERIFICATION / BENCHMARK ----------------------
+def _model_frame(model, features):
+    if hasattr(model, 'feature_names_in_'):
+        import pandas as pd
+        return pd.DataFrame(features, columns=list(model.feature_names_in_))
+    return features
+
+
+def verify(model, compiled, features, atol=DEFAULT_ATOL):
+    """Compares the compiled graph with the original model on a feature matrix.
+
+    Returns the largest absolute probability difference, the label agreement
+    rate and whether both are within tolerance.
+    """
+    expected_proba = model.predict_proba(_model_frame(model, features))
+    actual_proba = compiled.predict_proba(features)
+    expected = model.predict(_model_frame(model, features))
+    actual = compiled.predict(features)
+    max_abs_diff = float(np.abs(expected_proba - actual_proba).max()) if len(features) else 0.0
+    agreement = float(np.mean(np.asarray(expected) == actual)) if len(features) else 1.0
+    return {
+        'rows': len(features),
+        'max_abs_diff': max_abs_diff,
+        'bitwise_identical': bool(np.array_equal(expected_proba, actual_proba)),
+        'label_agreement': agreement,
+        'ok': max_abs_diff <= atol and agreement == 1.0,
+    }
+
+
+def random_features(predictor, n_rows, seed=0):
+    """Model-ready features for `n_rows` random patients drawn inside FORM_BOUNDS."""
+    from predictor import FORM_BOUNDS, INPUT_FEATURES
+
+    rng = np.random.default_rng(seed)
+    columns = []
+    for col in INPUT_FEATURES:
+        if col in FORM_BOUNDS:
+            low, high = FORM_BOUNDS[col]
+            columns.append(rng.uniform(low, high, n_rows).round(1 if col == 'Chorea_Score' else 0))
+        else:
+            columns.append(rng.integers(0, 2, n_rows).astype(float))
+    return predictor.build_features(np.column_stack(columns))
+
+
+def _median_seconds(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+
+def benchmark(model, compiled, features_for, batch_sizes=BENCH_BATCH_SIZES, min_rows=200000):
+    """Median `predict` latency of the original model and the compiled graph per batch size."""
+    results = []
+    for size in batch_sizes:
+        features = features_for(size)
+        frame = _model_frame(model, features)
+        repeats = int(np.clip(min_rows // size, 3, 200))
+        original = _median_seconds(lambda: model.predict(_model_frame(model, features)), repeats)
+        fused = _median_seconds(lambda: compiled.predict(features), repeats)
+        results.append({
+            'batch_size': size,
+            'original_ms': original * 1000,
+            'compiled_ms': fused * 1000,
+            'speedup': original / fused if fused else float('inf'),
+            'agreement': float(np.mean(np.asarray(model.predict(frame)) == compiled.predict(features))),
+        })
+    return results
+
+
+def _load_holdout(path, predictor):
+    import pandas as pd
+
+    frame = pd.read_csv(path)
+    if all(col in frame.columns for col in predictor.model_columns):
+        return frame[predictor.model_columns].to_numpy(dtype=float)
+    return predictor.build_features(frame)
+
+
+def main(argv=None):
+    from predictor import Predictor, load_artifacts
+
+    parser = argparse.ArgumentParser(description="Compile, verify and benchmark the fused NumPy model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("verify", "Check the compiled graph against the original model."),
+                            ("bench", "Latency of the original model vs the compiled graph.")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--models-dir", default="models")
+        command.add_argument("--holdout", default=None,
+                             help="CSV with either the model columns or the raw input fields.")
+        command.add_argument("--rows", type=int, default=5000, help="Random rows when no holdout is given.")
+        command.add_argument("--atol", type=float, default=DEFAULT_ATOL)
+        command.add_argument("--output", default=None, help="Also save the compiled graph to this path.")
+    args = parser.parse_args(argv)
+
+    predictor = Predictor.from_artifacts(load_artifacts(args.models_dir))
+    model = predictor.model
+    started = time.perf_counter()
+    compiled = compile_model(model)
+    print(f"Compiled {type(model).__name__} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    if args.output:
+        compiled.save(args.output)
+
+    if args.holdout:
+        features = _load_holdout(args.holdout, predictor)
+    else:
+        features = random_features(predictor, args.rows)
+    report = verify(model, compiled, features, args.atol)
+    print(json.dumps(report, indent=2))
+    if args.command == "verify":
+        return 0 if report['ok'] else 1
+
+    print(f"{'batch':>7} {'original (ms)':>14} {'compiled (ms)':>14} {'speedup':>8}")
+    for row in benchmark(model, compiled, lambda n: random_features(predictor, n, seed=n)):
+        print(f"{row['batch_size']:>7} {row['original_ms']:>14.3f} {row['compiled_ms']:>14.3f} {row['speedup']:>7.1f}x")
+    return 0 if report['ok'] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,316 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Starts `streamlit run` on the app and drives N simulated browser sessions at
+once over the websocket protocol (the `Session` client of measure_submit.py):
+each session opens Home, navigates to the Stage Prediction Tool and, once
+every session is on that page, submits the form repeatedly with inputs of
+its own (so the shared prediction cache does not answer for the model).
+All sessions share the server's `st.cache_resource` model, prediction cache
+and thread pools, as real users do.
+
+For each concurrency level it reports p50/p95/p99 submit and navigation
+latency, completed submits per second, errors, and the server's CPU and RSS
+sampled while the level ran. The throughput ceiling is the best rate over
+all levels; the saturation point is the first level past which adding
+sessions no longer raises the rate by 10%. The client runs in this process,
+so its own CPU share is reported too: near 100% of a core it, not the
+server, limits the numbers.
+
+Without --models-dir or --synthetic the app runs in demo mode (rule-based
+fallback), so no network or private artifacts are needed. Like
+measure_submit.py it needs `pip install psutil websockets`.
+
+    python STREAMLIT/load_test.py --sessions 1,4,16,32 --submits 10 [--synthetic stack | --models-dir models]
+    python STREAMLIT/load_test.py --synthetic xgb --env OMP_NUM_THREADS=1 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+
+from measure_submit import (
+    APP_FILE, PREDICTION_PAGE, SUBMIT_LABEL, TOOL_DEPENDENCIES, Session, find_element, free_port, require, start_server,
+)
+
+DEFAULT_LEVELS = (1, 4, 16, 32)
+SATURATION_GAIN = 0.10
+
+
+def percentiles(values, points=(50, 95, 99)):
+    """{'p50': ..., 'p95': ..., 'p99': ...} of `values` (nearest-rank on the sorted sample)."""
+    ordered = sorted(values)
+    if not ordered:
+        return {f"p{p}": None for p in points}
+    return {f"p{p}": ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] for p in points}
+
+
+class ServerMonitor:
+    """Samples CPU (all cores, percent of one core) and RSS of the server and its children from a thread."""
+
+    def __init__(self, pid, interval=0.2):
+        psutil = require("psutil")
+
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _processes(self):
+        psutil = require("psutil")
+
+        try:
+            return [self.process, *self.process.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return []
+
+    def _cpu_seconds(self, processes):
+        total = 0.0
+        for p in processes:
+            try:
+                times = p.cpu_times()
+                total += times.user + times.system
+            except Exception:
+                pass
+        return total
+
+    def _run(self):
+        previous_cpu, previous_at = self._cpu_seconds(self._processes()), time.perf_counter()
+        while not self._stop.wait(self.interval):
+            processes = self._processes()
+            cpu, now = self._cpu_seconds(processes), time.perf_counter()
+            rss = 0
+            for p in processes:
+                try:
+                    rss += p.memory_info().rss
+                except Exception:
+                    pass
+            self.samples.append((100 * (cpu - previous_cpu) / (now - previous_at), rss))
+            previous_cpu, previous_at = cpu, now
+
+    def __enter__(self):
+        self.samples = []
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="load-test-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def summary(self):
+        if not self.samples:
+            return {"cpu_percent_mean": None, "cpu_percent_max": None, "rss_mb_max": None}
+        cpu = [c for c, _ in self.samples]
+        return {
+            "cpu_percent_mean": statistics.fmean(cpu),
+            "cpu_percent_max": max(cpu),
+            "rss_mb_max": max(r for _, r in self.samples) / 1e6,
+        }
+
+
+# ---------------------- SESSIONS ----------------------
+async def _open_prediction_page(session):
+    """(submit_id, fragment_id, motor_id, cognitive_id, navigate_ms) after loading Home and opening the form."""
+    _, elements = await session.rerun()
+    menu, _ = find_element(elements, "component_instance")
+    session.set_state(menu.id, json_value=json.dumps(PREDICTION_PAGE))
+    started = time.perf_counter()
+    _, elements = await session.rerun()
+    navigate_ms = (time.perf_counter() - started) * 1000
+    submit, fragment_id = find_element(elements, "button", lambda b: b.label == SUBMIT_LABEL)
+    motor, _ = find_element(elements, "number_input", lambda n: n.label == "Motor Score")
+    cognitive, _ = find_element(elements, "number_input", lambda n: n.label == "Cognitive Score")
+    return submit.id, fragment_id, motor.id, cognitive.id, navigate_ms
+
+
+async def run_session(port, index, submits, ready, go, think_time=0.0):
+    """One simulated user; returns {'navigate_ms', 'submits': [(start, end)], 'errors': [...]}."""
+    websockets = require("websockets")
+
+    result = {"navigate_ms": None, "submits": [], "errors": []}
+    signalled = False
+    try:
+        async with websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                      max_size=None, open_timeout=60) as ws:
+            session = Session(ws)
+            submit_id, fragment_id, motor_id, cognitive_id, result["navigate_ms"] = \
+                await _open_prediction_page(session)
+            signalled = True
+            ready()
+            await go.wait()
+            # Distinct (motor, cognitive) pairs per session and submit keep the prediction cache cold.
+            session.set_state(cognitive_id, int_value=(index * 13) % 100)
+            for i in range(submits):
+                session.set_state(motor_id, int_value=10 + (i * 7 + index) % 110)
+                started = time.perf_counter()
+                _, elements = await session.rerun(fragment_id, triggers=[submit_id])
+                finished = time.perf_counter()
+                exceptions = [e.exception.message for e, _ in elements if e.WhichOneof("type") == "exception"]
+                if exceptions:
+                    result["errors"].append(exceptions[0])
+                else:
+                    result["submits"].append((started, finished))
+                if think_time:
+                    await asyncio.sleep(think_time)
+    except Exception as e:
+        result["errors"].append(f"{type(e).__name__}: {e}")
+    finally:
+        if not signalled:
+            ready()  # a session that failed to open the form must not hold the others back
+    return result
+
+
+async def run_level(port, sessions, submits, think_time=0.0):
+    """Runs `sessions` concurrent users; submits start together once every session has opened the form."""
+    go = asyncio.Event()
+    waiting = [sessions]
+
+    def ready():
+        waiting[0] -= 1
+        if waiting[0] == 0:
+            go.set()
+
+    return await asyncio.gather(*(run_session(port, i, submits, ready, go, think_time) for i in range(sessions)))
+
+
+def summarize(sessions, results, server, client_cpu_percent):
+    spans = [span for r in results for span in r["submits"]]
+    latencies = [(end - start) * 1000 for start, end in spans]
+    navigations = [r["navigate_ms"] for r in results if r["navigate_ms"] is not None]
+    window = (max(end for _, end in spans) - min(start for start, _ in spans)) if spans else 0.0
+    return {
+        "sessions": sessions,
+        "submits": len(spans),
+        "errors": sum(len(r["errors"]) for r in results),
+        "first_error": next((r["errors"][0] for r in results if r["errors"]), None),
+        "throughput_per_s": len(spans) / window if window else 0.0,
+        "submit_ms": {**percentiles(latencies), "mean": statistics.fmean(latencies) if latencies else None},
+        "navigate_ms": percentiles(navigations),
+        **server,
+        "client_cpu_percent": client_cpu_percent,
+    }
+
+
+def saturation(levels):
+    """(ceiling_per_s, saturated_at): best throughput and the first level whose successor adds < SATURATION_GAIN."""
+    if not levels:
+        return 0.0, None
+    ceiling = max(level["throughput_per_s"] for level in levels)
+    for current, following in zip(levels, levels[1:]):
+        if following["throughput_per_s"] < current["throughput_per_s"] * (1 + SATURATION_GAIN):
+            return ceiling, current["sessions"]
+    return ceiling, None
+
+
+def load_test(port, pid, levels, submits, think_time=0.0):
+    """Warms the server up with one session, then runs each concurrency level; returns the per-level summaries."""
+    psutil = require("psutil")
+
+    asyncio.run(run_level(port, 1, 2))  # loads the model and the prediction page imports
+    client = psutil.Process()
+    summaries = []
+    for sessions in levels:
+        monitor = ServerMonitor(pid)
+        client_cpu, started = sum(client.cpu_times()[:2]), time.perf_counter()
+        with monitor:
+            results = asyncio.run(run_level(port, sessions, submits, think_time))
+        client_percent = 100 * (sum(client.cpu_times()[:2]) - client_cpu) / (time.perf_counter() - started)
+        summaries.append(summarize(sessions, results, monitor.summary(), client_percent))
+        print(_format_row(summaries[-1]), flush=True)
+    return summaries
+
+
+# ---------------------- REPORT ----------------------
+_HEADER = (f"{'sessions':>8} {'submits/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'nav p95':>8} "
+           f"{'server cpu%':>11} {'rss MB':>7} {'client cpu%':>11} {'errors':>6}")
+
+
+def _ms(value):
+    return f"{value:.0f}" if value is not None else "-"
+
+
+def _format_row(level):
+    s = level["submit_ms"]
+    cpu = level["cpu_percent_mean"]
+    rss = level["rss_mb_max"]
+    return (f"{level['sessions']:>8} {level['throughput_per_s']:>10.1f} {_ms(s['p50']):>8} {_ms(s['p95']):>8} "
+            f"{_ms(s['p99']):>8} {_ms(level['navigate_ms']['p95']):>8} "
+            f"{(f'{cpu:.0f}' if cpu is not None else '-'):>11} {(f'{rss:.0f}' if rss is not None else '-'):>7} "
+            f"{level['client_cpu_percent']:>11.0f} {level['errors']:>6}")
+
+
+def _levels(text):
+    levels = [int(v) for v in text.split(",")]
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError("expected a comma-separated list of positive session counts")
+    return levels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive concurrent Streamlit sessions through the prediction form.")
+    parser.add_argument("--app", default=str(APP_FILE))
+    parser.add_argument("--sessions", type=_levels, default=list(DEFAULT_LEVELS),
+                        help="Comma-separated concurrency levels (default 1,4,16,32).")
+    parser.add_argument("--submits", type=int, default=10, help="Form submits per session and level.")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds each session waits between submits.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--models-dir", default=None, help="Sets HD_MODELS_DIR.")
+    source.add_argument("--synthetic", choices=("stack", "xgb", "lr"), default=None,
+                        help="Use a cached synthetic bundle of this kind (see bench_prediction.py).")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra server environment, e.g. OMP_NUM_THREADS=1 or HD_COMPILED_MODEL=1.")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Write the results JSON here.")
+    args = parser.parse_args(argv)
+    for name in TOOL_DEPENDENCIES:
+        require(name)  # fail before the server is started
+
+    env = dict(os.environ)
+    models_dir = args.models_dir
+    if args.synthetic:
+        from bench_prediction import default_bundle
+
+        models_dir = default_bundle(args.synthetic)
+    if models_dir:
+        env["HD_MODELS_DIR"] = str(Path(models_dir).resolve())
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    port = args.port or free_port()
+    app = Path(args.app).resolve()
+    print(f"Model: {env.get('HD_MODELS_DIR') or 'demo mode'}; {args.submits} submits per session\n{_HEADER}", flush=True)
+    server = start_server(app, port, env, cwd=app.parent.parent)
+    try:
+        levels = load_test(port, server.pid, args.sessions, args.submits, args.think_time)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    ceiling, saturated_at = saturation(levels)
+    print(f"\nThroughput ceiling {ceiling:.1f} submits/s"
+          + (f", saturated at {saturated_at} sessions." if saturated_at else "; not saturated at these levels."))
+    if args.output:
+        report = {
+            "models_dir": env.get("HD_MODELS_DIR"),
+            "cpus": os.cpu_count(),
+            "submits_per_session": args.submits,
+            "think_time": args.think_time,
+            "env": args.env,
+            "levels": levels,
+            "ceiling_per_s": ceiling,
+            "saturated_at": saturated_at,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    return 1 if any(level["errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
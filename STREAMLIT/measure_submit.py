@@ -0,0 +1,175 @@
+"""Server cost of one Stage Prediction Tool submission.
+
+Starts `streamlit run` on the app, talks to it over the same websocket
+protocol the browser uses, opens the prediction page and submits the form
+repeatedly (varying the motor score so the prediction cache does not hide
+the model call). For each submit it records the server process CPU time,
+the bytes of ForwardMsgs sent to the client and the wall time until the
+run finishes. A submit inside a fragment is sent as a fragment rerun, the
+way the browser does it.
+
+It needs psutil and websockets, which the app itself does not use and
+requirements.txt does not install:
+
+    pip install psutil websockets
+    python STREAMLIT/measure_submit.py --submits 30 [--models-dir models] [--app path/to/app.py]
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+APP_FILE = Path(__file__).resolve().parent / "app.py"
+PREDICTION_PAGE = "Stage Prediction Tool"
+SUBMIT_LABEL = "Predict Disease Stage"
+TOOL_DEPENDENCIES = ("psutil", "websockets")
+
+
+def require(name):
+    """Imports `name`, one of the TOOL_DEPENDENCIES, with an install hint when it is missing."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise ImportError(f"The measurement tools need {name}, which requirements.txt does not install; "
+                          f"run `pip install {' '.join(TOOL_DEPENDENCIES)}`.") from None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, port, env, cwd):
+    command = [sys.executable, "-m", "streamlit", "run", str(app), "--server.port", str(port),
+               "--server.headless", "true", "--browser.gatherUsageStats", "false"]
+    server = subprocess.Popen(command, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Streamlit server did not become healthy within 60s.")
+
+
+class Session:
+    """Minimal Streamlit websocket client: sends reruns and collects the ForwardMsgs of each run."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widget_states = {}
+
+    async def rerun(self, fragment_id="", triggers=()):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = ""
+        message.rerun_script.fragment_id = fragment_id
+        for state in self.widget_states.values():
+            message.rerun_script.widget_states.widgets.append(state)
+        for widget_id in triggers:
+            message.rerun_script.widget_states.widgets.add(id=widget_id, trigger_value=True)
+        await self.ws.send(message.SerializeToString())
+
+        received, elements = 0, []
+        while True:
+            raw = await self.ws.recv()
+            received += len(raw)
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                elements.append((forward.delta.new_element, forward.delta.fragment_id))
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return received, elements
+
+    def set_state(self, widget_id, **value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        self.widget_states[widget_id] = WidgetState(id=widget_id, **value)
+
+
+def find_element(elements, element_type, predicate=lambda e: True):
+    for element, fragment_id in elements:
+        if element.WhichOneof("type") == element_type and predicate(getattr(element, element_type)):
+            return getattr(element, element_type), fragment_id
+    raise LookupError(f"No {element_type} element found on the page.")
+
+
+async def measure(port, pid, submits):
+    psutil = require("psutil")
+    websockets = require("websockets")
+
+    process = psutil.Process(pid)
+    async with websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                  max_size=None) as ws:
+        session = Session(ws)
+        _, elements = await session.rerun()
+        menu, _ = find_element(elements, "component_instance")
+        session.set_state(menu.id, json_value=json.dumps(PREDICTION_PAGE))
+        _, elements = await session.rerun()
+        submit, fragment_id = find_element(elements, "button", lambda b: b.label == SUBMIT_LABEL)
+        motor, _ = find_element(elements, "number_input", lambda n: n.label == "Motor Score")
+
+        samples = []
+        for i in range(submits):
+            session.set_state(motor.id, int_value=10 + (i * 7) % 110)
+            cpu_before = sum(process.cpu_times()[:2])
+            started = time.perf_counter()
+            received, _ = await session.rerun(fragment_id, triggers=[submit.id])
+            samples.append({
+                "wall_ms": (time.perf_counter() - started) * 1000,
+                "cpu_ms": (sum(process.cpu_times()[:2]) - cpu_before) * 1000,
+                "bytes": received,
+            })
+    # The first submit pays one-off costs (model call warm-up, plotly templates); report it separately.
+    steady = samples[1:] or samples
+    return {
+        "fragment_run": bool(fragment_id),
+        "first_submit": samples[0],
+        "submits": len(steady),
+        "cpu_ms_median": statistics.median(s["cpu_ms"] for s in steady),
+        "wall_ms_median": statistics.median(s["wall_ms"] for s in steady),
+        "bytes_median": statistics.median(s["bytes"] for s in steady),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure server CPU and bytes per prediction submit.")
+    parser.add_argument("--app", default=str(APP_FILE))
+    parser.add_argument("--models-dir", default=None, help="Sets HD_MODELS_DIR; without it the app runs in demo mode.")
+    parser.add_argument("--submits", type=int, default=30)
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args(argv)
+    for name in TOOL_DEPENDENCIES:
+        require(name)  # fail before the server is started
+
+    env = dict(os.environ)
+    if args.models_dir:
+        env["HD_MODELS_DIR"] = str(Path(args.models_dir).resolve())
+    port = args.port or free_port()
+    server = start_server(Path(args.app).resolve(), port, env, cwd=Path(args.app).resolve().parent.parent)
+    try:
+        result = asyncio.run(measure(port, server.pid, args.submits))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
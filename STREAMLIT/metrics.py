@@ -0,0 +1,253 @@
+"""In-process latency histograms for the prediction hot path and page renders.
+
+Off unless HD_METRICS=1 (read at import). When off, `span()` returns a
+shared no-op context manager and `timed()` returns the function unchanged,
+so instrumented code pays at most one global lookup per span.
+
+When on, every span adds its duration to a fixed-bucket histogram (count,
+sum and cumulative buckets, Prometheus style). Histograms are exported as
+Prometheus text or JSON:
+
+- HD_METRICS_FILE=/path/metrics.prom (or .json) makes the app rewrite
+  that file every HD_METRICS_INTERVAL seconds (default 15) for a
+  node_exporter textfile collector or any file scraper;
+- the scoring service adds the spans to `GET /metrics` and serves
+  Prometheus text at `GET /metrics/prometheus`.
+
+    python STREAMLIT/metrics.py overhead          # per-span cost, enabled vs disabled
+    python STREAMLIT/metrics.py show metrics.json # summary of an exported file
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from pathlib import Path
+
+ENABLED = os.environ.get("HD_METRICS") == "1"
+METRIC_NAME = "hd_span_seconds"
+# Upper bounds in seconds: 50 µs to 30 s, roughly 2.5x apart.
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Count, sum and per-bucket counts of observed durations."""
+
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation, capped at the largest observation."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+
+class Registry:
+    """Thread-safe map of span name -> Histogram."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        """JSON-ready summary per span: count, sum, mean, max, p50/p90/p99 bucket bounds and cumulative buckets (ms)."""
+        with self._lock:
+            items = [(name, h.count, h.total, h.maximum, list(h.counts), [h.quantile(q) for q in (0.5, 0.9, 0.99)])
+                     for name, h in sorted(self._histograms.items())]
+        summary = {}
+        for name, count, total, maximum, counts, (p50, p90, p99) in items:
+            cumulative, buckets = 0, {}
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                buckets[f"{bound * 1000:g}"] = cumulative
+            summary[name] = {
+                "count": count,
+                "sum_ms": total * 1000,
+                "mean_ms": total / count * 1000 if count else 0.0,
+                "max_ms": maximum * 1000,
+                "p50_ms": p50 * 1000, "p90_ms": p90 * 1000, "p99_ms": p99 * 1000,
+                "buckets_ms": buckets,
+            }
+        return summary
+
+    def to_prometheus(self):
+        with self._lock:
+            items = sorted((name, list(h.counts), h.count, h.total) for name, h in self._histograms.items())
+        lines = [f"# HELP {METRIC_NAME} Time spent in instrumented spans of the HD app.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        for name, counts, count, total in items:
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                lines.append(f'{METRIC_NAME}_bucket{{span="{label}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{span="{label}",le="+Inf"}} {count}')
+            lines.append(f'{METRIC_NAME}_sum{{span="{label}"}} {total:.9g}')
+            lines.append(f'{METRIC_NAME}_count{{span="{label}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically writes Prometheus text (`.prom`/`.txt`) or JSON (anything else) to `path`."""
+        path = Path(path)
+        text = self.to_prometheus() if path.suffix in (".prom", ".txt") else json.dumps(self.snapshot(), indent=2)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(text)
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+
+# ---------------------- SPANS ----------------------
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name):
+    """Context manager timing its block into the `name` histogram (a shared no-op when metrics are off)."""
+    return _Span(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    """Decorator form of `span`; returns the function unchanged when metrics are off at import."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe(name, seconds):
+    """Records a duration measured elsewhere (e.g. a queued request's end-to-end latency)."""
+    if ENABLED:
+        REGISTRY.observe(name, seconds)
+
+
+def start_file_exporter(path=None, interval=None):
+    """Rewrites `path` ($HD_METRICS_FILE) every `interval` seconds from a daemon thread; None when not configured."""
+    path = path or os.environ.get("HD_METRICS_FILE")
+    if not ENABLED or not path:
+        return None
+    interval = interval or float(os.environ.get("HD_METRICS_INTERVAL", 15))
+
+    def export():
+        while True:
+            time.sleep(interval)
+            try:
+                REGISTRY.write(path)
+            except OSError as e:
+                print(f"Could not write metrics to {path}: {e}")
+
+    thread = threading.Thread(target=export, name="hd-metrics-export", daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------------------- CLI ----------------------
+def measure_overhead(repeats=200000):
+    """Nanoseconds per `with span(...)` block with metrics off and on, net of the bare loop."""
+    global ENABLED
+    previous = ENABLED
+    started = time.perf_counter()
+    for _ in range(repeats):
+        pass
+    loop_ns = (time.perf_counter() - started) / repeats * 1e9
+    result = {}
+    try:
+        for enabled in (False, True):
+            ENABLED = enabled
+            started = time.perf_counter()
+            for _ in range(repeats):
+                with span("overhead"):
+                    pass
+            result["enabled_ns" if enabled else "disabled_ns"] = (time.perf_counter() - started) / repeats * 1e9 - loop_ns
+    finally:
+        ENABLED = previous
+        REGISTRY.reset()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the span metrics.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    overhead = commands.add_parser("overhead", help="Per-span cost with metrics off and on.")
+    overhead.add_argument("--repeats", type=int, default=200000)
+    show = commands.add_parser("show", help="Summarize a JSON file written via HD_METRICS_FILE.")
+    show.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "overhead":
+        for name, ns in measure_overhead(args.repeats).items():
+            print(f"{name:<12} {ns:>8.0f} ns per span")
+        return 0
+
+    summary = json.loads(Path(args.path).read_text())
+    print(f"{'span':<28} {'count':>7} {'mean ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, s in sorted(summary.items(), key=lambda item: -item[1]["sum_ms"]):
+        print(f"{name:<28} {s['count']:>7} {s['mean_ms']:>9.3f} {s['p50_ms']:>8.3f} {s['p99_ms']:>8.3f} {s['max_ms']:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
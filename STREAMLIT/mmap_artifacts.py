@@ -0,0 +1,258 @@
+"""Memory-mapped model artifact format.
+
+`convert` re-pickles the joblib artifacts with every large NumPy array
+(MLP coefficient matrices, scaler means/scales, LR coefficients, ...) and
+every large byte buffer (the serialized XGBoost booster) moved out into its
+own file. `load_mmap_artifacts` maps those files back in with `np.load(...,
+mmap_mode='r')` / `mmap`, so a cold load only unpickles the small object
+skeleton and the OS page cache is shared by every worker process.
+
+The manifest records the size and SHA-256 of every payload file, plus the
+joblib folder the bundle was converted from. `predictor.load_artifacts`
+checks the sizes before mapping and loads that source folder instead when a
+payload is missing or truncated; `verify` re-hashes every payload.
+
+    python STREAMLIT/mmap_artifacts.py convert models models_mmap
+    python STREAMLIT/mmap_artifacts.py verify models_mmap
+    python STREAMLIT/mmap_artifacts.py compare models models_mmap
+"""
+import argparse
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+import shutil
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from predictor import FEATURE_ENCODERS_FILE, MODEL_COLUMNS_FILE, MODEL_FILE, TARGET_ENCODER_FILE
+
+MMAP_MANIFEST = "mmap_format.json"
+FORMAT_VERSION = 2
+PICKLED_FILES = [MODEL_FILE, FEATURE_ENCODERS_FILE, TARGET_ENCODER_FILE]
+# Payloads smaller than this stay inline in the skeleton pickle.
+MIN_EXTERNAL_BYTES = 4096
+
+
+class _ExternalizingPickler(pickle.Pickler):
+    """Pickler that writes large arrays and byte buffers to side files and references them by name."""
+
+    def __init__(self, file, payload_dir, min_bytes):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.payload_dir = payload_dir
+        self.min_bytes = min_bytes
+        self.payloads = {}
+
+    def _name(self, suffix):
+        return f"{len(self.payloads):04d}{suffix}"
+
+    def persistent_id(self, obj):
+        if isinstance(obj, np.ndarray) and not obj.dtype.hasobject and obj.nbytes >= self.min_bytes:
+            name = self._name(".npy")
+            np.save(self.payload_dir / name, np.ascontiguousarray(obj), allow_pickle=False)
+            self.payloads[name] = obj.nbytes
+            # Keep the subclass (e.g. np.memmap) out of the skeleton; it is restored as a read-only map.
+            return ("ndarray", name)
+        if isinstance(obj, (bytes, bytearray)) and len(obj) >= self.min_bytes:
+            name = self._name(".bin")
+            (self.payload_dir / name).write_bytes(obj)
+            self.payloads[name] = len(obj)
+            return (type(obj).__name__, name)
+        return None
+
+
+class _MappingUnpickler(pickle.Unpickler):
+    def __init__(self, file, payload_dir):
+        super().__init__(file)
+        self.payload_dir = payload_dir
+
+    def persistent_load(self, pid):
+        kind, name = pid
+        path = self.payload_dir / name
+        if kind == "ndarray":
+            return np.load(path, mmap_mode="r", allow_pickle=False)
+        with open(path, "rb") as f:
+            if kind == "bytes":
+                return f.read()
+            # Copy-on-write map: writable (XGBoost's ctypes from_buffer needs that) but page-cache backed.
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def convert(src_dir, dst_dir, min_bytes=MIN_EXTERNAL_BYTES):
+    """Converts a joblib artifact folder into the memory-mapped format and returns the manifest."""
+    import joblib
+
+    src_dir, dst_dir = Path(src_dir), Path(dst_dir)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {"format_version": FORMAT_VERSION, "source": os.path.relpath(src_dir, dst_dir), "files": {}}
+
+    for name in PICKLED_FILES:
+        payload_dir = dst_dir / f"{name}.payloads"
+        shutil.rmtree(payload_dir, ignore_errors=True)
+        payload_dir.mkdir()
+        with open(dst_dir / name, "wb") as f:
+            pickler = _ExternalizingPickler(f, payload_dir, min_bytes)
+            pickler.dump(joblib.load(src_dir / name))
+        manifest["files"][name] = {
+            "payloads": {p: {"size": (payload_dir / p).stat().st_size, "sha256": _sha256(payload_dir / p)}
+                         for p in sorted(pickler.payloads)},
+            "external_bytes": sum(pickler.payloads.values()),
+        }
+
+    shutil.copyfile(src_dir / MODEL_COLUMNS_FILE, dst_dir / MODEL_COLUMNS_FILE)
+    with open(dst_dir / MMAP_MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def is_mmap_bundle(directory):
+    return (Path(directory) / MMAP_MANIFEST).is_file()
+
+
+def _read_manifest(directory):
+    try:
+        with open(Path(directory) / MMAP_MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def verify_mmap_bundle(directory, full=False):
+    """True when every payload listed in the manifest of `directory` is present and intact.
+
+    The default check compares file sizes; `full=True` re-hashes every payload.
+    """
+    directory = Path(directory)
+    manifest = _read_manifest(directory)
+    if not manifest or manifest.get("format_version") != FORMAT_VERSION:
+        return False
+    for name in PICKLED_FILES:
+        entry = manifest["files"].get(name)
+        if entry is None or not (directory / name).is_file():
+            return False
+        for payload, expected in entry["payloads"].items():
+            path = directory / f"{name}.payloads" / payload
+            if not path.is_file() or path.stat().st_size != expected["size"]:
+                return False
+            if full and _sha256(path) != expected["sha256"]:
+                return False
+    return True
+
+
+def source_dir(directory):
+    """The joblib folder `directory` was converted from, if it still holds the artifacts, else None."""
+    manifest = _read_manifest(directory) or {}
+    if "source" not in manifest:
+        return None
+    source = (Path(directory) / manifest["source"]).resolve()
+    return source if (source / MODEL_FILE).is_file() and not is_mmap_bundle(source) else None
+
+
+def load_pickled(directory, name):
+    directory = Path(directory)
+    with open(directory / name, "rb") as f:
+        return _MappingUnpickler(io.BytesIO(f.read()), directory / f"{name}.payloads").load()
+
+
+def load_mmap_artifacts(directory):
+    """Memory-mapped counterpart of `predictor.load_artifacts`."""
+    model = load_pickled(directory, MODEL_FILE)
+    feature_encoders = load_pickled(directory, FEATURE_ENCODERS_FILE)
+    target_encoder = load_pickled(directory, TARGET_ENCODER_FILE)
+    with open(Path(directory) / MODEL_COLUMNS_FILE) as f:
+        model_columns = json.load(f)
+    return model, target_encoder, feature_encoders, model_columns
+
+
+# ---------------------- LOAD-TIME / RSS COMPARISON ----------------------
+_MEASURE_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {here!r})
+def rss_kb():
+    fields = {{}}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        import resource
+        fields['Rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return fields
+import numpy, joblib, sklearn, xgboost
+import predictor
+before = rss_kb()
+started = time.perf_counter()
+artifacts = predictor.load_artifacts({directory!r})
+elapsed = time.perf_counter() - started
+after = rss_kb()
+print(json.dumps({{
+    'load_s': elapsed,
+    'rss_kb': after.get('Rss', 0) - before.get('Rss', 0),
+    'private_kb': (after.get('Private_Clean', 0) + after.get('Private_Dirty', 0))
+                  - (before.get('Private_Clean', 0) + before.get('Private_Dirty', 0)),
+}}))
+"""
+
+
+def measure(directory, repeats=5):
+    """Median load time / RSS growth of `predictor.load_artifacts(directory)` in fresh interpreters."""
+    here = str(Path(__file__).resolve().parent)
+    code = _MEASURE_SNIPPET.format(here=here, directory=str(directory))
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert and benchmark memory-mapped model artifacts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert_cmd = commands.add_parser("convert", help="Convert a joblib artifact folder.")
+    convert_cmd.add_argument("src")
+    convert_cmd.add_argument("dst")
+    convert_cmd.add_argument("--min-bytes", type=int, default=MIN_EXTERNAL_BYTES)
+    verify_cmd = commands.add_parser("verify", help="Re-hash the payloads of a converted folder.")
+    verify_cmd.add_argument("directory")
+    compare_cmd = commands.add_parser("compare", help="Compare load time and RSS of both formats.")
+    compare_cmd.add_argument("joblib_dir")
+    compare_cmd.add_argument("mmap_dir")
+    compare_cmd.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        manifest = convert(args.src, args.dst, args.min_bytes)
+        for name, entry in manifest["files"].items():
+            print(f"{name}: {len(entry['payloads'])} mapped payloads, {entry['external_bytes'] / 1024:.1f} KiB")
+        return 0
+
+    if args.command == "verify":
+        ok = verify_mmap_bundle(args.directory, full=True)
+        print(f"{args.directory}: {'ok' if ok else 'payloads do not match the manifest, re-run convert'}")
+        return 0 if ok else 1
+
+    print(f"{'format':<8} {'load (ms)':>10} {'RSS +KiB':>10} {'private +KiB':>13}")
+    for label, directory in (("joblib", args.joblib_dir), ("mmap", args.mmap_dir)):
+        result = measure(directory, args.repeats)
+        print(f"{label:<8} {result['load_s'] * 1000:>10.1f} {result['rss_kb']:>10} {result['private_kb']:>13}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
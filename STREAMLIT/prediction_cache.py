@@ -0,0 +1,178 @@
+"""Prediction result cache for the Stage Prediction Tool.
+
+Form inputs come from small bounded domains, so identical profiles are
+resubmitted constantly. `PredictionCache` keys results on the canonicalized
+input tuple plus the model artifact version and keeps them in an in-process
+LRU (size + TTL eviction) with an optional SQLite tier that survives restarts.
+Concurrent lookups of the same key are collapsed into one model call.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from predictor import INPUT_FEATURES, encode_row
+
+
+def canonical_inputs(row):
+    """Returns the hashable, canonical form of a raw input dict (chorea in 0.1 steps, the rest integers)."""
+    values = encode_row(row)
+    return tuple(
+        round(value, 1) if col == 'Chorea_Score' else int(round(value))
+        for col, value in zip(INPUT_FEATURES, values)
+    )
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class PredictionCache:
+    """Thread-safe LRU + TTL cache of predicted stages with single-flight computation."""
+
+    def __init__(self, maxsize=4096, ttl=3600.0, disk_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self.counters = {
+            'hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0,
+            'evictions': 0, 'expirations': 0, 'invalidations': 0,
+        }
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT, created REAL)"
+            )
+            self._db.commit()
+
+    # --- public API ---
+    def predict(self, predictor, row):
+        """Predicted stage for `row`, computed by the predictor at most once per key."""
+        version = predictor.version or 'unversioned'
+        self._check_version(version)
+        inputs = canonical_inputs(row)
+        # Score the canonical inputs so every row sharing this key gets exactly the cached answer.
+        return self.get_or_compute(
+            (version, inputs), lambda: str(predictor.predict_values(inputs))
+        )
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            value = self._get_memory(key)
+            if value is not None:
+                self.counters['hits'] += 1
+                return value
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlight()
+            else:
+                self.counters['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = self._get_disk(key)
+            if value is None:
+                value = compute()
+                self._put_disk(key, value)
+                with self._lock:
+                    self.counters['misses'] += 1
+            else:
+                with self._lock:
+                    self.counters['disk_hits'] += 1
+            with self._lock:
+                self._put_memory(key, value)
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, 'size': len(self._entries), 'maxsize': self.maxsize, 'version': self._version}
+
+    # --- internals ---
+    def _check_version(self, version):
+        with self._lock:
+            if version == self._version:
+                return
+            if self._version is not None:
+                self.counters['invalidations'] += 1
+            self._version = version
+            self._entries.clear()
+            if self._db is not None:
+                # Disk keys embed the version, so entries of older artifacts can never hit again.
+                self._db.execute("DELETE FROM predictions WHERE key NOT LIKE ?", ('[' + json.dumps(version) + ',%',))
+                self._db.commit()
+
+    def _get_memory(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.counters['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_memory(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    @staticmethod
+    def _disk_key(key):
+        version, inputs = key
+        return json.dumps([version, list(inputs)])
+
+    def _get_disk(self, key):
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM predictions WHERE key = ?", (self._disk_key(key),)
+            ).fetchone()
+        if row is None or row[1] + self.ttl < time.time():
+            return None
+        return row[0]
+
+    def _put_disk(self, key, value):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, created) VALUES (?, ?, ?)",
+                (self._disk_key(key), value, time.time()),
+            )
+            self._db.commit()
@@ -0,0 +1,374 @@
+"""Headless inference engine for the HD stage model.
+
+`Predictor` wraps the artifacts returned by `load_models_from_zip` so that the
+same preprocessing and prediction used by the Stage Prediction Tool can run
+outside a Streamlit script, one patient at a time or on whole arrays.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from metrics import span, timed
+
+# ---------------------- INPUT SCHEMA ----------------------
+# Raw clinical inputs, in the column order `predict_batch` expects for arrays.
+INPUT_FEATURES = [
+    'Age', 'Sex', 'Family_History', 'HTT_CAG_Repeat_Length', 'Age_of_Onset',
+    'Motor_Score', 'Cognitive_Score', 'Chorea_Score', 'Functional_Capacity_Score',
+]
+
+# Valid ranges shared by the prediction form widgets and the batch validator.
+FORM_BOUNDS = {
+    'Age': (1, 120),
+    'Age_of_Onset': (1, 120),
+    'HTT_CAG_Repeat_Length': (10, 100),
+    'Motor_Score': (0, 124),
+    'Cognitive_Score': (0, 100),
+    'Chorea_Score': (0.0, 28.0),
+    'Functional_Capacity_Score': (0, 100),
+}
+
+# Categorical inputs accept either the form labels or their 0/1 codes.
+CATEGORICAL_CODES = {
+    'Sex': {'male': 1, 'm': 1, '1': 1, 'female': 0, 'f': 0, '0': 0},
+    'Family_History': {'yes': 1, 'y': 1, '1': 1, 'no': 0, 'n': 0, '0': 0},
+}
+
+# Descriptive columns that are constant for every HD patient.
+CONSTANT_FEATURES = {
+    'Gene/Factor': 'HTT', 'Function': 'CAG Trinonucleotide Repeat Expansion',
+    'Effect': 'Neurodegeneration', 'Category': 'Primary Cause'
+}
+
+STAGES = ['No Disease', 'Early', 'Middle', 'Severe']
+
+# Largest batch routed through the compiled NumPy graph; above it the original model's native code wins
+# (the crossover is ~200 rows for the notebook's 160-tree stack, see bench_prediction.py).
+COMPILED_MAX_BATCH = 128
+
+# Files inside the model artifact ZIP.
+MODEL_FILE = "huntington_model_pipeline.pkl"
+FEATURE_ENCODERS_FILE = "feature_encoders.pkl"
+TARGET_ENCODER_FILE = "target_encoder.pkl"
+MODEL_COLUMNS_FILE = "model_columns.json"
+
+
+@timed("load_artifacts")
+def load_artifacts(directory="models"):
+    """Loads (model, target_encoder, feature_encoders, model_columns) from an extracted artifact folder.
+
+    Folders produced by `mmap_artifacts.convert` are loaded through memory maps, or from the joblib folder they
+    were converted from when their payload files do not match the manifest.
+    """
+    import joblib
+    import mmap_artifacts
+
+    directory = Path(directory)
+    if mmap_artifacts.is_mmap_bundle(directory):
+        if mmap_artifacts.verify_mmap_bundle(directory):
+            return mmap_artifacts.load_mmap_artifacts(directory)
+        source = mmap_artifacts.source_dir(directory)
+        if source is None:
+            raise ValueError(f"{directory}: mapped payloads do not match {mmap_artifacts.MMAP_MANIFEST}; "
+                             "re-run mmap_artifacts.py convert.")
+        print(f"Mapped payloads in {directory} do not match the manifest, loading {source} instead.")
+        directory = source
+    model = joblib.load(directory / MODEL_FILE)
+    feature_encoders = joblib.load(directory / FEATURE_ENCODERS_FILE)
+    target_encoder = joblib.load(directory / TARGET_ENCODER_FILE)
+
+    with open(directory / MODEL_COLUMNS_FILE) as f:
+        model_columns = json.load(f)
+
+    return model, target_encoder, feature_encoders, model_columns
+
+
+def artifact_fingerprint(directory="models"):
+    """Short content hash of the artifact files, used to version anything derived from the model."""
+    import hashlib
+
+    import mmap_artifacts
+
+    digest = hashlib.sha256()
+    names = [MODEL_FILE, FEATURE_ENCODERS_FILE, TARGET_ENCODER_FILE, MODEL_COLUMNS_FILE]
+    if mmap_artifacts.is_mmap_bundle(directory):
+        # The manifest holds the checksum of every mapped payload.
+        names.append(mmap_artifacts.MMAP_MANIFEST)
+    for name in names:
+        digest.update(name.encode())
+        with open(Path(directory) / name, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def encode_row(row):
+    """Converts a dict of raw inputs into a list of floats in INPUT_FEATURES order.
+
+    Raises ValueError for missing fields, unknown categories or values outside FORM_BOUNDS.
+    """
+    values = []
+    for col in INPUT_FEATURES:
+        if col not in row:
+            raise ValueError(f"Missing field {col!r}.")
+        value = row[col]
+        if col in CATEGORICAL_CODES:
+            if isinstance(value, str):
+                code = CATEGORICAL_CODES[col].get(value.strip().lower())
+            else:
+                code = int(value) if value in (0, 1) else None
+            if code is None:
+                raise ValueError(f"{col} must be one of {sorted(CATEGORICAL_CODES[col])}.")
+            value = code
+        else:
+            low, high = FORM_BOUNDS[col]
+            value = float(value)
+            if not low <= value <= high:
+                raise ValueError(f"{col} must be in [{low}, {high}].")
+        values.append(float(value))
+    return values
+
+
+# ---------------------- DEMO FALLBACK ----------------------
+def demo_predict_stage(row):
+    motor = row.get('Motor_Score', 0)
+    func = row.get('Functional_Capacity_Score', 100)
+    cog = row.get('Cognitive_Score', 100)
+    chorea = row.get('Chorea_Score', 0)
+    if motor < 30 and func >= 70 and cog >= 70:
+        return 'No Disease'
+    if motor < 45 and func >= 60 and cog >= 60:
+        return 'Early'
+    if motor < 80 and func >= 30:
+        return 'Middle'
+    return 'Severe'
+
+
+def demo_predict_stages(X):
+    """Vectorized equivalent of `demo_predict_stage` for an array in INPUT_FEATURES order."""
+    motor = X[:, INPUT_FEATURES.index('Motor_Score')]
+    func = X[:, INPUT_FEATURES.index('Functional_Capacity_Score')]
+    cog = X[:, INPUT_FEATURES.index('Cognitive_Score')]
+    conditions = [
+        (motor < 30) & (func >= 70) & (cog >= 70),
+        (motor < 45) & (func >= 60) & (cog >= 60),
+        (motor < 80) & (func >= 30),
+    ]
+    return np.select(conditions, STAGES[:3], default=STAGES[3]).astype(object)
+
+
+# ---------------------- ENCODER LOOKUPS ----------------------
+def _category_codes(values, table):
+    """Vectorized CATEGORICAL_CODES lookup: one dict access per distinct value, NaN for unknown ones."""
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    codes = np.array([table.get(u.strip().lower(), np.nan) for u in uniques], dtype=float)
+    return codes[inverse]
+
+
+class _LookupTable:
+    """Array form of a fitted LabelEncoder: codes come from `np.searchsorted` on the sorted classes.
+
+    Encoders without numeric `classes_` keep using their own `transform`.
+    """
+
+    def __init__(self, encoder, column):
+        self.encoder = encoder
+        self.column = column
+        classes = getattr(encoder, 'classes_', None)
+        self.classes = None
+        if classes is not None and np.issubdtype(np.asarray(classes).dtype, np.number):
+            self.classes = np.asarray(classes, dtype=float)
+
+    def __call__(self, values):
+        if self.classes is None:
+            return self.encoder.transform(values)
+        codes = np.searchsorted(self.classes, values)
+        found = np.take(self.classes, codes, mode='clip') == values
+        if not found.all():
+            raise ValueError(f"{self.column} contains previously unseen labels: {np.unique(values[~found])}")
+        return codes.astype(float)
+
+
+# ---------------------- ENGINE ----------------------
+class Predictor:
+    """Vectorized preprocessing + prediction over the loaded model artifacts.
+
+    Falls back to the rule-based demo predictor when the artifacts are missing.
+    """
+
+    def __init__(self, model, target_encoder, feature_encoders, model_columns, version=None):
+        self.model = model
+        self.target_encoder = target_encoder
+        self.feature_encoders = feature_encoders or {}
+        self.model_columns = list(model_columns) if model_columns else None
+        self.demo = model is None or target_encoder is None or self.model_columns is None
+        # Identifies the artifact set; caches key their entries on it.
+        self.version = 'demo' if self.demo else version
+        self.compiled = None
+        self.compiled_max_batch = COMPILED_MAX_BATCH
+        if not self.demo:
+            self._prepare_layout()
+
+    @classmethod
+    def from_artifacts(cls, artifacts, version=None):
+        """Builds a predictor from the (model, target_encoder, feature_encoders, model_columns) tuple."""
+        return cls(*artifacts, version=version)
+
+    def use_compiled(self, max_batch=COMPILED_MAX_BATCH):
+        """Routes batches of up to `max_batch` rows through the fused NumPy graph of `compiled_model`.
+
+        Raises TypeError when the model contains a component the compiler does not support.
+        """
+        from compiled_model import compile_model
+
+        if not self.demo:
+            self.compiled = compile_model(self.model)
+            self.compiled_max_batch = max_batch
+        return self
+
+    def _prepare_layout(self):
+        """Compiles the encoders and the column layout once, so scoring is plain array assignment."""
+        column_index = {col: i for i, col in enumerate(self.model_columns)}
+
+        # Feature-vector template with every constant column already encoded.
+        self._template = np.zeros(len(self.model_columns), dtype=float)
+        for col, value in CONSTANT_FEATURES.items():
+            if col not in column_index:
+                continue
+            if col not in self.feature_encoders:
+                raise ValueError(f"Model column {col!r} has no feature encoder.")
+            self._template[column_index[col]] = self.feature_encoders[col].transform([value])[0]
+
+        # Inputs copied as-is in one fancy assignment, and inputs mapped through an encoder lookup table.
+        direct_src, direct_dst = [], []
+        self._encoded_slots = []
+        for j, col in enumerate(INPUT_FEATURES):
+            if col not in column_index:
+                continue
+            encoder = None
+            if col not in ['Sex', 'Family_History']:
+                encoder = self.feature_encoders.get(col)
+            if encoder is None:
+                direct_src.append(j)
+                direct_dst.append(column_index[col])
+            else:
+                self._encoded_slots.append((j, column_index[col], _LookupTable(encoder, col)))
+        self._direct_src = np.array(direct_src, dtype=np.intp)
+        self._direct_dst = np.array(direct_dst, dtype=np.intp)
+
+        self._duration_slot = column_index.get('Disease_Duration')
+        duration_encoder = self.feature_encoders.get('Disease_Duration')
+        self._duration_lookup = _LookupTable(duration_encoder, 'Disease_Duration') if duration_encoder else None
+
+        # Pipelines fitted on DataFrames select columns by name, so they need one frame per batch.
+        self._needs_frame = hasattr(self.model, 'feature_names_in_')
+
+    # --- input conversion ---
+    @staticmethod
+    @timed("to_array")
+    def to_array(X):
+        """Converts a DataFrame or array-like of raw inputs into a float array in INPUT_FEATURES order."""
+        if hasattr(X, 'columns'):
+            columns = []
+            for col in INPUT_FEATURES:
+                values = X[col]
+                if col in CATEGORICAL_CODES and values.dtype.kind not in 'biuf':
+                    columns.append(_category_codes(values.to_numpy(), CATEGORICAL_CODES[col]))
+                else:
+                    columns.append(values.to_numpy(dtype=float))
+            return np.column_stack(columns)
+        X = np.asarray(X, dtype=float)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    @timed("build_features")
+    def build_features(self, X):
+        """Returns the model-ready feature matrix (len(X), len(model_columns)) for raw inputs."""
+        X = self.to_array(X)
+        features = np.tile(self._template, (X.shape[0], 1))
+        features[:, self._direct_dst] = X[:, self._direct_src]
+
+        for j, slot, lookup in self._encoded_slots:
+            features[:, slot] = lookup(X[:, j])
+
+        if self._duration_slot is not None:
+            duration = np.clip(
+                X[:, INPUT_FEATURES.index('Age')] - X[:, INPUT_FEATURES.index('Age_of_Onset')], 0, None
+            )
+            if self._duration_lookup is not None:
+                duration = self._duration_lookup(duration)
+            features[:, self._duration_slot] = duration
+        return features
+
+    @timed("build_row")
+    def build_row(self, values):
+        """Single-patient `build_features`: copies the template and fills the input slots."""
+        features = self._template.copy()
+        for j, slot in zip(self._direct_src, self._direct_dst):
+            features[slot] = values[j]
+        for j, slot, lookup in self._encoded_slots:
+            features[slot] = lookup(np.array([values[j]]))[0]
+        if self._duration_slot is not None:
+            duration = max(values[INPUT_FEATURES.index('Age')] - values[INPUT_FEATURES.index('Age_of_Onset')], 0)
+            if self._duration_lookup is not None:
+                duration = self._duration_lookup(np.array([duration]))[0]
+            features[self._duration_slot] = duration
+        return features[None, :]
+
+    def _estimator_for(self, features):
+        """(estimator, input) for a feature matrix: the compiled graph for small batches, else the model."""
+        if self.compiled is not None and features.shape[0] <= self.compiled_max_batch:
+            return self.compiled, features
+        return self.model, self._model_input(features)
+
+    def _model_input(self, features):
+        if self._needs_frame:
+            import pandas as pd
+            with span("model_frame"):
+                return pd.DataFrame(features, columns=self.model_columns)
+        return features
+
+    # --- prediction ---
+    @timed("predict_proba_batch")
+    def predict_proba_batch(self, X):
+        """Class probabilities, columns ordered as `self.classes`."""
+        if self.demo:
+            stages = demo_predict_stages(self.to_array(X))
+            return (stages[:, None] == np.array(STAGES, dtype=object)[None, :]).astype(float)
+        estimator, model_input = self._estimator_for(self.build_features(X))
+        with span("model_predict"):
+            return estimator.predict_proba(model_input)
+
+    @timed("predict_batch")
+    def predict_batch(self, X):
+        """Predicted stage names for every row of X."""
+        if self.demo:
+            return demo_predict_stages(self.to_array(X))
+        estimator, model_input = self._estimator_for(self.build_features(X))
+        with span("model_predict"):
+            prediction_encoded = estimator.predict(model_input)
+        with span("inverse_transform"):
+            return self.target_encoder.inverse_transform(prediction_encoded)
+
+    def predict_one(self, row):
+        """Predicted stage name for a single patient given as a dict of raw inputs."""
+        return self.predict_values(encode_row(row))
+
+    @timed("predict_values")
+    def predict_values(self, values):
+        """Predicted stage name for one already validated row of INPUT_FEATURES values."""
+        if self.demo:
+            return demo_predict_stage(dict(zip(INPUT_FEATURES, values)))
+        estimator, model_input = self._estimator_for(self.build_row(values))
+        with span("model_predict"):
+            prediction_encoded = estimator.predict(model_input)
+        with span("inverse_transform"):
+            return self.target_encoder.inverse_transform(prediction_encoded)[0]
+
+    @property
+    def classes(self):
+        """Stage names matching the columns of `predict_proba_batch`."""
+        if self.demo:
+            return list(STAGES)
+        model_classes = getattr(self.model, 'classes_', np.arange(len(self.target_encoder.classes_)))
+        return [str(c) for c in self.target_encoder.inverse_transform(np.asarray(model_classes).astype(int))]
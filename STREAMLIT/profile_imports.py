@@ -0,0 +1,124 @@
+"""Start-up profile of the Streamlit app.
+
+`importtime` runs the app script once under `python -X importtime` and
+prints the slowest top-level packages (cumulative import time, so
+`sklearn` includes everything it pulls in). `startup` launches fresh
+interpreters that drive the app through `streamlit.testing.v1.AppTest` and
+report the median time from process start to the first Home render and to
+the first prediction.
+
+    python STREAMLIT/profile_imports.py importtime --top 20
+    python STREAMLIT/profile_imports.py startup --repeats 5 [--models-dir models]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+APP_FILE = APP_DIR / "app.py"
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+# Executes the script the way `streamlit run` would, minus the server (bare mode).
+_BARE_RUN_SNIPPET = """
+import runpy, sys
+sys.path.insert(0, {app_dir!r})
+runpy.run_path({app_file!r}, run_name="__main__")
+"""
+
+_STARTUP_SNIPPET = """
+import json, os, sys, time
+from streamlit.testing.v1 import AppTest
+
+marks = {{}}
+at = AppTest.from_file({app_file!r}, default_timeout=600)
+at.run()
+marks['home'] = time.time()
+at.session_state.nav_menu = "Stage Prediction Tool"
+at.run()
+marks['prediction_page'] = time.time()
+[button for button in at.button if button.label == "Predict Disease Stage"][0].click()
+at.run()
+marks['first_prediction'] = time.time()
+marks['exceptions'] = [str(e.value) for e in at.exception]
+print(json.dumps(marks))
+"""
+
+
+def parse_importtime(stderr):
+    """Per-module (self_us, cumulative_us) and per top-level package cumulative time from `-X importtime` output."""
+    modules = {}
+    packages = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        modules[name] = (self_us, cumulative_us)
+        # Only count outermost imports so nested modules are not added twice.
+        if len(indent) <= 1:
+            packages[name.split(".")[0]] += cumulative_us
+    return modules, dict(packages)
+
+
+def profile_imports(cwd):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _BARE_RUN_SNIPPET.format(app_dir=str(APP_DIR), app_file=str(APP_FILE))],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    modules, packages = parse_importtime(result.stderr)
+    return elapsed, modules, packages
+
+
+def measure_startup(cwd, env, repeats):
+    """Median seconds from process launch to each AppTest milestone."""
+    code = _STARTUP_SNIPPET.format(app_file=str(APP_FILE))
+    runs = []
+    for _ in range(repeats):
+        launched = time.time()
+        out = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, check=True, capture_output=True, text=True)
+        marks = json.loads(out.stdout.strip().splitlines()[-1])
+        if marks.pop('exceptions'):
+            raise RuntimeError("The app raised during the start-up run; run it manually to see the traceback.")
+        runs.append({name: stamp - launched for name, stamp in marks.items()})
+    return {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the app's import time and start-up latency.")
+    parser.add_argument("--cwd", default=str(APP_DIR), help="Working directory for the app (where models/ lives).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importtime = commands.add_parser("importtime", help="Slowest imports of one bare-mode app run.")
+    importtime.add_argument("--top", type=int, default=15)
+    startup = commands.add_parser("startup", help="Time to first Home render and first prediction.")
+    startup.add_argument("--repeats", type=int, default=3)
+    startup.add_argument("--models-dir", default=None, help="Sets HD_MODELS_DIR; without it the app runs in demo mode.")
+    args = parser.parse_args(argv)
+
+    if args.command == "importtime":
+        elapsed, modules, packages = profile_imports(args.cwd)
+        print(f"Bare-mode app run: {elapsed:.2f}s wall, {sum(packages.values()) / 1e6:.2f}s in imports\n")
+        print(f"{'package':<32} {'cumulative (ms)':>16}")
+        for name, total in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"{name:<32} {total / 1000:>16.1f}")
+        return 0
+
+    env = dict(os.environ)
+    if args.models_dir:
+        env["HD_MODELS_DIR"] = str(Path(args.models_dir).resolve())
+    result = measure_startup(args.cwd, env, args.repeats)
+    for name, seconds in result.items():
+        print(f"{name:<18} {seconds * 1000:>9.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
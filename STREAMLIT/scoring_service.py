@@ -0,0 +1,253 @@
+"""Local HTTP scoring service for the HD stage model.
+
+Concurrent single-patient requests are collected over a short window and
+scored together with one `Predictor.predict_batch` call, so a burst of 64
+requests costs one model.predict instead of 64.
+
+    python STREAMLIT/scoring_service.py --models-dir models --port 8600
+
+Endpoints:
+    POST /predict   JSON object with the INPUT_FEATURES fields -> {"stage": ..., "demo": ...}
+    GET  /metrics   queue depth, batch sizes and p50/p99 latency as JSON (plus span histograms with HD_METRICS=1)
+    GET  /metrics/prometheus   span histograms in the Prometheus text format
+    GET  /healthz   liveness probe
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+import metrics
+from predictor import Predictor, encode_row, load_artifacts
+
+MAX_BODY_BYTES = 64 * 1024
+STATS_WINDOW = 10000
+
+
+class MicroBatcher:
+    """Collects queued rows for up to `window_ms` (or `max_batch` rows) and scores them in one call."""
+
+    def __init__(self, predictor, window_ms=5.0, max_batch=64):
+        self.predictor = predictor
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.batch_sizes = deque(maxlen=STATS_WINDOW)
+        self.latencies = deque(maxlen=STATS_WINDOW)
+        self.requests_total = 0
+        self.batches_total = 0
+
+    async def submit(self, values):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((values, future, time.perf_counter()))
+        return await future
+
+    def predict_rows(self, X):
+        """Stage per row of `X`, or the exception that row raised.
+
+        The rows are scored in one call; if that fails, each row is retried on its own so one bad request
+        does not fail the rest of its batch.
+        """
+        try:
+            return list(self.predictor.predict_batch(X))
+        except Exception as e:
+            if len(X) == 1:
+                return [e]
+        outcomes = []
+        for row in X:
+            try:
+                outcomes.append(self.predictor.predict_batch(row[np.newaxis])[0])
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            X = np.array([values for values, _, _ in batch], dtype=float)
+            # The model call releases the event loop so new requests keep queueing meanwhile.
+            outcomes = await loop.run_in_executor(None, self.predict_rows, X)
+
+            now = time.perf_counter()
+            for (_, future, started), outcome in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                    continue
+                self.latencies.append(now - started)
+                metrics.observe("service_request", now - started)
+                future.set_result(str(outcome))
+            self.batch_sizes.append(len(batch))
+            self.requests_total += len(batch)
+            self.batches_total += 1
+
+    def stats(self):
+        latencies_ms = np.array(self.latencies) * 1000.0
+        batch_sizes = np.array(self.batch_sizes)
+        return {
+            "demo_mode": self.predictor.demo,
+            "queue_depth": self.queue.qsize(),
+            "requests_total": self.requests_total,
+            "batches_total": self.batches_total,
+            "batch_size_mean": float(batch_sizes.mean()) if batch_sizes.size else 0.0,
+            "batch_size_max": int(batch_sizes.max()) if batch_sizes.size else 0,
+            "latency_p50_ms": float(np.percentile(latencies_ms, 50)) if latencies_ms.size else 0.0,
+            "latency_p99_ms": float(np.percentile(latencies_ms, 99)) if latencies_ms.size else 0.0,
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "spans": metrics.REGISTRY.snapshot() if metrics.ENABLED else {},
+        }
+
+
+# ---------------------- HTTP ----------------------
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+async def write_response(writer, status, payload, keep_alive):
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode(), "application/json"
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode() + body)
+    await writer.drain()
+
+
+async def handle_request(batcher, method, path, body):
+    if path == "/healthz":
+        return 200, {"status": "ok"}
+    if path == "/metrics":
+        return 200, batcher.stats()
+    if path == "/metrics/prometheus":
+        return 200, metrics.REGISTRY.to_prometheus()
+    if path != "/predict":
+        return 404, {"error": f"unknown path {path}"}
+    if method != "POST":
+        return 405, {"error": "use POST"}
+
+    try:
+        values = encode_row(json.loads(body or b"{}"))
+    except (ValueError, TypeError) as e:
+        return 400, {"error": str(e)}
+
+    try:
+        stage = await batcher.submit(values)
+    except Exception as e:
+        return 500, {"error": f"prediction failed: {e}"}
+    return 200, {"stage": stage, "demo": batcher.predictor.demo}
+
+
+async def handle_connection(batcher, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, path, version = request_line.decode("latin-1").split()
+            except ValueError:
+                await write_response(writer, 400, {"error": "malformed request line"}, False)
+                break
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                length = int(headers.get("content-length", 0) or 0)
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                await write_response(writer, 400, {"error": "bad Content-Length"}, False)
+                break
+            if length > MAX_BODY_BYTES:
+                await write_response(writer, 413, {"error": "request body too large"}, False)
+                break
+            body = await reader.readexactly(length) if length else b""
+
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+            status, payload = await handle_request(batcher, method, path.split("?", 1)[0], body)
+            await write_response(writer, status, payload, keep_alive)
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+def build_predictor(models_dir, compiled=False):
+    """Loads the artifacts from `models_dir`, falling back to the demo predictor when they are unavailable."""
+    try:
+        predictor = Predictor.from_artifacts(load_artifacts(models_dir))
+    except Exception as e:
+        print(f"⚠️ Running in Demo Mode: model artifacts not found or failed to load ({e}).")
+        return Predictor(None, None, None, None)
+    if compiled:
+        try:
+            predictor.use_compiled()
+        except TypeError as e:
+            print(f"Compiled model unavailable, using the original pipeline: {e}")
+    return predictor
+
+
+async def serve(args):
+    batcher = MicroBatcher(build_predictor(args.models_dir, args.compiled), args.window_ms, args.max_batch)
+    batch_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(
+        lambda r, w: handle_connection(batcher, r, w), args.host, args.port
+    )
+    print(f"Scoring service listening on http://{args.host}:{args.port} "
+          f"(window {args.window_ms} ms, max batch {args.max_batch}, demo={batcher.predictor.demo})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching HTTP scoring service for the HD stage model.")
+    parser.add_argument("--models-dir", default=os.environ.get("HD_MODELS_DIR", "models"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="How long to wait for more requests before scoring a batch.")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--compiled", action="store_true",
+                        default=os.environ.get("HD_COMPILED_MODEL") == "1",
+                        help="Score small batches with the fused NumPy graph (compiled_model.py).")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Render cache for everything on the results page that depends only on the predicted stage.
+
+There are only four stages, so the gauge figure, its lightweight SVG
+counterpart and the narrative / next-steps HTML are built once per process
+and reused for every prediction. Set HD_LIGHT_RENDER=1 to draw the gauge
+without Plotly, as a static SVG (for low-resource deployments).
+
+    python STREAMLIT/stage_render.py bench --repeats 200
+"""
+import argparse
+import base64
+import math
+import os
+import time
+from functools import lru_cache
+
+from predictor import STAGES
+
+LIGHT_RENDER = os.environ.get("HD_LIGHT_RENDER") == "1"
+
+STAGE_LEVELS = {"No Disease": 0.1, "Early": 0.4, "Middle": 0.7, "Severe": 1.0}
+GAUGE_STEPS = [(0, 25, "#a5f0b3"), (25, 50, "#f9e79f"), (50, 75, "#f8c471"), (75, 100, "#f1948a")]
+GAUGE_TICKS = [12.5, 37.5, 62.5, 87.5]
+GAUGE_COLOR = "#003366"
+
+STAGE_NARRATIVE = {
+    'Early': """
+        <div class="content-box">
+            In the <b>early stage</b> of Huntington’s disease, changes may be mild and gradual.
+            Subtle issues such as small movement difficulties, mild balance changes, mood shifts, or problems with focus and concentration may begin to appear.
+            <br>
+            Most people can continue with work, hobbies, and daily responsibilities independently.
+            Regular medical check-ups and early lifestyle adjustments can help slow down progression and improve quality of life.
+        </div>
+        """,
+    'Middle': """
+        <div class="content-box">
+            The <b>middle stage</b> usually involves more noticeable symptoms.
+            Movements can become slower or more rigid, and tasks like writing, speaking, or walking may require more effort.
+            Cognitive and emotional changes — such as forgetfulness, frustration, or anxiety — may also become more apparent.
+            <br>
+            At this stage, people often benefit from structured routines, supportive therapies, and occasional assistance with daily activities.
+        </div>
+        """,
+    'Severe': """
+        <div class="content-box">
+            The <b>advanced stage</b> of Huntington’s disease is marked by significant loss of motor control and communication abilities.
+            People may rely on full-time care for eating, movement, and personal hygiene.
+            Cognitive awareness may still be present, so compassionate care and emotional support are especially important.
+            <br>
+            Medical teams often focus on comfort, dignity, and symptom relief — ensuring the person’s environment is calm, safe, and nurturing.
+        </div>
+        """,
+    'No Disease': """
+        <div class="content-box">
+            Your results do <b>not suggest active features</b> of Huntington’s disease based on typical clinical patterns.
+            However, this does <b>not replace professional evaluation</b>.
+            If you have a family history or ongoing neurological concerns, a neurologist or genetic counselor can help provide further testing and reassurance.
+            <br>
+            Maintaining regular health check-ups and healthy lifestyle habits remains the best approach to long-term wellbeing.
+        </div>
+        """,
+}
+
+NEXT_STEPS = {
+    'Early': """
+        <div class="content-box">
+            💡 Focus on early prevention and awareness.
+            Maintain physical activity, eat a balanced diet, and stay socially connected.
+            Discuss possible long-term care planning with healthcare professionals while independence is still high.
+            <br>
+            Regular physiotherapy, speech therapy, and mindfulness-based activities may help preserve both mental and physical function.
+        </div>
+        """,
+    'Middle': """
+        <div class="content-box">
+            💡 Prioritize daily safety and physical stability.
+            Occupational and speech therapies can help adapt your home and communication for comfort and confidence.
+            Emotional health is equally important — regular counseling and support groups can reduce stress and isolation.
+            <br>
+            Family education at this stage can help prepare for care needs and strengthen support networks.
+        </div>
+        """,
+    'Severe': """
+        <div class="content-box">
+            💡 Emphasis now shifts to <b>comfort and compassionate care</b>.
+            Managing nutrition, preventing infections, and providing emotional reassurance are the primary goals.
+            Specialized nursing, physiotherapy, and palliative care can greatly improve quality of life for both patients and caregivers.
+            <br>
+            Caregivers are encouraged to seek community and respite support to maintain their own health and wellbeing.
+        </div>
+        """,
+    'No Disease': """
+        <div class="content-box">
+            💡 Continue leading a healthy, active lifestyle and consider speaking to a healthcare professional for reassurance or screening.
+            Genetic counseling can offer clarity if there is a family history of Huntington’s disease.
+            Remember — early awareness and informed lifestyle choices can make a lasting difference.
+        </div>
+        """,
+}
+
+
+@lru_cache(maxsize=None)
+def result_html(stage):
+    return f"""
+        <div class="content-box">
+            Based on the details provided, our analysis suggests the predicted stage is:
+            <b>{stage}</b>.
+            <br>
+        </div>
+        """
+
+
+# ---------------------- GAUGE ----------------------
+def build_gauge_figure(stage):
+    """Plotly gauge for `stage` (uncached; use `gauge_figure`)."""
+    import plotly.graph_objects as go
+
+    value = STAGE_LEVELS.get(stage, 0.1)
+    fig = go.Figure()
+    fig.add_trace(go.Indicator(
+        mode="gauge",
+        value=value * 100,
+        gauge={
+            "shape": "angular",
+            "axis": {
+                "range": [0, 100],
+                "tickmode": "array",
+                "tickvals": GAUGE_TICKS,
+                "ticktext": STAGES,
+                "tickfont": {"size": 15, "color": "#2a2a2a", "family": "Inter, sans-serif"},
+            },
+            "bar": {"color": GAUGE_COLOR, "thickness": 0.2},
+            "bgcolor": "#ffffff",
+            "steps": [{"range": [low, high], "color": color} for low, high, color in GAUGE_STEPS],
+            "threshold": {
+                "line": {"color": GAUGE_COLOR, "width": 6},
+                "thickness": 0.8,
+                "value": value * 100,
+            },
+        },
+        domain={'x': [0, 1], 'y': [0, 1]},
+    ))
+    fig.update_layout(
+        paper_bgcolor="rgba(0,0,0,0)",
+        height=280,
+        margin=dict(l=20, r=20, t=30, b=0),
+        font={"color": "#2a2a2a", "size": 18},
+    )
+    fig.add_annotation(
+        text=f"<b>{stage}</b>",
+        x=0.5, y=0.1, showarrow=False,
+        font={"color": GAUGE_COLOR, "size": 24, "family": "Inter, sans-serif"}
+    )
+    return fig
+
+
+@lru_cache(maxsize=None)
+def gauge_figure(stage):
+    """Shared per-process gauge figure; st.plotly_chart only serializes it, so it is never mutated."""
+    return build_gauge_figure(stage)
+
+
+def _polar(cx, cy, r, percent):
+    angle = math.pi * (1 - percent / 100)
+    return cx + r * math.cos(angle), cy - r * math.sin(angle)
+
+
+def _arc(cx, cy, r_outer, r_inner, start, end, color):
+    x1, y1 = _polar(cx, cy, r_outer, start)
+    x2, y2 = _polar(cx, cy, r_outer, end)
+    x3, y3 = _polar(cx, cy, r_inner, end)
+    x4, y4 = _polar(cx, cy, r_inner, start)
+    return (f'<path d="M{x1:.1f},{y1:.1f} A{r_outer},{r_outer} 0 0 1 {x2:.1f},{y2:.1f} '
+            f'L{x3:.1f},{y3:.1f} A{r_inner},{r_inner} 0 0 0 {x4:.1f},{y4:.1f} Z" fill="{color}"/>')
+
+
+@lru_cache(maxsize=None)
+def gauge_svg(stage):
+    """Static SVG version of the gauge, as an <img> tag with a data URI."""
+    cx, cy, r = 200, 190, 150
+    value = STAGE_LEVELS.get(stage, 0.1) * 100
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 400 250" font-family="Inter, sans-serif">']
+    parts += [_arc(cx, cy, r, r - 40, low, high, color) for low, high, color in GAUGE_STEPS]
+    parts.append(_arc(cx, cy, r - 16, r - 24, 0, value, GAUGE_COLOR))
+    (x1, y1), (x2, y2) = _polar(cx, cy, r + 4, value), _polar(cx, cy, r - 44, value)
+    parts.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{GAUGE_COLOR}" stroke-width="6"/>')
+    for tick, label in zip(GAUGE_TICKS, STAGES):
+        x, y = _polar(cx, cy, r + 22, tick)
+        parts.append(f'<text x="{x:.1f}" y="{y:.1f}" font-size="14" fill="#2a2a2a" text-anchor="middle">{label}</text>')
+    parts.append(f'<text x="{cx}" y="{cy + 2}" font-size="24" font-weight="700" fill="{GAUGE_COLOR}" '
+                 f'text-anchor="middle">{stage}</text></svg>')
+    encoded = base64.b64encode("".join(parts).encode()).decode()
+    return (f'<img src="data:image/svg+xml;base64,{encoded}" alt="{stage} stage gauge" '
+            f'style="display:block; margin:0 auto; width:100%; max-width:480px;"/>')
+
+
+# ---------------------- BENCHMARK ----------------------
+def _per_call_ms(fn, repeats):
+    started = time.perf_counter()
+    for i in range(repeats):
+        fn(STAGES[i % len(STAGES)])
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def benchmark(repeats=200):
+    """Per-prediction render time of the stage-dependent output for each rendering path.
+
+    Plotly paths include the figure-to-JSON step that st.plotly_chart performs.
+    """
+    import plotly
+    import plotly.io as pio
+
+    def marshal(fig):
+        return pio.to_json(plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True), validate=False)
+
+    def blocks(stage):
+        return result_html(stage), STAGE_NARRATIVE[stage], NEXT_STEPS[stage]
+
+    build_gauge_figure(STAGES[0])  # plotly import and validator tables are a one-off cost
+    for stage in STAGES:
+        gauge_figure(stage), gauge_svg(stage)
+    return {
+        'plotly_uncached_ms': _per_call_ms(lambda s: (marshal(build_gauge_figure(s)), blocks(s)), repeats),
+        'plotly_cached_ms': _per_call_ms(lambda s: (marshal(gauge_figure(s)), blocks(s)), repeats),
+        'svg_cached_ms': _per_call_ms(lambda s: (gauge_svg(s), blocks(s)), repeats),
+        'plotly_payload_bytes': max(len(marshal(gauge_figure(s))) for s in STAGES),
+        'svg_payload_bytes': max(len(gauge_svg(s)) for s in STAGES),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the stage result rendering paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench = commands.add_parser("bench")
+    bench.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    for name, value in benchmark(args.repeats).items():
+        print(f"{name:<22} {value:>10.3f}" if name.endswith('_ms') else f"{name:<22} {value:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+"""Stand-in model artifacts with the same layout as the private bundle.
+
+Trains the notebook's model configuration on generated patients and writes
+the four artifact files the app loads (`huntington_model_pipeline.pkl`,
+`feature_encoders.pkl`, `target_encoder.pkl`, `model_columns.json`), plus
+an optional ZIP in the format `fetch_artifacts` downloads. Benchmarks and
+load tests use it so they run without the private artifacts; predictions
+are meaningless, but model size and inference cost match the real stack.
+
+    python STREAMLIT/synthetic_bundle.py --out /tmp/hd-bundle [--kind stack|xgb|lr] [--rows 5000] [--zip]
+"""
+import argparse
+import json
+import time
+import zipfile
+from pathlib import Path
+
+from predictor import (
+    CONSTANT_FEATURES, FEATURE_ENCODERS_FILE, MODEL_COLUMNS_FILE, MODEL_FILE, TARGET_ENCODER_FILE,
+)
+from synthetic_cohort import CATEGORY_COLUMNS, PREPROCESSED_COLUMNS, iter_cohort
+
+# Column order of pre_processed_dataset.csv minus the Disease_Stage target.
+MODEL_COLUMNS = PREPROCESSED_COLUMNS[:-1]
+ENCODED_COLUMNS = ['Sex', 'Family_History', *CATEGORY_COLUMNS]
+BUNDLE_KINDS = ('stack', 'xgb', 'lr')
+
+
+def synthetic_training_data(rows=5000, seed=42):
+    """(X, stages): raw synthetic patients in MODEL_COLUMNS order (category strings as-is) and their stage names."""
+    cohort = next(iter_cohort(rows, chunk_rows=rows, seed=seed))
+    stages = cohort.pop('Disease_Stage').astype(str).to_numpy(dtype=object)
+    for col in ENCODED_COLUMNS:
+        cohort[col] = cohort[col].astype(str)
+    cohort['Disease_Duration'] = (cohort['Age'] - cohort['Age_of_Onset']).clip(lower=0)
+    return cohort[MODEL_COLUMNS], stages
+
+
+def build_model(kind='stack', n_jobs=1):
+    """The notebook's model configuration (`Stacked(LR+MLP+XGB).ipynb`, `XGB_Training.ipynb` or the LR pipeline)."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    lr_pipeline = Pipeline(steps=[
+        ('scaler', StandardScaler()),
+        ('lr', LogisticRegression(random_state=42, max_iter=1000)),
+    ])
+    if kind == 'lr':
+        return lr_pipeline
+
+    import xgboost as xgb
+
+    xgb_model = xgb.XGBClassifier(
+        objective='multi:softmax', eval_metric='mlogloss', colsample_bytree=0.8, learning_rate=0.1,
+        max_depth=3, n_estimators=100 if kind == 'xgb' else 160, subsample=0.8, random_state=42, n_jobs=n_jobs,
+    )
+    if kind == 'xgb':
+        return xgb_model
+
+    from sklearn.ensemble import StackingClassifier
+
+    mlp_pipeline = Pipeline(steps=[
+        ('scaler', StandardScaler()),
+        ('mlp', MLPClassifier(activation='tanh', alpha=0.01, hidden_layer_sizes=(50, 25), random_state=42,
+                              max_iter=500, early_stopping=True)),
+    ])
+    return StackingClassifier(
+        estimators=[('mlp', mlp_pipeline), ('xgb', xgb_model), ('lr', lr_pipeline)],
+        final_estimator=LogisticRegression(), cv=5, n_jobs=n_jobs,
+    )
+
+
+def build_bundle(out_dir, kind='stack', rows=5000, seed=42, make_zip=False, n_jobs=1):
+    """Trains a `kind` model on synthetic patients and writes the artifact folder; returns its path."""
+    import joblib
+    from sklearn.preprocessing import LabelEncoder
+
+    if kind not in BUNDLE_KINDS:
+        raise ValueError(f"kind must be one of {BUNDLE_KINDS}.")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    X, stages = synthetic_training_data(rows, seed)
+    feature_encoders = {col: LabelEncoder().fit(X[col]) for col in ENCODED_COLUMNS}
+    for col in ENCODED_COLUMNS:
+        X[col] = feature_encoders[col].transform(X[col])
+    missing = [col for col, value in CONSTANT_FEATURES.items() if value not in feature_encoders[col].classes_]
+    if missing:
+        raise ValueError(f"The synthetic cohort never uses the app constants for {missing}; raise its HTT share.")
+    target_encoder = LabelEncoder().fit(stages)
+
+    model = build_model(kind, n_jobs)
+    model.fit(X, target_encoder.transform(stages))
+
+    joblib.dump(model, out_dir / MODEL_FILE)
+    joblib.dump(feature_encoders, out_dir / FEATURE_ENCODERS_FILE)
+    joblib.dump(target_encoder, out_dir / TARGET_ENCODER_FILE)
+    with open(out_dir / MODEL_COLUMNS_FILE, "w") as f:
+        json.dump(MODEL_COLUMNS, f)
+
+    if make_zip:
+        with zipfile.ZipFile(out_dir.with_suffix(".zip"), "w", zipfile.ZIP_DEFLATED) as z:
+            for name in (MODEL_FILE, FEATURE_ENCODERS_FILE, TARGET_ENCODER_FILE, MODEL_COLUMNS_FILE):
+                z.write(out_dir / name, arcname=name)
+    return out_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic model bundle with the real artifact layout.")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--kind", choices=BUNDLE_KINDS, default="stack")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--zip", action="store_true", help="Also write <out>.zip for the Secrets zip_url path.")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    out_dir = build_bundle(args.out, args.kind, args.rows, args.seed, args.zip)
+    print(f"Synthetic {args.kind} bundle written to {out_dir} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,209 @@
+"""Vectorized generator of synthetic HD patient cohorts.
+
+Produces rows with the columns of the private dataset, either raw like
+`hd_dataset.csv` (category strings, Disease_Stage names) or preprocessed
+like `pre_processed_dataset.csv` (label-encoded categoricals,
+Disease_Duration, label-encoded Disease_Stage). Values stay inside the
+prediction form's FORM_BOUNDS. Each row draws a stage from the
+configured mix and a latent severity within that stage; the clinical
+scores follow the severity, with noise that shrinks as `correlation`
+grows. Onset age follows the CAG repeat length.
+
+Rows are generated and written in chunks (CSV or Parquet, by file suffix),
+so the output can be larger than RAM.
+
+    python STREAMLIT/synthetic_cohort.py --out cohort.parquet --rows 5000000 [--preprocessed]
+    python STREAMLIT/synthetic_cohort.py --out hd_dataset.csv --rows 48800 --stage-mix 0.2,0.3,0.3,0.2 --correlation 0.6
+"""
+import argparse
+import resource
+import time
+from pathlib import Path
+
+import numpy as np
+
+from predictor import FORM_BOUNDS, STAGES
+
+# Gene/Factor with the Function, Effect and Category the raw dataset lists for it; HTT comes first.
+GENE_PROFILES = {
+    'HTT': ('CAG Trinonucleotide Repeat Expansion', 'Neurodegeneration', 'Primary Cause'),
+    'MSH3': ('DNA Mismatch Repair', 'Somatic Instability', 'Genetic Modifier'),
+    'FAN1': ('DNA Repair Nuclease', 'Modifies Onset', 'Genetic Modifier'),
+    'MLH1': ('DNA Mismatch Repair', 'Somatic Instability', 'Genetic Modifier'),
+}
+CATEGORY_COLUMNS = ['Gene/Factor', 'Function', 'Effect', 'Category']
+RAW_COLUMNS = [
+    'Age', 'Sex', 'Family_History', 'HTT_CAG_Repeat_Length', 'Motor_Score', 'Cognitive_Score',
+    'Chorea_Score', 'Functional_Capacity_Score', 'Gene/Factor', 'Function', 'Effect', 'Category',
+    'Age_of_Onset', 'Disease_Stage',
+]
+# pre_processed_dataset.csv: raw columns with Disease_Duration added and the categoricals label-encoded.
+PREPROCESSED_COLUMNS = RAW_COLUMNS[:-1] + ['Disease_Duration', 'Disease_Stage']
+
+DEFAULT_STAGE_MIX = (0.25, 0.25, 0.25, 0.25)
+DEFAULT_CORRELATION = 0.7
+DEFAULT_HTT_FRACTION = 0.85
+CHUNK_ROWS = 250_000
+
+# Score means at severity 0 and 1 (severity runs from 0 in "No Disease" to 1 at the end of "Severe").
+SCORE_TRENDS = {
+    'Motor_Score': (5, 115, 0),
+    'Cognitive_Score': (95, 15, 0),
+    'Chorea_Score': (0.5, 24, 1),
+    'Functional_Capacity_Score': (98, 5, 0),
+}
+
+
+def category_values(column):
+    """Sorted distinct values of a category column (the classes a LabelEncoder fitted on it would have)."""
+    if column == 'Gene/Factor':
+        return sorted(GENE_PROFILES)
+    return sorted({profile[CATEGORY_COLUMNS.index(column) - 1] for profile in GENE_PROFILES.values()})
+
+
+def _bounded(col, values, decimals=0):
+    low, high = FORM_BOUNDS[col]
+    return np.clip(np.round(values, decimals), low, high)
+
+
+def generate_table(n, rng, stage_mix=DEFAULT_STAGE_MIX, correlation=DEFAULT_CORRELATION,
+                   htt_fraction=DEFAULT_HTT_FRACTION, preprocessed=False):
+    """pyarrow Table of `n` patients in RAW_COLUMNS (or PREPROCESSED_COLUMNS) order.
+
+    Raw string columns are dictionary-encoded (pandas categoricals after `to_pandas`).
+    """
+    import pyarrow as pa
+
+    stage_mix = np.asarray(stage_mix, dtype=float)
+    stage_codes = rng.choice(len(STAGES), size=n, p=stage_mix / stage_mix.sum())
+    severity = (stage_codes + rng.uniform(size=n)) / len(STAGES)
+    spread = 1.0 - float(np.clip(correlation, 0.0, 1.0))
+
+    # Expanded-repeat carriers for HTT rows; the modifier genes mostly sit in the normal range.
+    genes = np.where(rng.uniform(size=n) < htt_fraction, 0, rng.integers(1, len(GENE_PROFILES), n))
+    expanded = (genes == 0) | (rng.uniform(size=n) < 0.5)
+    cag = np.where(expanded, 40 + 4 * severity + rng.gamma(2.0, 1.8, n), rng.normal(22, 4, n))
+    cag = _bounded('HTT_CAG_Repeat_Length', cag)
+
+    # Mean onset for a repeat length (the parametric model of Langbehn et al.), with individual variation.
+    onset = _bounded('Age_of_Onset', 21.5 + np.exp(9.556 - 0.146 * np.maximum(cag, 36)) + rng.normal(0, 6, n))
+    onset = np.clip(onset, 18, 85)
+    # "No Disease" patients are seen before onset; later stages at longer disease durations.
+    years = np.where(stage_codes == 0, -rng.uniform(0, 15, n), 25 * severity + rng.normal(0, 3, n))
+    age = _bounded('Age', np.maximum(onset + years, 18))
+
+    data = {
+        'Age': age,
+        'Sex': rng.integers(0, 2, n),
+        'Family_History': (rng.uniform(size=n) < np.where(expanded, 0.8, 0.25)).astype(np.int64),
+        'HTT_CAG_Repeat_Length': cag,
+    }
+    for col, (low, high, decimals) in SCORE_TRENDS.items():
+        scale = FORM_BOUNDS[col][1] - FORM_BOUNDS[col][0]
+        mean = low + (high - low) * severity
+        data[col] = _bounded(col, mean + rng.normal(0, 0.02 + 0.3 * spread, n) * scale, decimals)
+
+    # Category codes as a LabelEncoder fitted on the sorted class names would assign them.
+    gene_names = list(GENE_PROFILES)
+    for i, col in enumerate(CATEGORY_COLUMNS):
+        per_gene = gene_names if i == 0 else [profile[i - 1] for profile in GENE_PROFILES.values()]
+        data[col] = np.array([category_values(col).index(v) for v in per_gene], dtype=np.int8)[genes]
+    data['Age_of_Onset'] = onset
+    stage_order = np.argsort(np.argsort(np.array(STAGES))).astype(np.int8)  # sorted position of each stage
+    data['Disease_Stage'] = stage_order[stage_codes]
+
+    if preprocessed:
+        data['Disease_Duration'] = np.clip(age - onset, 0, None)
+        return pa.table({col: data[col] for col in PREPROCESSED_COLUMNS})
+
+    labels = {col: category_values(col) for col in CATEGORY_COLUMNS}
+    labels.update({'Sex': ['Female', 'Male'], 'Family_History': ['No', 'Yes'], 'Disease_Stage': sorted(STAGES)})
+    columns = {}
+    for col in RAW_COLUMNS:
+        if col in labels:
+            codes = pa.array(data[col].astype(np.int8))
+            columns[col] = pa.DictionaryArray.from_arrays(codes, pa.array(labels[col]))
+        else:
+            columns[col] = data[col]
+    return pa.table(columns)
+
+
+def iter_cohort(rows, chunk_rows=CHUNK_ROWS, seed=42, **options):
+    """Yields pandas DataFrames of at most `chunk_rows` patients, `rows` in total (see `generate_table` for options).
+
+    The output depends only on (rows, chunk_rows, seed, options).
+    """
+    for table in iter_cohort_tables(rows, chunk_rows, seed, **options):
+        yield table.to_pandas()
+
+
+def iter_cohort_tables(rows, chunk_rows=CHUNK_ROWS, seed=42, **options):
+    """`iter_cohort` as pyarrow Tables."""
+    chunks = -(-rows // chunk_rows)
+    for i, child in enumerate(np.random.SeedSequence(seed).spawn(chunks)):
+        n = min(chunk_rows, rows - i * chunk_rows)
+        yield generate_table(n, np.random.default_rng(child), **options)
+
+
+def write_cohort(path, rows, chunk_rows=CHUNK_ROWS, seed=42, **options):
+    """Streams `rows` patients into a CSV or Parquet file (by suffix); returns the number of rows written."""
+    if rows < 1:
+        raise ValueError("rows must be positive.")
+    path = Path(path)
+    parquet = path.suffix.lower() in (".parquet", ".pq")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    writer = None
+    written = 0
+    try:
+        for table in iter_cohort_tables(rows, chunk_rows, seed, **options):
+            if writer is None:
+                if parquet:
+                    import pyarrow.parquet as pq
+                    writer = pq.ParquetWriter(tmp, table.schema, compression="zstd")
+                else:
+                    import pyarrow.csv as pacsv
+                    writer = pacsv.CSVWriter(tmp, table.schema)
+            writer.write_table(table)
+            written += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    tmp.replace(path)
+    return written
+
+
+def _stage_mix(text):
+    mix = [float(v) for v in text.split(",")]
+    if len(mix) != len(STAGES) or min(mix) < 0 or sum(mix) <= 0:
+        raise argparse.ArgumentTypeError(f"expected {len(STAGES)} non-negative weights for {', '.join(STAGES)}")
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic HD patient cohort as CSV or Parquet.")
+    parser.add_argument("--out", required=True, help="Output file; .parquet/.pq writes Parquet, anything else CSV.")
+    parser.add_argument("--rows", type=int, default=48_800)
+    parser.add_argument("--preprocessed", action="store_true", help="pre_processed_dataset.csv layout instead of the raw one.")
+    parser.add_argument("--stage-mix", type=_stage_mix, default=DEFAULT_STAGE_MIX,
+                        help=f"Weights for {', '.join(STAGES)} (default equal).")
+    parser.add_argument("--correlation", type=float, default=DEFAULT_CORRELATION,
+                        help="0 = scores almost independent of the stage, 1 = nearly deterministic.")
+    parser.add_argument("--htt-fraction", type=float, default=DEFAULT_HTT_FRACTION)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    written = write_cohort(args.out, args.rows, args.chunk_rows, args.seed, stage_mix=args.stage_mix,
+                           correlation=args.correlation, htt_fraction=args.htt_fraction,
+                           preprocessed=args.preprocessed)
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{written:,} rows -> {args.out} ({Path(args.out).stat().st_size / 1e6:.1f} MB) in {elapsed:.1f}s "
+          f"({written / elapsed:,.0f} rows/s, peak RSS {peak_mb:.0f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,58 @@
+"""Single-feature what-if sweeps for the Stage Prediction Tool.
+
+A sweep varies one input across its whole valid range while holding the rest
+of the profile fixed. The full grid is built as one matrix and scored with a
+single `predict_proba_batch` call.
+"""
+import numpy as np
+
+from predictor import FORM_BOUNDS, INPUT_FEATURES
+
+# Features offered in the what-if panel: label, step and how the range is derived.
+SWEEP_FEATURES = {
+    'Motor_Score': {'label': 'Motor Score', 'step': 1},
+    'Functional_Capacity_Score': {'label': 'Functional Capacity Score', 'step': 1},
+    'Cognitive_Score': {'label': 'Cognitive Score', 'step': 1},
+    'Chorea_Score': {'label': 'Chorea Score', 'step': 0.1},
+    'HTT_CAG_Repeat_Length': {'label': 'HTT CAG Repeat Length', 'step': 1},
+    'Age': {'label': 'Age (projected forward)', 'step': 1, 'years_ahead': 40},
+}
+
+
+def sweep_values(feature, base_values):
+    """Grid of values for `feature`, clipped to FORM_BOUNDS. Age only moves forward from the current age."""
+    spec = SWEEP_FEATURES[feature]
+    low, high = FORM_BOUNDS[feature]
+    if 'years_ahead' in spec:
+        low = base_values[INPUT_FEATURES.index(feature)]
+        high = min(high, low + spec['years_ahead'])
+    count = int(round((high - low) / spec['step'])) + 1
+    return np.round(np.linspace(low, high, count), 1)
+
+
+def build_sweep_matrix(base_values, feature, values):
+    """Repeats the base profile once per sweep value and overwrites the swept column."""
+    matrix = np.tile(np.asarray(base_values, dtype=float), (len(values), 1))
+    matrix[:, INPUT_FEATURES.index(feature)] = values
+    return matrix
+
+
+def transition_points(values, stages):
+    """(value, from_stage, to_stage) wherever the most likely stage changes along the sweep."""
+    stages = np.asarray(stages)
+    changes = np.flatnonzero(stages[1:] != stages[:-1]) + 1
+    return [(float(values[i]), str(stages[i - 1]), str(stages[i])) for i in changes]
+
+
+def run_sweep(predictor, base_values, feature):
+    """Scores the sweep for `feature` with one batched call.
+
+    Returns the sweep values, the probability matrix (len(values), n_classes),
+    the class names and the transition points of the most likely stage.
+    Disease_Duration follows Age automatically because the predictor derives it.
+    """
+    values = sweep_values(feature, base_values)
+    probabilities = predictor.predict_proba_batch(build_sweep_matrix(base_values, feature, values))
+    classes = predictor.classes
+    stages = np.asarray(classes, dtype=object)[probabilities.argmax(axis=1)]
+    return values, probabilities, classes, transition_points(values, stages)